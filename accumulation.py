@@ -0,0 +1,452 @@
+import csv
+import logging
+import math
+import os
+import unicodedata
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+MUNICIPALITIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "municipalities.csv")
+
+# Ocena zavarovalne vsote (EUR), dokler povpraševanje ne vsebuje dejanske
+DEFAULT_SUM_INSURED = {
+    "avtomobilsko": 25000.0,
+    "nepremičninsko": 150000.0,
+    "zdravstveno": 50000.0,
+    "življenjsko": 100000.0
+}
+
+# Stolpci seštevkov: število polic, zavarovalna vsota, izpostavljena vrednost
+# (vsota × ocena izpostavljenosti) in vsota ocen izpostavljenosti
+_COUNT, _SUM_INSURED, _EXPOSED, _SCORE = range(4)
+_COLUMNS = 4
+
+# Koordinate se hranijo na pet decimalk (~1 m) kot eno celo število na točko
+_PRECISION = 100_000
+_LON_SPAN = 360 * _PRECISION + 1
+
+def normalize_location(name: str) -> str:
+    """Male črke, enotni presledki in brez šumnikov ("Škofja  Loka" -> "skofja loka")"""
+    decomposed = unicodedata.normalize("NFKD", name.strip().lower())
+    return " ".join("".join(char for char in decomposed if not unicodedata.combining(char)).split())
+
+def load_municipalities(path: str = MUNICIPALITIES_FILE) -> Dict[str, Tuple[float, float]]:
+    """Koordinate občin iz CSV datoteke s stolpci name, lat, lon"""
+    with open(path, "r", encoding="utf-8", newline="") as handle:
+        return {
+            normalize_location(row["name"]): (float(row["lat"]), float(row["lon"]))
+            for row in csv.DictReader(handle)
+        }
+
+def valid_coordinates(lat, lon):
+    """Ali sta širina in dolžina v veljavnem razponu (deluje tudi na numpy poljih)"""
+    return (lat >= -90.0) & (lat <= 90.0) & (lon >= -180.0) & (lon <= 180.0)
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Razdalja po velikem krogu v km (deluje tudi na numpy poljih)"""
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class AccumulationIndex:
+    """Kopičenje zavarovalnih vsot po nevarnostih v mreži geografskih celic.
+
+    Police z enakimi koordinatami (npr. ista občina) se seštejejo v eno
+    točko, točke pa v celice velikosti cell_km, shranjene v gosti mreži nad
+    območjem portfelja. Poizvedba po krogu z eno vektorsko operacijo sešteje
+    celice, ki v celoti ležijo v krogu, razdaljo pa preverja le za točke v
+    robnih celicah, zato čas ni odvisen od števila polic.
+
+    Gosta mreža pokriva največ kvadrat s stranico grid_km okoli referenčne
+    točke; točke zunaj njega (npr. posamezne police v tujini) se hranijo
+    ločeno in se ob poizvedbi preverijo neposredno.
+    """
+
+    def __init__(self, perils: Sequence[str], cell_km: float = 2.0,
+                 municipalities: Optional[Dict[str, Tuple[float, float]]] = None,
+                 reference_latitude: float = 46.1, reference_longitude: float = 14.8,
+                 grid_km: float = 1000.0):
+        self.perils = tuple(perils)
+        self.cell_km = cell_km
+        self.municipalities = municipalities if municipalities is not None else load_municipalities()
+        self._peril_bits = {peril: 1 << index for index, peril in enumerate(self.perils)}
+        # Vrstica 0 so vse police, ostale po nevarnostih
+        self._shape = (len(self.perils) + 1, _COLUMNS)
+        # Celice so pravokotniki v stopinjah, približno kvadratni na referenčni širini
+        self._cell_lat = cell_km / KM_PER_DEGREE
+        self._cell_lon = cell_km / (KM_PER_DEGREE * math.cos(math.radians(reference_latitude)))
+        # Meje celic, ki jih sme pokriti gosta mreža
+        half = int(math.ceil(grid_km / 2 / cell_km))
+        center_i = int(math.floor(reference_latitude / self._cell_lat))
+        center_j = int(math.floor(reference_longitude / self._cell_lon))
+        self._window = (center_i - half, center_i + half, center_j - half, center_j + half)
+
+        # Točke: koordinate, celica in seštevki
+        self._point_index: Dict[int, int] = {}
+        self._point_lat = np.empty(0)
+        self._point_lon = np.empty(0)
+        self._point_i = np.empty(0, dtype=np.intp)
+        self._point_j = np.empty(0, dtype=np.intp)
+        self._point_totals = np.zeros((0,) + self._shape)
+        self._point_dense = np.empty(0, dtype=bool)
+        self._point_count = 0
+        # Točke zunaj okna goste mreže
+        self._outliers = np.empty(0, dtype=np.intp)
+        self._outlier_count = 0
+        self._cell_points: Dict[Tuple[int, int], List[int]] = {}
+        self._cell_arrays: Dict[Tuple[int, int], np.ndarray] = {}
+
+        # Gosta mreža seštevkov po celicah in oznaka celic s točkami
+        self._grid = np.zeros((0, 0) + self._shape)
+        self._occupied = np.zeros((0, 0), dtype=bool)
+        self._grid_i0 = self._grid_j0 = 0
+
+        # Prispevki polic (po stolpcih) za preklic
+        self._row_of: Dict[Hashable, int] = {}
+        self._row_point = np.empty(0, dtype=np.intp)
+        self._row_mask = np.empty(0, dtype=np.int64)
+        self._row_sum = np.empty(0)
+        self._row_score = np.empty(0)
+        self._row_count = 0
+
+    @classmethod
+    def from_env(cls, perils: Sequence[str]) -> "AccumulationIndex":
+        """Nastavitve iz ACCUMULATION_CELL_KM, ACCUMULATION_GRID_KM in MUNICIPALITIES_FILE
+        (prazno = priložena datoteka); vezane police iz stolpčnega portfelja v PORTFOLIO_DIR"""
+        index = cls(
+            perils,
+            cell_km=float(os.getenv("ACCUMULATION_CELL_KM", "2")),
+            municipalities=load_municipalities(os.getenv("MUNICIPALITIES_FILE") or MUNICIPALITIES_FILE),
+            grid_km=float(os.getenv("ACCUMULATION_GRID_KM", "1000"))
+        )
+        root = os.getenv("PORTFOLIO_DIR")
+        if root and os.path.isdir(root):
+            try:
+                from portfolio_store import PortfolioSnapshot
+
+                added = index.add_snapshot(PortfolioSnapshot(root))
+                logger.info(f"Indeks kopičenja naložen iz {root}: {added} polic")
+            except Exception as e:
+                logger.error(f"Indeksa kopičenja iz {root} ni bilo mogoče naložiti: {str(e)}")
+        return index
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, policy_id: Hashable) -> bool:
+        return policy_id in self._row_of
+
+    def peril_mask(self, perils: Iterable[str]) -> int:
+        mask = 0
+        for peril in perils:
+            mask |= self._peril_bits.get(peril, 0)
+        return mask
+
+    def resolve(self, location) -> Optional[Tuple[float, float]]:
+        """Koordinate iz imena občine, niza "lat,lon" ali para (lat, lon); None za neveljavne"""
+        if location is None:
+            return None
+        if isinstance(location, (tuple, list)):
+            lat, lon = float(location[0]), float(location[1])
+        else:
+            coordinates = self.municipalities.get(normalize_location(location))
+            if coordinates is not None:
+                return coordinates
+            try:
+                lat, lon = (float(part) for part in location.split(","))
+            except ValueError:
+                return None
+        return (lat, lon) if valid_coordinates(lat, lon) else None
+
+    def add(self, policy_id: Hashable, location, sum_insured: float,
+            exposure_score: float, perils: Iterable[str]) -> bool:
+        """Doda vezano polico; vrne False, če lokacije ni mogoče določiti"""
+        if policy_id in self._row_of:
+            raise KeyError(f"Polica {policy_id} je že v indeksu kopičenja")
+        coordinates = self.resolve(location)
+        if coordinates is None:
+            logger.warning(f"Neznana lokacija police {policy_id}: {location}")
+            return False
+
+        self.add_many([policy_id], [coordinates[0]], [coordinates[1]],
+                      [sum_insured], [exposure_score], [self.peril_mask(perils)])
+        return True
+
+    def cancel(self, policy_id: Hashable) -> None:
+        row = self._row_of.pop(policy_id, None)
+        if row is None:
+            raise KeyError(f"Police {policy_id} ni v indeksu kopičenja")
+
+        point = self._row_point[row]
+        sum_insured, exposure_score = self._row_sum[row], self._row_score[row]
+        contribution = -np.array([1.0, sum_insured, sum_insured * exposure_score, exposure_score])
+        rows = [0] + [index for index, bit in enumerate(self._peril_bits.values(), start=1)
+                      if self._row_mask[row] & bit]
+        self._point_totals[point, rows] += contribution
+        if self._point_dense[point]:
+            self._grid[self._point_i[point] - self._grid_i0, self._point_j[point] - self._grid_j0, rows] += contribution
+
+    def add_many(self, policy_ids: Sequence[Hashable], latitudes, longitudes,
+                 sums_insured, exposure_scores, peril_masks) -> int:
+        """Vektorsko doda police z znanimi koordinatami; vrne število dodanih"""
+        sums = np.asarray(sums_insured, dtype=float)
+        scores = np.asarray(exposure_scores, dtype=float)
+        masks = np.asarray(peril_masks, dtype=np.int64)
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        if not valid_coordinates(latitudes, longitudes).all():
+            raise ValueError("Koordinate polic morajo biti na intervalih -90..90 in -180..180")
+
+        start = self._row_count
+        rows = dict(zip(policy_ids, range(start, start + len(sums))))
+        if len(rows) != len(sums) or not self._row_of.keys().isdisjoint(rows):
+            raise KeyError("Police v paketu se ponavljajo ali so že v indeksu kopičenja")
+
+        keys = _point_keys(latitudes, longitudes)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        points = self._points_for(unique_keys)[inverse]
+
+        self._row_of.update(rows)
+        self._row_point = _append(self._row_point, points, start)
+        self._row_mask = _append(self._row_mask, masks, start)
+        self._row_sum = _append(self._row_sum, sums, start)
+        self._row_score = _append(self._row_score, scores, start)
+        self._row_count = start + len(sums)
+
+        # bincount z utežmi je bistveno hitrejši od np.add.at
+        cells = ((self._point_i[points] - self._grid_i0) * self._grid.shape[1]
+                 + self._point_j[points] - self._grid_j0)
+        point_totals = self._point_totals.reshape(len(self._point_totals), -1)
+        grid_totals = self._grid.reshape(-1, point_totals.shape[1])
+        contribution = (np.ones_like(sums), sums, sums * scores, scores)
+        selections = [None] + [(masks & bit) != 0 for bit in self._peril_bits.values()]
+        dense = self._point_dense[points]
+        grid_selections = selections if dense.all() else [
+            dense if covered is None else dense & covered for covered in selections
+        ]
+        for index, (covered, in_grid) in enumerate(zip(selections, grid_selections)):
+            for column, values in enumerate(contribution):
+                flat = index * _COLUMNS + column
+                point_totals[:, flat] += np.bincount(
+                    points if covered is None else points[covered],
+                    weights=values if covered is None else values[covered],
+                    minlength=len(point_totals)
+                )
+                grid_totals[:, flat] += np.bincount(
+                    cells if in_grid is None else cells[in_grid],
+                    weights=values if in_grid is None else values[in_grid],
+                    minlength=len(grid_totals)
+                )
+        return len(sums)
+
+    def add_snapshot(self, snapshot) -> int:
+        """Doda police stolpčnega portfelja (PortfolioSnapshot) z znano lokacijo; vrne število dodanih.
+
+        Polica, ki je že v indeksu, se zamenja z zadnjim izvoženim osnutkom.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        from portfolio_store import remap_perils, to_numpy
+
+        table = snapshot.table(["policy_ref", "policy_type", "sum_insured", "exposure_score",
+                                "peril_mask", "location"], latest=True)
+        refs = table.column("policy_ref").to_pylist()
+        for policy_id in self._row_of.keys() & set(refs):
+            self.cancel(policy_id)
+
+        # Lokacije in privzete vsote se razrešijo enkrat za vsako različno vrednost
+        locations = table.column("location").combine_chunks()
+        if not pa.types.is_dictionary(locations.type):
+            locations = pc.dictionary_encode(locations)
+        resolved = [self.resolve(name) if name else None for name in locations.dictionary.to_pylist()]
+        coordinates = np.array([point or (np.nan, np.nan) for point in resolved] + [(np.nan, np.nan)])
+        location_codes = locations.indices.fill_null(len(coordinates) - 1).to_numpy()
+        latitudes, longitudes = coordinates[location_codes].T
+        known = ~np.isnan(latitudes)
+        if not known.all():
+            logger.warning(f"{int((~known).sum())} polic nima znane lokacije in niso v indeksu kopičenja")
+
+        policy_types = pc.dictionary_encode(table.column("policy_type")).combine_chunks()
+        type_sums = np.array(
+            [DEFAULT_SUM_INSURED.get(name, 50000.0) for name in policy_types.dictionary.to_pylist()]
+            + [50000.0]
+        )
+        type_codes = policy_types.indices.fill_null(len(type_sums) - 1).to_numpy()
+        sums = to_numpy(table.column("sum_insured"))
+        sums = np.where(np.isnan(sums), type_sums[type_codes], sums)
+        masks = remap_perils(to_numpy(table.column("peril_mask"), 0).astype(np.int64),
+                             snapshot.perils, self.perils)
+
+        return self.add_many(
+            [ref for ref, keep in zip(refs, known.tolist()) if keep], latitudes[known], longitudes[known],
+            sums[known], to_numpy(table.column("exposure_score"), 0.0)[known], masks[known]
+        )
+
+    def query(self, lat: float, lon: float, radius_km: float) -> Dict:
+        """Seštevki vseh polic in po nevarnostih znotraj radius_km od točke"""
+        totals = np.zeros(self._shape)
+        delta_lat = radius_km / KM_PER_DEGREE
+        # Stopinja dolžine je najkrajša na širini, najbolj oddaljeni od ekvatorja
+        widest = min(89.9, abs(lat) + delta_lat)
+        delta_lon = min(180.0, radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest))))
+
+        rows, columns = self._grid.shape[:2]
+        low_i = max(int(math.floor((lat - delta_lat) / self._cell_lat)), self._grid_i0)
+        high_i = min(int(math.floor((lat + delta_lat) / self._cell_lat)), self._grid_i0 + rows - 1)
+        low_j = max(int(math.floor((lon - delta_lon) / self._cell_lon)), self._grid_j0)
+        high_j = min(int(math.floor((lon + delta_lon) / self._cell_lon)), self._grid_j0 + columns - 1)
+
+        if self._outlier_count:
+            points = self._outliers[:self._outlier_count]
+            within = haversine_km(lat, lon, self._point_lat[points], self._point_lon[points]) <= radius_km
+            totals += self._point_totals[points[within]].sum(axis=0)
+
+        if low_i <= high_i and low_j <= high_j:
+            edges_lat = np.arange(low_i, high_i + 2) * self._cell_lat
+            edges_lon = np.arange(low_j, high_j + 2) * self._cell_lon
+            # Najbolj oddaljena točka celice je vedno eno od oglišč
+            corners = haversine_km(lat, lon, edges_lat[:, None], edges_lon[None, :]) <= radius_km
+            inside = corners[:-1, :-1] & corners[1:, :-1] & corners[:-1, 1:] & corners[1:, 1:]
+
+            block = (slice(low_i - self._grid_i0, high_i - self._grid_i0 + 1),
+                     slice(low_j - self._grid_j0, high_j - self._grid_j0 + 1))
+            totals += self._grid[block][inside].sum(axis=0)
+
+            # Robne celice: vsaj del celice je v krogu (najbližja točka celice)
+            nearest = haversine_km(
+                lat, lon,
+                np.clip(lat, edges_lat[:-1], edges_lat[1:])[:, None],
+                np.clip(lon, edges_lon[:-1], edges_lon[1:])[None, :]
+            )
+            boundary = self._occupied[block] & ~inside & (nearest <= radius_km * 1.001 + 0.01)
+            cell_i, cell_j = np.nonzero(boundary)
+            if len(cell_i):
+                points = np.concatenate([
+                    self._cell_array((low_i + i, low_j + j))
+                    for i, j in zip(cell_i.tolist(), cell_j.tolist())
+                ])
+                within = haversine_km(lat, lon, self._point_lat[points], self._point_lon[points]) <= radius_km
+                totals += self._point_totals[points[within]].sum(axis=0)
+
+        return {
+            "center": {"lat": lat, "lon": lon},
+            "radius_km": radius_km,
+            "total": _summary(totals[0]),
+            "by_peril": {peril: _summary(totals[index]) for index, peril in enumerate(self.perils, start=1)}
+        }
+
+    def query_location(self, location, radius_km: float) -> Optional[Dict]:
+        coordinates = self.resolve(location)
+        if coordinates is None:
+            return None
+        result = self.query(coordinates[0], coordinates[1], radius_km)
+        result["location"] = location if isinstance(location, str) else None
+        return result
+
+    def _points_for(self, keys: np.ndarray) -> np.ndarray:
+        """Indeksi točk za ključe koordinat; nove točke se dodajo v mrežo ali med oddaljene točke"""
+        get = self._point_index.get
+        points = [get(key) for key in keys.tolist()]
+        missing = [position for position, point in enumerate(points) if point is None]
+        if missing:
+            new_keys = keys[missing]
+            start = self._point_count
+            end = start + len(missing)
+            lats = (new_keys // _LON_SPAN) / _PRECISION - 90.0
+            lons = (new_keys % _LON_SPAN) / _PRECISION - 180.0
+            cell_i = np.floor(lats / self._cell_lat).astype(np.intp)
+            cell_j = np.floor(lons / self._cell_lon).astype(np.intp)
+            low_i, high_i, low_j, high_j = self._window
+            dense = (cell_i >= low_i) & (cell_i <= high_i) & (cell_j >= low_j) & (cell_j <= high_j)
+            if dense.any():
+                self._ensure_grid(cell_i[dense].min(), cell_i[dense].max(),
+                                  cell_j[dense].min(), cell_j[dense].max())
+
+            self._point_lat = _append(self._point_lat, lats, start)
+            self._point_lon = _append(self._point_lon, lons, start)
+            self._point_i = _append(self._point_i, cell_i, start)
+            self._point_j = _append(self._point_j, cell_j, start)
+            self._point_totals = _append(self._point_totals, np.zeros((len(missing),) + self._shape), start)
+            self._point_dense = _append(self._point_dense, dense, start)
+            self._point_count = end
+            self._point_index.update(zip(new_keys.tolist(), range(start, end)))
+            for position, point in zip(missing, range(start, end)):
+                points[position] = point
+
+            outliers = np.flatnonzero(~dense) + start
+            if len(outliers):
+                self._outliers = _append(self._outliers, outliers, self._outlier_count)
+                self._outlier_count += len(outliers)
+
+            self._occupied[cell_i[dense] - self._grid_i0, cell_j[dense] - self._grid_j0] = True
+            order = np.flatnonzero(dense)[np.lexsort((cell_j[dense], cell_i[dense]))]
+            cells = np.column_stack((cell_i[order], cell_j[order]))
+            boundaries = np.flatnonzero(np.any(cells[1:] != cells[:-1], axis=1)) + 1
+            for group in np.split(order, boundaries) if len(order) else ():
+                cell = (int(cell_i[group[0]]), int(cell_j[group[0]]))
+                self._cell_points.setdefault(cell, []).extend((group + start).tolist())
+                self._cell_arrays.pop(cell, None)
+        return np.array(points, dtype=np.intp)
+
+    def _ensure_grid(self, low_i: int, high_i: int, low_j: int, high_j: int) -> None:
+        rows, columns = self._grid.shape[:2]
+        if (rows and low_i >= self._grid_i0 and high_i < self._grid_i0 + rows
+                and low_j >= self._grid_j0 and high_j < self._grid_j0 + columns):
+            return
+
+        # Mreža se razširi z rezervo, da se ob novih točkah ne povečuje prepogosto
+        margin = 16
+        if rows:
+            low_i, high_i = min(low_i, self._grid_i0), max(high_i, self._grid_i0 + rows - 1)
+            low_j, high_j = min(low_j, self._grid_j0), max(high_j, self._grid_j0 + columns - 1)
+        window_low_i, window_high_i, window_low_j, window_high_j = self._window
+        low_i, high_i = max(low_i - margin, window_low_i), min(high_i + margin, window_high_i)
+        low_j, high_j = max(low_j - margin, window_low_j), min(high_j + margin, window_high_j)
+
+        grid = np.zeros((high_i - low_i + 1, high_j - low_j + 1) + self._shape)
+        occupied = np.zeros(grid.shape[:2], dtype=bool)
+        if rows:
+            offset = (slice(self._grid_i0 - low_i, self._grid_i0 - low_i + rows),
+                      slice(self._grid_j0 - low_j, self._grid_j0 - low_j + columns))
+            grid[offset] = self._grid
+            occupied[offset] = self._occupied
+        self._grid, self._occupied = grid, occupied
+        self._grid_i0, self._grid_j0 = low_i, low_j
+
+    def _cell_array(self, cell: Tuple[int, int]) -> np.ndarray:
+        points = self._cell_arrays.get(cell)
+        if points is None:
+            points = self._cell_arrays[cell] = np.array(self._cell_points[cell], dtype=np.intp)
+        return points
+
+def _point_keys(latitudes, longitudes) -> np.ndarray:
+    """Celoštevilski ključ zaokroženih koordinat (hitrejši np.unique kot po parih)"""
+    lat = np.rint((np.asarray(latitudes, dtype=float) + 90.0) * _PRECISION).astype(np.int64)
+    lon = np.rint((np.asarray(longitudes, dtype=float) + 180.0) * _PRECISION).astype(np.int64)
+    return lat * _LON_SPAN + lon
+
+def _append(array: np.ndarray, values: np.ndarray, used: int) -> np.ndarray:
+    """Doda vrednosti za prvih used elementov; zmogljivost se po potrebi podvoji"""
+    needed = used + len(values)
+    if needed > len(array):
+        grown = np.zeros((max(needed, 2 * len(array), 64),) + array.shape[1:], dtype=array.dtype)
+        grown[:used] = array[:used]
+        array = grown
+    array[used:needed] = values
+    return array
+
+def _summary(totals: np.ndarray) -> Dict:
+    count = int(round(totals[_COUNT]))
+    return {
+        "policies": count,
+        "sum_insured": round(float(totals[_SUM_INSURED]), 2),
+        "exposed_value": round(float(totals[_EXPOSED]), 2),
+        "exposure_mean": round(float(totals[_SCORE]) / count, 4) if count else 0.0
+    }
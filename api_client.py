@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Statusi, pri katerih je ponovni poskus smiseln
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class APIError(Exception):
+    """Napaka pri klicu zunanjega API-ja"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+class TTLCache:
+    """Omejen predpomnilnik z rokom veljavnosti vnosov"""
+
+    def __init__(self, ttl: float = 3600.0, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+class APIClient:
+    """Asinhroni HTTP odjemalec s skupno sejo, ponovnimi poskusi in predpomnilnikom"""
+
+    # Ena seja (in bazen povezav) na proces in zanko dogodkov
+    _sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+
+    def __init__(self, timeout: float = 10.0, retries: int = 3, backoff: float = 0.5,
+                 cache_ttl: float = 3600.0, cache_size: int = 1024, pool_size: int = 100):
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.cache = TTLCache(ttl=cache_ttl, max_size=cache_size)
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Vrne skupno sejo trenutne zanke in jo po potrebi ustvari"""
+        cls = type(self)
+        loop = asyncio.get_running_loop()
+        session = cls._sessions.get(loop)
+        if session is None or session.closed:
+            # Seje zanek, ki so se medtem zaprle (npr. po asyncio.run), se zaprejo
+            await cls._close_sessions(lambda session_loop: session_loop.is_closed())
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            session = cls._sessions[loop] = aiohttp.ClientSession(connector=connector)
+        return session
+
+    @classmethod
+    async def close(cls) -> None:
+        """Zapre skupne seje (npr. ob zaustavitvi strežnika)"""
+        await cls._close_sessions(lambda session_loop: True)
+
+    @classmethod
+    async def _close_sessions(cls, select) -> None:
+        current = asyncio.get_running_loop()
+        for session_loop, session in list(cls._sessions.items()):
+            if not select(session_loop):
+                continue
+            del cls._sessions[session_loop]
+            if session.closed:
+                continue
+            try:
+                if session_loop is not current and session_loop.is_running():
+                    # Seja druge niti se zapre v njeni zanki
+                    asyncio.run_coroutine_threadsafe(session.close(), session_loop)
+                else:
+                    # Pri zaprti zanki so povezave že prekinjene, seja se le označi kot zaprta
+                    await session.close()
+            except Exception as e:
+                logger.warning(f"Seje HTTP odjemalca ni bilo mogoče zapreti: {str(e)}")
+
+    async def request_json(self, method: str, url: str, *,
+                           params: Optional[Dict] = None,
+                           json_body: Optional[Dict] = None,
+                           headers: Optional[Dict] = None,
+                           cache_key: Optional[Hashable] = None,
+                           timeout: Optional[float] = None) -> Dict:
+        """Izvede HTTP zahtevo in vrne odgovor v obliki JSON"""
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        session = await self.get_session()
+        call_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else self.timeout
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.retries + 1):
+            try:
+                async with session.request(method, url, params=params, json=json_body,
+                                           headers=headers, timeout=call_timeout) as response:
+                    if response.status >= 400:
+                        body = await response.text()
+                        raise APIError(
+                            f"{url} je vrnil status {response.status}: {body[:200]}",
+                            status=response.status
+                        )
+                    result = await response.json(content_type=None)
+                break
+            except APIError as e:
+                # Napake odjemalca (razen 429) se ne ponavljajo
+                if e.status not in RETRY_STATUSES:
+                    raise
+                last_error = e
+            except (aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError) as e:
+                last_error = e
+
+            if attempt < self.retries:
+                delay = self.backoff * (2 ** attempt)
+                logger.warning(f"Ponovni poskus klica {url} čez {delay:.2f} s: {str(last_error)}")
+                await asyncio.sleep(delay)
+        else:
+            raise APIError(f"Klic {url} ni uspel po {self.retries + 1} poskusih: {str(last_error)}")
+
+        if cache_key is not None:
+            self.cache.set(cache_key, result)
+        return result
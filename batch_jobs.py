@@ -0,0 +1,311 @@
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from batch_pipeline import BatchPipeline
+from executor import worker_agents
+from job_queue import Lease, create_job_queue, default_worker_id
+from result_cache import file_digest
+
+if TYPE_CHECKING:
+    from portfolio_store import PortfolioWriter
+
+logger = logging.getLogger(__name__)
+
+def chunk_path(output_dir: str, chunk_no: int) -> str:
+    return os.path.join(output_dir, f"chunk-{chunk_no:06d}.jsonl")
+
+def encode_rows(rows: List[Tuple[int, Dict]]) -> bytes:
+    return zlib.compress(json.dumps(rows, ensure_ascii=False).encode("utf-8"), 1)
+
+def decode_rows(payload: bytes) -> List[Tuple[int, Dict]]:
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+def submit(queue, input_path: str, output_dir: str, job_id: Optional[str] = None,
+           chunk_size: int = 1000, max_attempts: int = 3, slow_row_seconds: float = 1.0,
+           export: Optional[str] = None, export_format: str = "arrow") -> Dict:
+    """Razdeli vhodno datoteko na kose in jih doda v vrsto.
+
+    Privzeti identifikator posla je zgoščena vrednost vhodne datoteke, zato
+    ponovni zagon po zrušitvi koordinatorja nadaljuje isti posel: kosi, ki
+    so že v vrsti ali obdelani, se ne dodajo znova.
+    """
+    digest = file_digest(input_path)
+    job_id = job_id or digest[:16]
+    spec = {
+        "input": os.path.abspath(input_path),
+        "digest": digest,
+        "output": os.path.abspath(output_dir),
+        "chunk_size": chunk_size,
+        "slow_row_seconds": slow_row_seconds,
+        "export": os.path.abspath(export) if export else None,
+        "export_format": export_format
+    }
+    if not queue.create_job(job_id, spec, max_attempts):
+        existing = queue.job(job_id)
+        if existing["spec"]["digest"] != digest:
+            raise ValueError(f"Posel {job_id} že obstaja za drugo vhodno datoteko")
+        if existing["total_chunks"] is not None:
+            logger.info(f"Posel {job_id} je že v celoti v vrsti")
+            return queue.status(job_id)
+    os.makedirs(output_dir, exist_ok=True)
+
+    rows = enumerate(BatchPipeline.read_inquiries(input_path))
+    chunks = ((chunk_no, chunk) for chunk_no, chunk in enumerate(
+        iter(lambda: list(islice(rows, chunk_size)), [])
+    ))
+    total = 0
+    while True:
+        # Kosi se v vrsto dodajajo v paketih, vhod pa se bere sproti
+        batch = [(chunk_no, len(chunk), encode_rows(chunk)) for chunk_no, chunk in islice(chunks, 100)]
+        if not batch:
+            break
+        queue.add_chunks(job_id, batch)
+        total += len(batch)
+    queue.seal(job_id, total)
+    logger.info(f"Posel {job_id}: {total} kosov po {chunk_size} vrstic v vrsti")
+    return queue.status(job_id)
+
+def merge(queue, job_id: str, output_path: str, partial: bool = False) -> Dict:
+    """Združi kose v eno datoteko JSONL v izvirnem vrstnem redu vrstic"""
+    status = queue.status(job_id)
+    if status is None:
+        raise KeyError(f"Posla {job_id} ni v vrsti")
+    if not status["complete"] and not partial:
+        raise RuntimeError(f"Posel {job_id} še ni zaključen: {status['chunks']}")
+
+    rows = 0
+    with open(output_path, "w", encoding="utf-8") as output:
+        for chunk_no in queue.done_chunks(job_id):
+            with open(chunk_path(status["output"], chunk_no), "r", encoding="utf-8") as handle:
+                for line in handle:
+                    output.write(line)
+                    rows += 1
+    return {"job_id": job_id, "rows": rows, "output": output_path}
+
+class JobWorker:
+    """Delavec, ki iz vrste jemlje kose in jih obdela z verigo agentov.
+
+    Rezultat kosa se zapiše v začasno datoteko in nato atomsko preimenuje v
+    chunk-NNNNNN.jsonl, šele potem se kos v vrsti potrdi. Ponovna obdelava
+    istega kosa (po poteku zakupa) datoteko le zamenja, zato je kontrolna
+    točka idempotentna. Med obdelavo dolgih kosov se zakup podaljšuje.
+    """
+
+    def __init__(self, queue, worker_id: Optional[str] = None, lease_seconds: float = 300.0,
+                 retry_delay: float = 5.0, idle_sleep: float = 1.0):
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self.idle_sleep = idle_sleep
+        self._jobs: Dict[str, Dict] = {}
+        self._exporters: Dict[str, "PortfolioWriter"] = {}
+        self.stats = {"chunks": 0, "rows": 0, "failed_rows": 0, "failed_chunks": 0, "busy_seconds": 0.0}
+
+    @classmethod
+    def from_env(cls, queue=None, worker_id: Optional[str] = None) -> "JobWorker":
+        return cls(
+            queue or create_job_queue(),
+            worker_id=worker_id,
+            lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "300")),
+            retry_delay=float(os.getenv("JOB_RETRY_DELAY", "5"))
+        )
+
+    def run(self, max_chunks: Optional[int] = None, exit_when_idle: bool = False) -> Dict:
+        """Obdeluje kose, dokler jih je v vrsti (z exit_when_idle) ali do max_chunks kosov.
+
+        Z exit_when_idle delavec konča šele, ko ni več čakajočih ali zakupljenih
+        kosov, zato počaka tudi na ponovni poskus kosa z napako.
+        """
+        started = time.perf_counter()
+        processed = 0
+        self.queue.heartbeat(self.worker_id, self.stats)
+        try:
+            while max_chunks is None or processed < max_chunks:
+                lease = self.queue.lease(self.worker_id, self.lease_seconds)
+                if lease is None:
+                    if exit_when_idle and not self.queue.has_work():
+                        break
+                    self.queue.heartbeat(self.worker_id, self.stats)
+                    time.sleep(self.idle_sleep)
+                    continue
+                self.process(lease)
+                processed += 1
+        finally:
+            for exporter in self._exporters.values():
+                exporter.close()
+
+        elapsed = time.perf_counter() - started
+        return {**self.stats, "worker_id": self.worker_id, "elapsed_seconds": round(elapsed, 3)}
+
+    def process(self, lease: Lease) -> bool:
+        """Obdela en zakupljen kos; vrne True, če je bil kos potrjen"""
+        started = time.perf_counter()
+        try:
+            spec = self._job_spec(lease.job_id)
+            rows = decode_rows(lease.payload)
+            exporter = self._exporter(lease.job_id, spec)
+            pipeline = BatchPipeline(slow_row_seconds=spec["slow_row_seconds"], **worker_agents())
+            path = chunk_path(spec["output"], lease.chunk_no)
+            staging = f"{path}.{self.worker_id}.tmp"
+
+            failed = 0
+            results = []
+            renewed = time.monotonic()
+            with open(staging, "w", encoding="utf-8") as output:
+                for index, row in rows:
+                    line, row_failed, _, stored = pipeline.process_record(index, row, exporter is not None)
+                    output.write(line)
+                    output.write("\n")
+                    failed += row_failed
+                    if stored is not None:
+                        results.append(stored)
+                    if time.monotonic() - renewed > self.lease_seconds / 3:
+                        if not self.queue.renew(lease, self.lease_seconds):
+                            raise RuntimeError("Zakup kosa je prevzel drug delavec")
+                        renewed = time.monotonic()
+            os.replace(staging, path)
+            if exporter is not None:
+                # Ponovljen kos doda nove vrstice; PortfolioSnapshot upošteva zadnji osnutek
+                for stored in results:
+                    exporter.add(stored, stored["location"], stored["sum_insured"], spec["digest"][:16])
+                exporter.flush()
+        except Exception as e:
+            state = self.queue.fail(lease, str(e), self.retry_delay)
+            self.stats["failed_chunks"] += 1
+            logger.error(f"Kos {lease.job_id}/{lease.chunk_no} (poskus {lease.attempts}) ni uspel, "
+                         f"stanje {state}: {str(e)}")
+            return False
+
+        seconds = time.perf_counter() - started
+        completed = self.queue.complete(lease, {
+            "worker_id": self.worker_id, "rows": len(rows), "failed": failed, "seconds": seconds
+        })
+        if not completed:
+            # Zakup je potekel in kos je prevzel drug delavec; datoteka je enaka
+            logger.warning(f"Kos {lease.job_id}/{lease.chunk_no} je že zaključil drug delavec")
+            return False
+
+        self.stats["chunks"] += 1
+        self.stats["rows"] += len(rows)
+        self.stats["failed_rows"] += failed
+        self.stats["busy_seconds"] = round(self.stats["busy_seconds"] + seconds, 3)
+        self.queue.heartbeat(self.worker_id, self.stats)
+        logger.info(f"Delavec {self.worker_id}: kos {lease.job_id}/{lease.chunk_no}, {len(rows)} vrstic "
+                    f"v {seconds:.2f} s ({len(rows) / seconds if seconds else 0.0:.1f} vrstic/s)")
+        return True
+
+    def _job_spec(self, job_id: str) -> Dict:
+        spec = self._jobs.get(job_id)
+        if spec is None:
+            spec = self._jobs[job_id] = self.queue.job(job_id)["spec"]
+            os.makedirs(spec["output"], exist_ok=True)
+        return spec
+
+    def _exporter(self, job_id: str, spec: Dict) -> Optional["PortfolioWriter"]:
+        if not spec.get("export"):
+            return None
+        exporter = self._exporters.get(job_id)
+        if exporter is None:
+            from portfolio_store import PortfolioWriter
+
+            agents = worker_agents()
+            exporter = self._exporters[job_id] = PortfolioWriter(
+                spec["export"],
+                agents["underwriter"].rating_engine.perils,
+                [factor for factors in agents["risk_exposure"].risk_factors.values() for factor in factors],
+                format=spec["export_format"],
+                rows_per_file=int(os.getenv("PORTFOLIO_ROWS_PER_FILE", "100000"))
+            )
+        return exporter
+
+def _run_worker(queue_url: Optional[str], worker_id: Optional[str], max_chunks: Optional[int],
+                exit_when_idle: bool) -> Dict:
+    """Vstopna točka delovnega procesa: vsak proces ima svojo povezavo na vrsto"""
+    from log_pipeline import configure_logging_from_env
+
+    configure_logging_from_env(console=True)
+    return JobWorker.from_env(create_job_queue(queue_url), worker_id).run(max_chunks, exit_when_idle)
+
+def run_workers(queue_url: Optional[str], processes: int, max_chunks: Optional[int] = None,
+                exit_when_idle: bool = False) -> List[Dict]:
+    """Zažene več delavcev na tem stroju; vsak je samostojen proces z lastnimi agenti"""
+    if processes <= 1:
+        return [JobWorker.from_env(create_job_queue(queue_url)).run(max_chunks, exit_when_idle)]
+
+    base = default_worker_id()
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        return pool.starmap(_run_worker, [
+            (queue_url, f"{base}-{number}", max_chunks, exit_when_idle) for number in range(processes)
+        ])
+
+def main(argv: Optional[list] = None) -> int:
+    import argparse
+
+    from log_pipeline import configure_logging_from_env
+
+    parser = argparse.ArgumentParser(description="Porazdeljena paketna obdelava: koordinator in delavci")
+    parser.add_argument("--queue", default=None,
+                        help="Naslov vrste (sqlite:///jobs.sqlite3 ali redis://strežnik:6379/0), privzeto JOB_QUEUE_URL")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = commands.add_parser("submit", help="Razdeli vhodno datoteko na kose in jih doda v vrsto")
+    submit_parser.add_argument("input", help="Vhodna CSV ali JSONL datoteka")
+    submit_parser.add_argument("output", help="Mapa za rezultate kosov (dostopna vsem delavcem)")
+    submit_parser.add_argument("--job", help="Identifikator posla (privzeto zgoščena vrednost vhoda)")
+    submit_parser.add_argument("--chunk-size", type=int, default=int(os.getenv("JOB_CHUNK_SIZE", "1000")))
+    submit_parser.add_argument("--max-attempts", type=int, default=int(os.getenv("JOB_MAX_ATTEMPTS", "3")))
+    submit_parser.add_argument("--export", metavar="MAPA", help="Rezultate doda tudi v stolpčni portfelj")
+    submit_parser.add_argument("--export-format", choices=("arrow", "parquet"),
+                               default=os.getenv("PORTFOLIO_FORMAT", "arrow"))
+
+    worker_parser = commands.add_parser("worker", help="Obdeluje kose iz vrste")
+    worker_parser.add_argument("--processes", type=int, default=1, help="Število delavcev na tem stroju")
+    worker_parser.add_argument("--max-chunks", type=int, default=None)
+    worker_parser.add_argument("--exit-when-idle", action="store_true",
+                               help="Konča, ko v vrsti ni več čakajočih ali zakupljenih kosov")
+
+    status_parser = commands.add_parser("status", help="Napredek posla in prepustnost delavcev")
+    status_parser.add_argument("job")
+
+    merge_parser = commands.add_parser("merge", help="Združi rezultate kosov v eno datoteko JSONL")
+    merge_parser.add_argument("job")
+    merge_parser.add_argument("output")
+    merge_parser.add_argument("--partial", action="store_true", help="Združi tudi nedokončan posel")
+
+    retry_parser = commands.add_parser("retry", help="Vrne neuspele kose v vrsto")
+    retry_parser.add_argument("job")
+    args = parser.parse_args(argv)
+
+    configure_logging_from_env(console=True)
+    if args.command == "worker":
+        result = run_workers(args.queue, args.processes, args.max_chunks, args.exit_when_idle)
+    else:
+        queue = create_job_queue(args.queue)
+        if args.command == "submit":
+            result = submit(queue, args.input, args.output, args.job, args.chunk_size,
+                            args.max_attempts, export=args.export, export_format=args.export_format)
+        elif args.command == "status":
+            result = queue.status(args.job)
+            if result is None:
+                print(f"Posla {args.job} ni v vrsti", file=sys.stderr)
+                return 1
+        elif args.command == "merge":
+            result = merge(queue, args.job, args.output, args.partial)
+        else:
+            result = {"job_id": args.job, "retried": queue.retry_dead(args.job)}
+        queue.close()
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+import contextvars
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from mga_analyst import MGAAnalyst
+from underwriter import Underwriter
+from policy_manager import PolicyManager
+from risk_exposure import RiskExposure
+from executor import AgentExecutor, worker_agents
+from repository import PolicyRepository, create_connection_manager
+from log_pipeline import configure_logging_from_env, correlation
+from result_cache import file_digest
+
+if TYPE_CHECKING:
+    from portfolio_store import PortfolioWriter
+
+logger = logging.getLogger(__name__)
+
+# Stolpci, v katerih iščemo besedilo povpraševanja
+TEXT_COLUMNS = ("text", "inquiry", "povprasevanje", "povpraševanje", "opis")
+
+def export_source(input_path: str) -> str:
+    """Oznaka vhodne datoteke za policy_ref v stolpčnem portfelju (prvih 16 znakov SHA-256)"""
+    return file_digest(input_path)[:16]
+
+class BatchPipeline:
+    """Paketna obdelava povpraševanj skozi celotno verigo agentov.
+
+    Z row_timeout > 0 se vsaka vrstica obdela v ločeni niti; vrstica, ki v
+    tem času ne konča, se zapiše kot napaka, obdelava pa se nadaljuje z
+    naslednjo. Zataknjene niti Python ne more prekiniti, zato ostane v
+    ozadju, dokler ne konča sama.
+    """
+
+    def __init__(self, mga_analyst: Optional[MGAAnalyst] = None,
+                 underwriter: Optional[Underwriter] = None,
+                 policy_manager: Optional[PolicyManager] = None,
+                 risk_exposure: Optional[RiskExposure] = None,
+                 report_every: int = 1000,
+                 slow_row_seconds: float = 1.0,
+                 row_timeout: float = 0.0,
+                 executor: Optional[AgentExecutor] = None,
+                 repository: Optional[PolicyRepository] = None,
+                 exporter: Optional["PortfolioWriter"] = None):
+        self.mga_analyst = mga_analyst or MGAAnalyst()
+        self.underwriter = underwriter or Underwriter()
+        self.policy_manager = policy_manager or PolicyManager()
+        self.risk_exposure = risk_exposure or RiskExposure()
+        self.report_every = report_every
+        self.slow_row_seconds = slow_row_seconds
+        self.row_timeout = row_timeout
+        self.executor = executor
+        self.repository = repository
+        self.exporter = exporter
+
+    @staticmethod
+    def read_inquiries(path: str) -> Iterator[Dict]:
+        """Vrstico za vrstico bere povpraševanja iz CSV ali JSONL datoteke"""
+        extension = os.path.splitext(path)[1].lower()
+        with open(path, "r", encoding="utf-8", newline="") as handle:
+            if extension in (".jsonl", ".ndjson"):
+                for line in handle:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+            elif extension == ".csv":
+                for row in csv.DictReader(handle):
+                    yield row
+            else:
+                raise ValueError(f"Nepodprt format datoteke: {extension}")
+
+    def process_row(self, row: Dict) -> Dict:
+        """Obdela eno povpraševanje skozi vse faze verige"""
+        text = self._extract_text(row)
+        mga_results = self.mga_analyst.analyze_input(text)
+        risk_eval = self.underwriter.evaluate_risk(mga_results)
+        policy = self.policy_manager.create_policy_draft(risk_eval)
+        # Dodatni stolpci vrstice (npr. starost_vozila) so faktorji tveganja
+        exposure = self.risk_exposure.calculate_exposure(
+            {**self._coerce_factors(row), **policy.to_dict()}
+        )
+
+        return {
+            "analysis": mga_results.to_dict(),
+            "risk_evaluation": risk_eval.to_dict(),
+            "policy": policy.to_dict(),
+            "exposure": exposure.to_dict()
+        }
+
+    def process_record(self, index: int, row: Dict,
+                       keep_results: bool = False) -> Tuple[str, bool, bool, Optional[Dict]]:
+        """Obdela vrstico in vrne (vrstica JSONL, napaka, počasna vrstica, rezultati za shranjevanje)"""
+        row_started = time.perf_counter()
+        record = {"row": index, "id": row.get("id", index)}
+        failed = False
+        with correlation(f"row-{record['id']}"):
+            try:
+                if self.row_timeout > 0:
+                    record.update(self._process_row_bounded(row))
+                else:
+                    record.update(self.process_row(row))
+            except Exception as e:
+                # Napaka v eni vrstici ne ustavi obdelave datoteke
+                logger.error(f"Napaka pri obdelavi vrstice {index}: {str(e)}")
+                record["error"] = str(e)
+                failed = True
+
+            row_elapsed = time.perf_counter() - row_started
+            slow = row_elapsed > self.slow_row_seconds
+            if slow:
+                logger.warning(f"Počasna vrstica {index}: {row_elapsed:.2f} s")
+
+        results = None
+        if keep_results and not failed:
+            # Lokacija in zavarovalna vsota iz vhodne vrstice se shranita ob rezultatih
+            results = {**record, "location": row.get("location"), "sum_insured": row.get("sum_insured")}
+
+        return json.dumps(record, ensure_ascii=False, default=str), failed, slow, results
+
+    def _process_row_bounded(self, row: Dict) -> Dict:
+        """Obdela vrstico v niti in čaka največ row_timeout sekund"""
+        outcome: Dict = {}
+        context = contextvars.copy_context()
+
+        def target() -> None:
+            try:
+                outcome["result"] = context.run(self.process_row, row)
+            except Exception as e:
+                outcome["error"] = e
+
+        thread = threading.Thread(target=target, name="batch-row", daemon=True)
+        thread.start()
+        thread.join(self.row_timeout)
+        if thread.is_alive():
+            raise TimeoutError(f"Vrstica ni bila obdelana v {self.row_timeout:g} s")
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    def run(self, input_path: str, output_path: str) -> Dict:
+        """Obdela celotno datoteko in rezultate sproti zapisuje v JSONL"""
+        stats = {"rows": 0, "succeeded": 0, "failed": 0, "slow_rows": 0}
+        started = time.perf_counter()
+
+        keep_results = self.repository is not None or self.exporter is not None
+        rows = enumerate(self.read_inquiries(input_path))
+        if self.executor is not None:
+            # Kosi vrstic se obdelujejo vzporedno, rezultati ohranijo vrstni red
+            results = self.executor.map_chunks(
+                partial(_process_chunk, self.slow_row_seconds, self.row_timeout, keep_results), rows
+            )
+        else:
+            results = (self.process_record(index, row, keep_results) for index, row in rows)
+
+        writer = self.repository.bulk_writer() if self.repository is not None else None
+        # Police v portfelju so označene z izvorno datoteko, enako kot posli v batch_jobs
+        source = export_source(input_path) if self.exporter is not None else None
+        with open(output_path, "w", encoding="utf-8") as output:
+            for line, failed, slow, stored in results:
+                output.write(line)
+                output.write("\n")
+                stats["rows"] += 1
+                stats["failed" if failed else "succeeded"] += 1
+                stats["slow_rows"] += slow
+                if stored is not None:
+                    if writer is not None:
+                        writer.add(stored["id"], stored["policy"], stored["exposure"])
+                    if self.exporter is not None:
+                        self.exporter.add(stored, stored["location"], stored["sum_insured"], source)
+
+                if self.report_every and stats["rows"] % self.report_every == 0:
+                    logger.info(self._format_progress(stats, started))
+
+        if writer is not None:
+            writer.flush()
+            stats["stored"] = writer.drafts_written
+            stats["stored_exposures"] = writer.exposures_written
+        if self.exporter is not None:
+            self.exporter.flush()
+            stats["exported"] = self.exporter.written
+
+        elapsed = time.perf_counter() - started
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["rows_per_second"] = round(stats["rows"] / elapsed, 2) if elapsed > 0 else 0.0
+        stats["finished_at"] = datetime.now().isoformat()
+        logger.info(self._format_progress(stats, started))
+        return stats
+
+    def _extract_text(self, row: Dict) -> str:
+        """Poišče besedilo povpraševanja v vrstici"""
+        for column in TEXT_COLUMNS:
+            if row.get(column):
+                return str(row[column])
+        raise ValueError("Vrstica ne vsebuje besedila povpraševanja")
+
+    def _coerce_factors(self, row: Dict) -> Dict:
+        """Pretvori številske vrednosti iz CSV nizov v števila"""
+        factors = {}
+        for key, value in row.items():
+            if key in TEXT_COLUMNS or value is None:
+                continue
+            if isinstance(value, str):
+                try:
+                    value = float(value) if value.strip() else None
+                except ValueError:
+                    pass
+            if value is not None:
+                factors[key] = value
+        return factors
+
+    def _format_progress(self, stats: Dict, started: float) -> str:
+        elapsed = time.perf_counter() - started
+        rate = stats["rows"] / elapsed if elapsed > 0 else 0.0
+        return (f"Obdelanih {stats['rows']} vrstic ({stats['failed']} napak), "
+                f"{rate:.1f} vrstic/s")
+
+def _process_chunk(slow_row_seconds: float, row_timeout: float, keep_results: bool,
+                   rows: List[Tuple[int, Dict]]) -> List[Tuple[str, bool, bool, Optional[Dict]]]:
+    """Obdela kos vrstic z agenti delovnega procesa"""
+    pipeline = BatchPipeline(slow_row_seconds=slow_row_seconds, row_timeout=row_timeout,
+                             **worker_agents())
+    return [pipeline.process_record(index, row, keep_results) for index, row in rows]
+
+def main(argv: Optional[list] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Paketna obdelava zavarovalniških povpraševanj")
+    parser.add_argument("input", help="Vhodna CSV ali JSONL datoteka")
+    parser.add_argument("output", help="Izhodna JSONL datoteka")
+    parser.add_argument("--report-every", type=int, default=1000,
+                        help="Poročilo o hitrosti na vsakih N vrstic")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Število delovnih procesov (0 = obdelava v glavnem procesu)")
+    parser.add_argument("--chunk-size", type=int, default=256,
+                        help="Število vrstic v enem kosu za delovne procese")
+    parser.add_argument("--row-timeout", type=float, default=float(os.getenv("BATCH_ROW_TIMEOUT", "0")),
+                        help="Vrstica, ki ni obdelana v toliko sekundah, se zapiše kot napaka (0 = brez omejitve)")
+    parser.add_argument("--db", action="store_true",
+                        help="Osnutke in poročila shrani v bazo (nastavitve DB_* v .env)")
+    parser.add_argument("--export", metavar="MAPA",
+                        help="Osnutke in poročila doda v stolpčni portfelj (particije po tipu police in datumu)")
+    parser.add_argument("--export-format", choices=("arrow", "parquet"),
+                        default=os.getenv("PORTFOLIO_FORMAT", "arrow"),
+                        help="arrow za branje prek preslikave v pomnilnik, parquet za manjše datoteke")
+    args = parser.parse_args(argv)
+
+    # Napredek se izpisuje tudi na konzolo, zapis na disk pa ne zavira obdelave
+    configure_logging_from_env(console=True)
+
+    repository = None
+    if args.db:
+        repository = PolicyRepository(
+            create_connection_manager(),
+            batch_size=int(os.getenv("DB_BATCH_SIZE", "1000"))
+        )
+        repository.ensure_schema()
+
+    pipeline = BatchPipeline(report_every=args.report_every, row_timeout=args.row_timeout,
+                             repository=repository)
+    if args.export:
+        from portfolio_store import PortfolioWriter
+
+        pipeline.exporter = PortfolioWriter(
+            args.export,
+            pipeline.underwriter.rating_engine.perils,
+            [factor for factors in pipeline.risk_exposure.risk_factors.values() for factor in factors],
+            format=args.export_format,
+            rows_per_file=int(os.getenv("PORTFOLIO_ROWS_PER_FILE", "100000"))
+        )
+
+    if args.workers > 0:
+        pipeline.executor = AgentExecutor(mode="process", max_workers=args.workers,
+                                          chunk_size=args.chunk_size)
+        with pipeline.executor:
+            stats = pipeline.run(args.input, args.output)
+    else:
+        stats = pipeline.run(args.input, args.output)
+
+    if repository is not None:
+        repository.db.close()
+    print(json.dumps(stats, ensure_ascii=False))
+    return 0 if stats["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Merilni skripti zmogljivosti (zagon iz korena repozitorija: python -m benchmarks.<ime>)
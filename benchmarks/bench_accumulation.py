@@ -0,0 +1,72 @@
+import argparse
+import time
+from typing import Dict
+
+import numpy as np
+
+from accumulation import AccumulationIndex, haversine_km, load_municipalities
+from underwriter import Underwriter
+
+def _portfolio(count: int, perils: int, seed: int = 42, jitter_km: float = 5.0) -> Dict[str, np.ndarray]:
+    """Sintetični portfelj okoli občinskih središč (polovica polic z natančnimi koordinatami)"""
+    rng = np.random.default_rng(seed)
+    centers = np.array(list(load_municipalities().values()))
+    chosen = centers[rng.integers(0, len(centers), count)]
+    # Polovica polic je geokodirana le na občino, ostale imajo lastne koordinate
+    jitter = rng.normal(0.0, jitter_km / 111.0, (count, 2)) * (rng.random(count) < 0.5)[:, None]
+    # Indeks hrani koordinate na pet decimalk (~1 m), enako tudi primerjalni pregled
+    coordinates = np.round(chosen + jitter, 5)
+    return {
+        "lat": coordinates[:, 0],
+        "lon": coordinates[:, 1],
+        "sum_insured": rng.choice([25_000.0, 50_000.0, 100_000.0, 150_000.0, 400_000.0], count),
+        "exposure": np.round(rng.random(count), 2),
+        "mask": rng.integers(0, 1 << perils, count)
+    }
+
+def _scan(portfolio: Dict[str, np.ndarray], lat: float, lon: float, radius_km: float, bit: int) -> float:
+    """Primerjava: pregled vseh polic za en scenarij"""
+    inside = haversine_km(lat, lon, portfolio["lat"], portfolio["lon"]) <= radius_km
+    inside &= (portfolio["mask"] & bit) != 0
+    return float(portfolio["sum_insured"][inside].sum())
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hitrost poizvedb kopičenja nevarnosti")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--cell-km", type=float, default=2.0)
+    args = parser.parse_args()
+
+    perils = Underwriter().rating_engine.perils
+    portfolio = _portfolio(args.count, len(perils))
+
+    index = AccumulationIndex(perils, cell_km=args.cell_km)
+    started = time.perf_counter()
+    index.add_many(range(args.count), portfolio["lat"], portfolio["lon"],
+                   portfolio["sum_insured"], portfolio["exposure"], portfolio["mask"])
+    print(f"nalaganje {args.count} polic: {time.perf_counter() - started:.2f} s")
+
+    rng = np.random.default_rng(7)
+    centers = list(load_municipalities().values())
+    for radius in (5.0, 25.0, 50.0):
+        latencies, scans = [], []
+        for _ in range(args.queries):
+            lat, lon = centers[rng.integers(0, len(centers))]
+            started = time.perf_counter()
+            result = index.query(lat, lon, radius)
+            latencies.append(time.perf_counter() - started)
+
+            if len(scans) < 5:
+                started = time.perf_counter()
+                expected = _scan(portfolio, lat, lon, radius, 1 << perils.index("poplava"))
+                scans.append(time.perf_counter() - started)
+                actual = result["by_peril"]["poplava"]["sum_insured"]
+                assert abs(actual - expected) < 0.01, (actual, expected)
+
+        latencies.sort()
+        print(f"polmer {radius:>4.0f} km: p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms, "
+              f"pregled vseh polic {np.median(scans) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+
+from llm_classifier import ClassificationCache, LLMClassifier, MockBackend
+from mga_analyst import MGAAnalyst
+
+TEXTS = [
+    "Iščem kritje za vikend ob reki, ki ga je lani zamakalo",
+    "Potrebujem zaščito za dostavno vozilo podjetja",
+    "Kaj krije polica, če me med smučanjem doleti poškodba?",
+    "Rad bi uredil pokojninsko varčevanje za otroke",
+    "Imam vprašanje o računu",
+]
+
+async def _run(classifier: LLMClassifier, count: int, concurrency: int) -> list:
+    """count zahtev, največ concurrency hkrati (kot sočasne seje vmesnika)"""
+    latencies = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with gate:
+            started = time.perf_counter()
+            await classifier.classify(f"{TEXTS[index % len(TEXTS)]} (stranka {index})")
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(index) for index in range(count)))
+    return sorted(latencies)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Obremenitveni test razvrščanja z nadomestnim modelom")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    args = parser.parse_args()
+
+    analyst = MGAAnalyst()
+    directory = tempfile.mkdtemp(prefix="llm-cache-")
+    try:
+        backend = MockBackend(latency=args.latency_ms / 1000, jitter=args.latency_ms / 4000)
+        classifier = LLMClassifier(
+            backend, list(analyst.categories), list(analyst.risk_keywords),
+            cache=ClassificationCache(directory), batch_size=args.batch_size,
+            max_in_flight=args.max_in_flight
+        )
+        for label in ("hladen predpomnilnik", "topel predpomnilnik"):
+            calls = backend.calls
+            started = time.perf_counter()
+            latencies = asyncio.run(_run(classifier, args.requests, args.concurrency))
+            elapsed = time.perf_counter() - started
+            print(f"{label}: {args.requests / elapsed:.0f} zahtev/s, "
+                  f"p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+                  f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms, "
+                  f"klicev modela {backend.calls - calls}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
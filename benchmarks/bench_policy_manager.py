@@ -0,0 +1,65 @@
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from policy_manager import PolicyManager
+from records import PolicyDraft
+
+def _evaluations(count: int, seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    policy_types = list(PolicyManager().coverage_types)
+    return [
+        {"suggested_policy": rng.choice(policy_types), "risk_score": rng.random()}
+        for _ in range(count)
+    ]
+
+def _uncached_draft(manager: PolicyManager, risk_evaluation: Dict) -> PolicyDraft:
+    """Osnutek, zgrajen od začetka ob vsakem klicu (prejšnje obnašanje)"""
+    policy_type = risk_evaluation.get("suggested_policy")
+    return PolicyDraft(
+        policy_type=policy_type,
+        created_at=datetime.now().isoformat(),
+        status="draft",
+        **manager._build_template(policy_type, risk_evaluation)
+    )
+
+def _measure(build: Callable[[Dict], PolicyDraft], evaluations: List[Dict]) -> Dict:
+    started = time.perf_counter()
+    for evaluation in evaluations:
+        build(evaluation)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    drafts = [build(evaluation) for evaluation in evaluations[:1000]]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    return {
+        "drafts_per_second": round(len(evaluations) / elapsed),
+        "bytes_per_draft": round(allocated / len(drafts))
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hitrost ustvarjanja osnutkov polic")
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args()
+
+    manager = PolicyManager()
+    evaluations = _evaluations(args.count)
+
+    uncached = _measure(lambda evaluation: _uncached_draft(manager, evaluation), evaluations)
+    cached = _measure(manager.create_policy_draft, evaluations)
+
+    print(f"brez predlog:  {uncached['drafts_per_second']:>10} osnutkov/s, "
+          f"{uncached['bytes_per_draft']} B/osnutek")
+    print(f"s predlogami:  {cached['drafts_per_second']:>10} osnutkov/s, "
+          f"{cached['bytes_per_draft']} B/osnutek")
+    print(f"pohitritev:    {cached['drafts_per_second'] / uncached['drafts_per_second']:.2f}x")
+
+if __name__ == "__main__":
+    main()
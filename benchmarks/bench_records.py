@@ -0,0 +1,61 @@
+import argparse
+import gc
+import random
+import tracemalloc
+from typing import Callable, List
+
+from records import ExposureReport, RiskFactor
+from risk_exposure import RiskExposure
+
+def _policies(count: int, seed: int = 42) -> List[dict]:
+    rng = random.Random(seed)
+    policy_types = list(RiskExposure().risk_factors)
+    return [
+        {
+            "policy_type": rng.choice(policy_types),
+            "starost": rng.randint(18, 100),
+            "starost_vozila": rng.randint(0, 20),
+            "voznikove_izkušnje": rng.choice(["začetnik", "izkušen", "profesionalec"])
+        }
+        for _ in range(count)
+    ]
+
+def _retained_bytes(build: Callable[[], list]) -> int:
+    """Izmeri pomnilnik, ki ga zaseda zgrajen seznam rezultatov"""
+    gc.collect()
+    tracemalloc.start()
+    results = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return current
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Poraba pomnilnika zapisov izpostavljenosti")
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    risk_exposure = RiskExposure()
+    policies = _policies(args.count)
+    reports: List[ExposureReport] = [risk_exposure.calculate_exposure(p) for p in policies]
+
+    # Zapisi in slovarji si delijo nize, zato primerjamo le strukture
+    as_records = _retained_bytes(lambda: [
+        ExposureReport(
+            r.exposure_score,
+            [RiskFactor(f.factor, f.score, f.weight, f.impact, f.severity) for f in r.risk_factors],
+            r.mitigation_suggestions,
+            r.analysis_timestamp,
+            r.confidence_level
+        )
+        for r in reports
+    ])
+    as_dicts = _retained_bytes(lambda: [r.to_dict() for r in reports])
+
+    print(f"slovarji: {as_dicts / args.count:>8.1f} B/poročilo")
+    print(f"zapisi:   {as_records / args.count:>8.1f} B/poročilo")
+    print(f"razmerje: {as_dicts / as_records:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# Moduli, ki jih paketna obdelava in delavci ne smejo naložiti ob zagonu
+HEAVY_MODULES = ("gradio", "plotly", "aiohttp", "pandas", "numpy", "PyPDF2", "docx", "psycopg2")
+
+PROBE = """
+import json, sys
+import main, batch_pipeline, executor
+from esg_compliance import ESGCompliance
+ESGCompliance()
+print(json.dumps(sorted(m for m in {heavy} if m in sys.modules)))
+"""
+
+def _run_once() -> tuple:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(heavy=HEAVY_MODULES)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return time.perf_counter() - started, json.loads(output.strip().splitlines()[-1])
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Čas zagona brez uporabniškega vmesnika")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="Največji dovoljen median časa zagona v sekundah")
+    args = parser.parse_args()
+
+    timings, loaded = [], set()
+    for _ in range(args.runs):
+        elapsed, heavy = _run_once()
+        timings.append(elapsed)
+        loaded.update(heavy)
+
+    median = statistics.median(timings)
+    print(f"median zagona: {median * 1000:.0f} ms (najhitreje {min(timings) * 1000:.0f} ms)")
+    if loaded:
+        print(f"NAPAKA: ob zagonu so naloženi težki moduli: {', '.join(sorted(loaded))}")
+        return 1
+    if median > args.budget:
+        print(f"NAPAKA: zagon presega proračun {args.budget:.2f} s")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
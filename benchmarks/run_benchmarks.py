@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from benchmarks import synthetic
+
+def peak_rss_kb() -> Optional[int]:
+    """Največja poraba pomnilnika celotnega procesa v KB (None, kjer ni na voljo)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS vrača bajte, Linux kilobajte
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def summarize(latencies_ns: List[int], elapsed: float) -> Dict:
+    ordered = sorted(latencies_ns)
+    count = len(ordered)
+
+    def percentile(q: float) -> float:
+        index = min(count - 1, max(0, math.ceil(q * count) - 1))
+        return round(ordered[index] / 1000, 2)
+
+    return {
+        "count": count,
+        "ops_per_second": round(count / elapsed, 2) if elapsed > 0 else None,
+        "p50_us": percentile(0.50),
+        "p95_us": percentile(0.95),
+        "p99_us": percentile(0.99),
+        "max_us": round(ordered[-1] / 1000, 2),
+    }
+
+def _start_tracing() -> int:
+    tracemalloc.start()
+    return tracemalloc.get_traced_memory()[0]
+
+def _stop_tracing(baseline: int) -> float:
+    """Največja dodatna poraba pomnilnika od začetka sledenja v KB"""
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round((peak - baseline) / 1024, 1)
+
+def measure(fn: Callable, inputs: Sequence, warmup: int = 50, memory_sample: int = 1000) -> Dict:
+    """Izmeri zakasnitev posameznih klicev sinhrone funkcije in porabo pomnilnika faze"""
+    for item in inputs[:warmup]:
+        fn(item)
+
+    latencies = []
+    clock = time.perf_counter_ns
+    started = time.perf_counter()
+    for item in inputs:
+        call_started = clock()
+        fn(item)
+        latencies.append(clock() - call_started)
+    result = summarize(latencies, time.perf_counter() - started)
+
+    # Pomnilnik se meri v ločenem prehodu, ker tracemalloc upočasni klice
+    baseline = _start_tracing()
+    for item in inputs[:memory_sample]:
+        fn(item)
+    result["peak_alloc_kb"] = _stop_tracing(baseline)
+    return result
+
+async def measure_async(fn: Callable[..., Awaitable], inputs: Sequence, warmup: int = 10,
+                        memory_sample: int = 100) -> Dict:
+    for item in inputs[:warmup]:
+        await fn(item)
+
+    latencies = []
+    clock = time.perf_counter_ns
+    started = time.perf_counter()
+    for item in inputs:
+        call_started = clock()
+        await fn(item)
+        latencies.append(clock() - call_started)
+    result = summarize(latencies, time.perf_counter() - started)
+
+    baseline = _start_tracing()
+    for item in inputs[:memory_sample]:
+        await fn(item)
+    result["peak_alloc_kb"] = _stop_tracing(baseline)
+    return result
+
+def run_agents(count: int, seed: int) -> Dict:
+    from mga_analyst import MGAAnalyst
+    from underwriter import Underwriter
+    from policy_manager import PolicyManager
+    from risk_exposure import RiskExposure
+
+    mga_analyst = MGAAnalyst()
+    underwriter = Underwriter()
+    policy_manager = PolicyManager()
+    risk_exposure = RiskExposure()
+
+    texts = [inquiry["text"] for inquiry in synthetic.inquiries(count, seed)]
+    analyses = [mga_analyst.analyze_input(text) for text in texts]
+    evaluations = [underwriter.evaluate_risk(analysis) for analysis in analyses]
+    drafts = [policy_manager.create_policy_draft(evaluation) for evaluation in evaluations]
+    policies = [
+        {**factors, **draft.to_dict()}
+        for factors, draft in zip(synthetic.policies(count, seed), drafts)
+    ]
+
+    def end_to_end(text: str) -> None:
+        analysis = mga_analyst.analyze_input(text)
+        evaluation = underwriter.evaluate_risk(analysis)
+        draft = policy_manager.create_policy_draft(evaluation)
+        risk_exposure.calculate_exposure(draft)
+
+    return {
+        "mga_analyst.analyze_input": measure(mga_analyst.analyze_input, texts),
+        "underwriter.evaluate_risk": measure(underwriter.evaluate_risk, analyses),
+        "policy_manager.create_policy_draft": measure(policy_manager.create_policy_draft, evaluations),
+        "risk_exposure.calculate_exposure": measure(risk_exposure.calculate_exposure, policies),
+        "chain.end_to_end": measure(end_to_end, texts),
+    }
+
+async def run_esg(count: int, seed: int, port: int) -> Dict:
+    """ESG analiza proti lokalnemu nadomestnemu strežniku (brez omrežja)"""
+    from esg_stub_server import start_stub_server, stub_urls
+
+    os.environ.update(stub_urls(port=port))
+    # Nadomestni strežnik sprejme katerikoli ključ; pravi ključi iz .env ne zapustijo procesa
+    os.environ.update({"CLIMATIQ_API_KEY": "benchmark", "WEATHER_API_KEY": "benchmark"})
+
+    from api_client import APIClient
+    from esg_compliance import ESGCompliance
+
+    runner = await start_stub_server(port=port)
+    try:
+        # Brez predpomnilnika se meri dejanski krog HTTP klicev
+        uncached = ESGCompliance(APIClient(cache_ttl=0))
+        cached = ESGCompliance()
+        drafts = [
+            {"policy_type": policy["policy_type"], "location": policy["location"]}
+            for policy in synthetic.policies(count, seed)
+        ]
+        return {
+            "esg_compliance.analyze_esg_impact": await measure_async(uncached.analyze_esg_impact, drafts),
+            "esg_compliance.analyze_esg_impact.cached": await measure_async(cached.analyze_esg_impact, drafts),
+        }
+    finally:
+        await APIClient.close()
+        await runner.cleanup()
+
+def compare(current: Dict, baseline: Dict) -> None:
+    """Izpiše razmerja glede na prejšnjo izdajo (>1 pomeni hitreje)"""
+    for name, result in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or not previous.get("ops_per_second"):
+            continue
+        ratio = result["ops_per_second"] / previous["ops_per_second"]
+        p99_ratio = previous["p99_us"] / result["p99_us"] if result["p99_us"] else float("inf")
+        print(f"{name:<45} ops/s {ratio:6.2f}x   p99 {p99_ratio:6.2f}x")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Merjenje zmogljivosti agentov in celotne verige")
+    parser.add_argument("--count", type=int, default=5000, help="Število sintetičnih povpraševanj")
+    parser.add_argument("--esg-count", type=int, default=500, help="Število ESG klicev")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stub-port", type=int, default=8089)
+    parser.add_argument("--skip-esg", action="store_true")
+    parser.add_argument("--output", help="Pot do JSON poročila (privzeto standardni izhod)")
+    parser.add_argument("--compare", help="JSON poročilo prejšnje izdaje za primerjavo")
+    args = parser.parse_args()
+
+    results = run_agents(args.count, args.seed)
+    if not args.skip_esg:
+        results.update(asyncio.run(run_esg(args.esg_count, args.seed, args.stub_port)))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "count": args.count,
+            "esg_count": 0 if args.skip_esg else args.esg_count,
+            "seed": args.seed,
+            # Najvišja poraba celotnega procesa; poraba posamezne faze je peak_alloc_kb
+            "process_peak_rss_kb": peak_rss_kb(),
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as handle:
+            compare(report, json.load(handle))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import random
+from typing import Dict, Iterator, Optional
+
+# Sintetični podatki v slovenščini za vse štiri kategorije zavarovanj
+
+CATEGORY_PHRASES = {
+    "avtomobilsko": [
+        "Potrebujem zavarovanje za nov avto",
+        "Iščem kasko za družinsko vozilo",
+        "Zanima me zavarovanje za motor",
+    ],
+    "nepremičninsko": [
+        "Zavarovanje za hišo v Ljubljani",
+        "Potrebujem kritje za stanovanje v bloku",
+        "Zavarujem poslovno zgradbo",
+    ],
+    "zdravstveno": [
+        "Iščem dodatno zdravstveno zavarovanje",
+        "Zanima me kritje za primer, da me doleti bolezen",
+        "Želim zavarovanje za nezgoda pri športu",
+    ],
+    "življenjsko": [
+        "Zanima me življenjsko zavarovanje za primer smrt",
+        "Iščem varčevanje z življenjskim zavarovanjem",
+        "Potrebujem kritje za življenje družine",
+    ],
+}
+
+PERIL_PHRASES = [
+    "Na območju je bil lani požar.",
+    "Hiša stoji ob reki, kjer je pogosta poplava.",
+    "V soseski je bil nedavno vlom.",
+    "Območje je potresno, potres je možen.",
+    "Skrbi me kraja opreme.",
+    "Pozimi je v kleti voda.",
+]
+
+FILLER = [
+    "Prosim za ponudbo do konca meseca.",
+    "Sem redno zaposlen in plačujem mesečno.",
+    "Imam vgrajen alarm in protipožarni sistem.",
+    "Vozim predvsem po mestu, imam pet let izkušenj.",
+    "Star sem 35 let in sem športno aktiven.",
+]
+
+LOCATIONS = ["Ljubljana", "Maribor", "Celje", "Kranj", "Koper", "Novo mesto", "Murska Sobota"]
+
+def inquiries(count: int, seed: int = 42, filler_sentences: int = 3) -> Iterator[Dict]:
+    """Generira povpraševanja z besedilom, kategorijo in lokacijo"""
+    rng = random.Random(seed)
+    categories = list(CATEGORY_PHRASES)
+    for index in range(count):
+        category = rng.choice(categories)
+        sentences = [rng.choice(CATEGORY_PHRASES[category])]
+        sentences += rng.sample(PERIL_PHRASES, rng.randint(0, 3))
+        sentences += [rng.choice(FILLER) for _ in range(filler_sentences)]
+        yield {
+            "id": index,
+            "text": " ".join(sentences),
+            "category": category,
+            "location": rng.choice(LOCATIONS),
+        }
+
+def policies(count: int, seed: int = 42, policy_type: Optional[str] = None) -> Iterator[Dict]:
+    """Generira police s faktorji tveganja, ki jih pozna RiskExposure"""
+    rng = random.Random(seed)
+    categories = list(CATEGORY_PHRASES)
+    for index in range(count):
+        yield {
+            "id": index,
+            "policy_type": policy_type or rng.choice(categories),
+            "starost": rng.randint(18, 90),
+            "starost_vozila": rng.randint(0, 25),
+            "starost_objekta": rng.randint(0, 120),
+            "voznikove_izkušnje": rng.choice(["začetnik", "izkušen", "profesionalec"]),
+            "območje_vožnje": rng.choice(["mesto", "podeželje", "avtocesta"]),
+            "location": rng.choice(LOCATIONS),
+        }
@@ -0,0 +1,127 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from portfolio_aggregator import SCORE_BINS
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+SEVERITY_COLORS = {"nizko": "#2ca02c", "srednje": "#ff7f0e", "visoko": "#d62728"}
+
+# Majhna lastna predloga namesto privzete plotly predloge (~7,5 KB), ki bi se
+# ob vsakem grafu globoko kopirala in poslala brskalniku
+CHART_TEMPLATE = {
+    "layout": {
+        "font": {"family": "Inter, Arial, sans-serif", "size": 13, "color": "#2a3f5f"},
+        "colorway": ["#636efa", "#ef553b", "#00cc96", "#ab63fa", "#ffa15a"],
+        "paper_bgcolor": "white",
+        "plot_bgcolor": "#f5f7fb",
+        "margin": {"t": 60, "r": 20, "b": 50, "l": 50},
+        "xaxis": {"gridcolor": "white", "zeroline": False},
+        "yaxis": {"gridcolor": "white", "zeroline": False}
+    }
+}
+
+ESG_AXES = ("Ogljični odtis", "Podnebna tveganja", "Skupna ESG ocena")
+
+@lru_cache(maxsize=None)
+def _base_layouts() -> Dict[str, Dict]:
+    """Postavitve grafov se preverijo enkrat, nato se le dopolnijo s podatki"""
+    import plotly.graph_objects as go
+
+    layouts = {
+        "risk": go.Layout(
+            template=CHART_TEMPLATE,
+            yaxis={"title": {"text": "Vpliv na izpostavljenost"}, "rangemode": "tozero"},
+            showlegend=False
+        ),
+        "esg": go.Layout(
+            template=CHART_TEMPLATE,
+            polar={"radialaxis": {"range": [0, 10], "visible": True}},
+            showlegend=False
+        ),
+        "portfolio": go.Layout(
+            template=CHART_TEMPLATE,
+            xaxis={"title": {"text": "Ocena izpostavljenosti"}, "range": [0, 1]},
+            yaxis={"title": {"text": "Število polic"}},
+            bargap=0.05,
+            showlegend=False
+        )
+    }
+    return {name: layout.to_plotly_json() for name, layout in layouts.items()}
+
+def _figure(kind: str, title: str, traces: List[Dict], annotation: Optional[str] = None) -> "go.Figure":
+    import plotly.graph_objects as go
+
+    layout = {**_base_layouts()[kind], "title": {"text": title}}
+    if annotation:
+        layout["annotations"] = [{
+            "text": annotation, "showarrow": False,
+            "xref": "paper", "yref": "paper", "x": 0.5, "y": 0.5
+        }]
+    # Sledi in postavitev so sestavljene iz že preverjenih delov, zato
+    # ponovno preverjanje (večina časa gradnje grafa) ni potrebno
+    return go.Figure({"data": traces, "layout": layout}, _validate=False)
+
+def risk_figure(exposure: Dict) -> "go.Figure":
+    """Vpliv posameznih dejavnikov tveganja, obarvan po resnosti"""
+    factors = exposure.get("risk_factors") or []
+    traces = [{
+        "type": "bar",
+        "x": [factor["factor"].replace("_", " ").capitalize() for factor in factors],
+        "y": [factor["impact"] for factor in factors],
+        "marker": {"color": [SEVERITY_COLORS.get(factor["severity"], "#636efa") for factor in factors]},
+        "customdata": [[factor["score"], factor["weight"], factor["severity"]] for factor in factors],
+        "hovertemplate": ("%{x}<br>vpliv %{y:.3f}<br>ocena %{customdata[0]:.2f} · "
+                          "utež %{customdata[1]:.2f}<br>%{customdata[2]}<extra></extra>")
+    }]
+    title = f"Dejavniki tveganja (izpostavljenost {exposure.get('exposure_score', 0.0):.2f})"
+    return _figure("risk", title, traces, None if factors else "Ni dejavnikov tveganja")
+
+def esg_figure(esg_impact: Dict) -> "go.Figure":
+    """Deli ESG ocene na lestvici 0-10"""
+    components = esg_impact.get("score_components") or {}
+    values = [components.get("carbon"), components.get("climate"), esg_impact.get("esg_score")]
+    traces = [{
+        "type": "scatterpolar",
+        "r": values + values[:1],
+        "theta": list(ESG_AXES) + [ESG_AXES[0]],
+        "fill": "toself",
+        "hovertemplate": "%{theta}: %{r:.2f}<extra></extra>"
+    }]
+    return _figure("esg", f"ESG analiza (ocena {esg_impact.get('esg_score', 0.0):.2f})", traces)
+
+def rebin(histogram: Sequence[int], bins: int = 20) -> Tuple[List[float], List[int]]:
+    """Združi histogram po stotinkah (0.00-1.00) v manj razredov; vrne središča in števila"""
+    if len(histogram) != SCORE_BINS:
+        raise ValueError(f"Histogram mora imeti {SCORE_BINS} celic (po stotinkah), ima jih {len(histogram)}")
+    counts = [0] * bins
+    for cell, count in enumerate(histogram):
+        if count:
+            counts[min(bins - 1, cell * bins // (SCORE_BINS - 1))] += count
+    width = 1.0 / bins
+    return [round((index + 0.5) * width, 4) for index in range(bins)], counts
+
+def bin_scores(scores, bins: int = 20) -> Tuple[List[float], List[int]]:
+    """Razvrsti poljubno veliko zaporedje ocen (npr. stolpec calculate_exposure_batch) v razrede.
+
+    Ocene se štejejo po stotinkah kot v PortfolioAggregator, zato sta rezultata
+    enaka; np.histogram bi zaradi meja v plavajoči vejici npr. 0.15 uvrstil v nižji razred.
+    """
+    import numpy as np
+
+    cents = np.clip(np.rint(np.asarray(scores, dtype=float) * 100), 0, SCORE_BINS - 1).astype(np.intp)
+    return rebin(np.bincount(cents, minlength=SCORE_BINS).tolist(), bins)
+
+def portfolio_figure(centers: Sequence[float], counts: Sequence[int],
+                     title: str = "Porazdelitev izpostavljenosti portfelja") -> "go.Figure":
+    """Histogram portfelja iz že združenih razredov; velikost grafa ni odvisna od števila polic"""
+    traces = [{
+        "type": "bar",
+        "x": list(centers),
+        "y": list(counts),
+        "hovertemplate": "izpostavljenost ~%{x:.2f}<br>%{y} polic<extra></extra>"
+    }]
+    total = sum(counts)
+    return _figure("portfolio", f"{title} ({total} polic)", traces,
+                   None if total else "Portfelj je prazen")
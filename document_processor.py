@@ -0,0 +1,164 @@
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc je skupen procesu: sledenje ustavi zadnji dokument, ki ga je potreboval
+_tracing_lock = threading.Lock()
+_tracing = {"users": 0, "owned": False}
+
+def _acquire_tracing() -> int:
+    """Zažene sledenje pomnilniku (če še ne teče) in vrne trenutno porabo"""
+    with _tracing_lock:
+        if _tracing["users"] == 0:
+            _tracing["owned"] = not tracemalloc.is_tracing()
+            if _tracing["owned"]:
+                tracemalloc.start()
+        _tracing["users"] += 1
+        return tracemalloc.get_traced_memory()[0]
+
+def _release_tracing(baseline: int) -> int:
+    """Vrne največjo porabo nad izhodiščem in po potrebi ustavi sledenje"""
+    with _tracing_lock:
+        peak = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+        _tracing["users"] -= 1
+        if _tracing["users"] == 0 and _tracing["owned"]:
+            tracemalloc.stop()
+        return peak
+
+class DocumentProcessor:
+    """Postopno branje naloženih dokumentov (PDF, CSV, XLSX/XLS, DOCX).
+
+    Besedilo se vrača po kosih (strani PDF, skupine vrstic tabel, skupine
+    odstavkov), zato velikih dokumentov ni treba v celoti naložiti v pomnilnik.
+    """
+
+    SUPPORTED_TYPES = (".pdf", ".csv", ".xlsx", ".xls", ".docx")
+
+    def __init__(self, chunk_rows: int = 1000, track_memory: bool = False):
+        self.chunk_rows = chunk_rows
+        self.track_memory = track_memory
+        self.last_stats: Dict = {}
+
+    @classmethod
+    def from_env(cls) -> "DocumentProcessor":
+        """Nastavitve iz DOCUMENT_CHUNK_ROWS in DOCUMENT_TRACK_MEMORY"""
+        return cls(
+            chunk_rows=int(os.getenv("DOCUMENT_CHUNK_ROWS", "1000")),
+            track_memory=os.getenv("DOCUMENT_TRACK_MEMORY", "1").lower() in ("1", "true", "yes")
+        )
+
+    def iter_text(self, path: str) -> Iterator[str]:
+        """Vrača besedilo dokumenta po kosih in ob koncu zabeleži hitrost branja"""
+        extension = os.path.splitext(path)[1].lower()
+        readers = {
+            ".pdf": self._iter_pdf,
+            ".csv": self._iter_csv,
+            ".xlsx": self._iter_xlsx,
+            ".xls": self._iter_xls,
+            ".docx": self._iter_docx
+        }
+        if extension not in readers:
+            if extension == ".doc":
+                raise ValueError("Format .doc ni podprt, dokument shranite kot .docx")
+            raise ValueError(f"Nepodprt format dokumenta: {extension}")
+
+        size = os.path.getsize(path)
+        # Pri sočasnem branju več dokumentov je vrh skupen vsem
+        baseline = _acquire_tracing() if self.track_memory else None
+        started = time.perf_counter()
+        chunks = 0
+        try:
+            for chunk in readers[extension](path):
+                chunks += 1
+                yield chunk
+        finally:
+            elapsed = time.perf_counter() - started
+            peak = _release_tracing(baseline) if baseline is not None else None
+            self.last_stats = {
+                "file": os.path.basename(path),
+                "bytes": size,
+                "chunks": chunks,
+                "seconds": round(elapsed, 3),
+                "bytes_per_second": round(size / elapsed) if elapsed > 0 else None,
+                "peak_memory_bytes": peak
+            }
+            logger.info(
+                f"Prebran dokument {self.last_stats['file']}: {size} B v {elapsed:.2f} s"
+                + (f", največ {peak} B pomnilnika" if peak is not None else "")
+            )
+
+    def extract_text(self, path: str) -> str:
+        """Vrne celotno besedilo dokumenta (primerno le za manjše datoteke)"""
+        return "\n".join(self.iter_text(path))
+
+    def _iter_pdf(self, path: str) -> Iterator[str]:
+        from PyPDF2 import PdfReader
+
+        # Strani se razčlenijo šele ob dostopu
+        reader = PdfReader(path)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+
+    def _iter_csv(self, path: str) -> Iterator[str]:
+        import pandas as pd
+
+        for chunk in pd.read_csv(path, chunksize=self.chunk_rows, dtype=str):
+            yield self._rows_to_text(chunk.fillna("").values.tolist())
+
+    def _iter_xlsx(self, path: str) -> Iterator[str]:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                rows: List = []
+                for row in sheet.iter_rows(values_only=True):
+                    rows.append(row)
+                    if len(rows) >= self.chunk_rows:
+                        yield self._rows_to_text(rows)
+                        rows = []
+                if rows:
+                    yield self._rows_to_text(rows)
+        finally:
+            workbook.close()
+
+    def _iter_xls(self, path: str) -> Iterator[str]:
+        import pandas as pd
+
+        # Stari format .xls ne omogoča branja po vrsticah, zato beremo po listih
+        for sheet in pd.read_excel(path, sheet_name=None, dtype=str).values():
+            values = sheet.fillna("").values.tolist()
+            for start in range(0, len(values), self.chunk_rows):
+                yield self._rows_to_text(values[start:start + self.chunk_rows])
+
+    def _iter_docx(self, path: str) -> Iterator[str]:
+        from docx import Document
+
+        document = Document(path)
+        paragraphs: List[str] = []
+        for paragraph in document.paragraphs:
+            if paragraph.text:
+                paragraphs.append(paragraph.text)
+            if len(paragraphs) >= self.chunk_rows:
+                yield "\n".join(paragraphs)
+                paragraphs = []
+        if paragraphs:
+            yield "\n".join(paragraphs)
+
+        for table in document.tables:
+            yield self._rows_to_text([cell.text for cell in row.cells] for row in table.rows)
+
+    def _rows_to_text(self, rows) -> str:
+        return "\n".join(
+            " ".join(str(value) for value in row if value not in (None, ""))
+            for row in rows
+        )
+
+def file_paths(files: Optional[List]) -> List[str]:
+    """Poti do datotek iz komponente gr.File (niz ali objekt z atributom name)"""
+    return [getattr(item, "name", item) for item in files or []]
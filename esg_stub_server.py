@@ -0,0 +1,66 @@
+import argparse
+import hashlib
+from typing import Dict
+
+from aiohttp import web
+
+# Lokalni nadomestni strežnik za Climatiq in Weather API (testiranje brez omrežja).
+# ESGCompliance ga uporabi, če CLIMATIQ_API_URL in WEATHER_API_URL kažeta nanj.
+
+# Število klicev po API-ju (za preverjanje predpomnjenja v testih)
+CALLS = web.AppKey("calls", Dict[str, int])
+
+def _stable_fraction(value: str) -> float:
+    """Determinističen psevdonaključni delež 0-1 za dani niz"""
+    digest = hashlib.sha256(value.encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") / 0xFFFFFFFF
+
+async def _estimate(request: web.Request) -> web.Response:
+    request.app[CALLS]["climatiq"] += 1
+    payload = await request.json()
+    activity_id = payload.get("emission_factor", {}).get("activity_id", "")
+    return web.json_response({
+        "co2e": round(500 + 4500 * _stable_fraction(activity_id), 2),
+        "co2e_unit": "kg",
+        "emission_factor": {"activity_id": activity_id}
+    })
+
+async def _current_weather(request: web.Request) -> web.Response:
+    request.app[CALLS]["weather"] += 1
+    location = request.query.get("q", "")
+    fraction = _stable_fraction(location)
+    return web.json_response({
+        "location": {"name": location},
+        "current": {
+            "temp_c": round(5 + 20 * fraction, 1),
+            "precip_mm": round(30 * fraction, 1),
+            "wind_kph": round(80 * (1 - fraction), 1),
+            "condition": {"text": "stub"}
+        }
+    })
+
+def create_app() -> web.Application:
+    app = web.Application()
+    app[CALLS] = {"climatiq": 0, "weather": 0}
+    app.router.add_post("/data/v1/estimate", _estimate)
+    app.router.add_get("/v1/current.json", _current_weather)
+    return app
+
+async def start_stub_server(host: str = "127.0.0.1", port: int = 8089) -> web.AppRunner:
+    """Zažene nadomestni strežnik znotraj obstoječe zanke dogodkov"""
+    runner = web.AppRunner(create_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+def stub_urls(host: str = "127.0.0.1", port: int = 8089) -> Dict[str, str]:
+    """Okoljske spremenljivke, ki ESGCompliance preusmerijo na nadomestni strežnik"""
+    base = f"http://{host}:{port}"
+    return {"CLIMATIQ_API_URL": base, "WEATHER_API_URL": base}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nadomestni strežnik za ESG API-je")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import chain, islice
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from mga_analyst import MGAAnalyst
+from underwriter import Underwriter
+from policy_manager import PolicyManager
+from risk_exposure import RiskExposure
+from document_processor import DocumentProcessor
+from records import ExposureReport, InquiryAnalysis, PolicyDraft, RiskEvaluation
+from metrics import Sample, metrics, profiler
+from log_pipeline import call_with_correlation, correlation_id
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+# Agenti, ki jih uporabljajo naloge v trenutnem procesu
+_agents: Optional[Dict[str, Any]] = None
+
+def default_agents() -> Dict[str, Any]:
+    return {
+        "mga_analyst": MGAAnalyst(),
+        "underwriter": Underwriter(),
+        "policy_manager": PolicyManager(),
+        "risk_exposure": RiskExposure()
+    }
+
+def _init_worker(agents: Dict[str, Any]) -> None:
+    global _agents
+    _agents = agents
+
+def worker_agents() -> Dict[str, Any]:
+    """Vrne agente trenutnega procesa (v delavcu jih nastavi inicializator bazena)"""
+    if _agents is None:
+        _init_worker(default_agents())
+    return _agents
+
+def analyze_inquiry(text: str, files: Sequence[str] = ()) -> InquiryAnalysis:
+    """MGA analiza povpraševanja in priloženih dokumentov"""
+    mga_analyst = worker_agents()["mga_analyst"]
+    if files:
+        # Dokumenti se berejo po kosih in analizirajo sproti
+        processor = DocumentProcessor.from_env()
+        chunks = chain([text] if text else [], *(processor.iter_text(path) for path in files))
+        return mga_analyst.analyze_stream(chunks)
+    return mga_analyst.analyze_input(text)
+
+def run_chain(text: str, files: Sequence[str] = ()) -> Tuple[InquiryAnalysis, RiskEvaluation, PolicyDraft, ExposureReport]:
+    """Izvede sinhroni del verige agentov za eno povpraševanje in priložene dokumente"""
+    agents = worker_agents()
+    mga_results = analyze_inquiry(text, files)
+    risk_eval = agents["underwriter"].evaluate_risk(mga_results)
+    policy = agents["policy_manager"].create_policy_draft(risk_eval)
+    exposure = agents["risk_exposure"].calculate_exposure(policy)
+    return mga_results, risk_eval, policy, exposure
+
+def run_chain_timed(text: str, files: Sequence[str] = ()) -> Tuple[Tuple, List[Sample]]:
+    """Izvede verigo in vrne tudi trajanje posameznih faz (za prenos iz delovnih procesov)"""
+    with metrics.capture() as samples, profiler.profile("chain"):
+        results = run_chain(text, files)
+    return results, samples
+
+def run_stage(agent: str, method: str, *args: Any) -> Any:
+    """Izvede eno metodo agenta (npr. "underwriter", "evaluate_risk")"""
+    return getattr(worker_agents()[agent], method)(*args)
+
+def _call_timed(fn: Callable, *args: Any) -> Tuple[Any, List[Sample]]:
+    with metrics.capture() as samples:
+        result = fn(*args)
+    return result, samples
+
+def _warm_up(_: int) -> int:
+    worker_agents()
+    return os.getpid()
+
+class AgentExecutor:
+    """Izvajalnik CPU-intenzivnih faz verige v bazenu niti ali procesov.
+
+    Način "thread" deli agente s klicočim procesom in ne blokira zanke
+    dogodkov. Način "process" agente enkrat prenese v vsak delovni proces
+    in se skalira s številom jeder; kasnejše spremembe agentov v glavnem
+    procesu delavcem niso vidne. Način "inline" vse izvede v klicoči niti.
+    """
+
+    def __init__(self, agents: Optional[Dict[str, Any]] = None, mode: str = "thread",
+                 max_workers: Optional[int] = None, chunk_size: int = 256,
+                 start_method: str = "spawn"):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Neznan način izvajalnika: {mode}")
+
+        self.agents = agents or default_agents()
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.start_method = start_method
+        self._pool: Optional[Executor] = None
+
+    @classmethod
+    def from_env(cls, agents: Optional[Dict[str, Any]] = None) -> "AgentExecutor":
+        """Ustvari izvajalnik glede na AGENT_EXECUTOR, AGENT_WORKERS in AGENT_CHUNK_SIZE"""
+        workers = os.getenv("AGENT_WORKERS")
+        return cls(
+            agents=agents,
+            mode=os.getenv("AGENT_EXECUTOR", "thread"),
+            max_workers=int(workers) if workers else None,
+            chunk_size=int(os.getenv("AGENT_CHUNK_SIZE", "256"))
+        )
+
+    def start(self) -> "AgentExecutor":
+        """Ustvari bazen in ogreje vse delavce"""
+        if self._pool is not None:
+            return self
+
+        if self.mode == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker,
+                initargs=(self.agents,)
+            )
+            # Vsak delavec se zažene in naloži agente pred prvo zahtevo
+            pids = set(self._pool.map(_warm_up, range(self.max_workers)))
+            logger.info(f"Ogretih {len(pids)} delovnih procesov")
+        else:
+            _init_worker(self.agents)
+            if self.mode == "thread":
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="agent"
+                )
+        return self
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self) -> "AgentExecutor":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Izvede funkcijo v bazenu, ne da bi blokiral zanko dogodkov"""
+        self.start()
+        if self._pool is None:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        # Kontekst se v bazen ne prenese sam, zato identifikator zahteve podamo izrecno
+        return await loop.run_in_executor(
+            self._pool, partial(call_with_correlation, correlation_id.get(), fn, *args)
+        )
+
+    async def run_chain(self, text: str, files: Sequence[str] = ()) -> Tuple[InquiryAnalysis, RiskEvaluation, PolicyDraft, ExposureReport]:
+        results, _ = await self.run_chain_timed(text, files)
+        return results
+
+    async def run_chain_timed(self, text: str, files: Sequence[str] = ()) -> Tuple[Tuple, List[Sample]]:
+        """Kot run_chain, vrne pa še meritve faz te zahteve.
+
+        V načinu "process" se meritve delavca prenesejo v register glavnega
+        procesa; napake posameznih faz v delavcu se štejejo le kot napaka faze "chain".
+        """
+        with metrics.stage("chain"):
+            results, samples = await self.run(run_chain_timed, text, tuple(files))
+        if self.mode == "process":
+            metrics.record(samples)
+        return results, samples
+
+    async def run_timed(self, fn: Callable, *args: Any) -> Tuple[Any, List[Sample]]:
+        """Izvede funkcijo v bazenu in vrne še meritve faz, ki jih je sprožila"""
+        result, samples = await self.run(_call_timed, fn, *args)
+        if self.mode == "process":
+            metrics.record(samples)
+        return result, samples
+
+    async def run_stage(self, agent: str, method: str, *args: Any) -> Any:
+        result, _ = await self.run_timed(run_stage, agent, method, *args)
+        return result
+
+    def map_chunks(self, fn: Callable[[List], List], items: Iterable,
+                   chunk_size: Optional[int] = None,
+                   max_pending: Optional[int] = None) -> Iterator:
+        """Obdela elemente v kosih in vrača rezultate v izvirnem vrstnem redu.
+
+        Funkcija prejme seznam elementov in vrne seznam rezultatov. Naenkrat
+        je oddanih največ max_pending kosov, zato poraba pomnilnika ostane
+        omejena tudi pri neskončnih generatorjih.
+        """
+        self.start()
+        chunk_size = chunk_size or self.chunk_size
+        iterator = iter(items)
+        chunks = iter(lambda: list(islice(iterator, chunk_size)), [])
+
+        if self._pool is None:
+            for chunk in chunks:
+                yield from fn(chunk)
+            return
+
+        max_pending = max_pending or self.max_workers * 2
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(self._pool.submit(fn, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -1,11 +1,60 @@
 import gradio as gr
-import plotly.graph_objects as go
-from typing import Dict
 import logging
+import os
+import time
+from executor import AgentExecutor, analyze_inquiry, run_stage
+from document_processor import file_paths
+from result_cache import ResultCache, make_key, rules_fingerprint
+from metrics import metrics
+from log_pipeline import correlation, new_correlation_id
+from portfolio_aggregator import PortfolioAggregator
+from charts import esg_figure, portfolio_figure, rebin, risk_figure
+from accumulation import AccumulationIndex
+from llm_classifier import LLMClassifier
 
 logger = logging.getLogger(__name__)
 
-def create_ui(mga_analyst, underwriter, policy_manager, risk_exposure, esg_compliance):
+def create_ui(mga_analyst, underwriter, policy_manager, risk_exposure, esg_compliance,
+              executor=None, result_cache=None, portfolio=None,
+              concurrency_limit=None, max_queue_size=None, accumulation=None,
+              accumulation_radius_km=None, llm_classifier=None):
+    # CPU-intenzivne faze tečejo v bazenu, da ne blokirajo drugih sej
+    if executor is None:
+        executor = AgentExecutor.from_env({
+            "mga_analyst": mga_analyst,
+            "underwriter": underwriter,
+            "policy_manager": policy_manager,
+            "risk_exposure": risk_exposure
+        })
+    executor.start()
+
+    # Ponovljena povpraševanja ne sprožijo ponovno celotne verige
+    if result_cache is None:
+        result_cache = ResultCache.from_env(
+            lambda: rules_fingerprint(mga_analyst, underwriter, policy_manager, risk_exposure)
+        )
+
+    # Največ concurrency_limit sočasnih analiz, ostale čakajo v vrsti z največ max_queue_size mesti
+    if concurrency_limit is None:
+        concurrency_limit = int(os.getenv("GRADIO_CONCURRENCY", "8"))
+    if max_queue_size is None:
+        max_queue_size = int(os.getenv("GRADIO_MAX_QUEUE", "64"))
+
+    # Porazdelitev vezanih polic iz stolpčnega portfelja paketne obdelave (PORTFOLIO_DIR);
+    # analizirana povpraševanja niso police, zato se vanj ne dodajajo
+    if portfolio is None:
+        portfolio = PortfolioAggregator.from_env(risk_exposure)
+
+    # Vezane police (PORTFOLIO_DIR) se indeksirajo po lokaciji za kopičenje nevarnosti v okolici
+    if accumulation is None:
+        accumulation = AccumulationIndex.from_env(underwriter.rating_engine.perils)
+    if accumulation_radius_km is None:
+        accumulation_radius_km = float(os.getenv("ACCUMULATION_RADIUS_KM", "25"))
+
+    # Povpraševanja brez prepoznane kategorije razvrsti jezikovni model (LLM_BACKEND)
+    if llm_classifier is None:
+        llm_classifier = LLMClassifier.from_env(list(mga_analyst.categories), list(mga_analyst.risk_keywords))
+
     with gr.Blocks(theme=gr.themes.Soft()) as app:
         gr.Markdown("""
         # 🏢 Insur.Cap - Avtonomni InsurTech Sistem
@@ -44,6 +93,12 @@ def create_ui(mga_analyst, underwriter, policy_manager, risk_exposure, esg_compl
                             category_output = gr.JSON()
                         with gr.Accordion("Ocena tveganja"):
                             risk_output = gr.JSON()
+                        with gr.Accordion("Osnutek police"):
+                            policy_output = gr.JSON()
+                        with gr.Accordion("Izpostavljenost"):
+                            exposure_output = gr.JSON()
+                        with gr.Accordion("Kopičenje nevarnosti v okolici"):
+                            accumulation_output = gr.JSON()
                         with gr.Accordion("ESG in okoljski vpliv"):
                             esg_output = gr.JSON()
                     
@@ -51,87 +106,142 @@ def create_ui(mga_analyst, underwriter, policy_manager, risk_exposure, esg_compl
                         with gr.Row():
                             risk_chart = gr.Plot(label="Ocena tveganj")
                             esg_chart = gr.Plot(label="ESG analiza")
+                        portfolio_chart = gr.Plot(label="Portfelj")
         
         with gr.Row():
             status_bar = gr.Markdown()
 
         async def process_request(text, files, location):
+            """Sproti pošilja rezultate faz: kategorija, tveganje, polica, izpostavljenost in ESG"""
+            # Identifikator se nastavi le okoli posameznih korakov, ker se
+            # generator lahko nadaljuje v drugem kontekstu
+            request_id = new_correlation_id()
+            started = time.perf_counter()
+            samples = []
             try:
-                # MGA Analiza
-                mga_results = mga_analyst.analyze_input(text)
-                
+                yield {status_bar: "⏳ Analiza povpraševanja ..."}
+
+                with correlation(request_id):
+                    paths = file_paths(files)
+                    cache_key = await executor.run(make_key, text, location, paths)
+                # V predpomnilniku so le rezultati agentov; ESG (vreme) se pridobi
+                # znova, zato zanj velja ESG_CACHE_TTL odjemalca API
+                cached = result_cache.get(cache_key)
+                if cached is not None:
+                    mga_results, risk_eval, policy, exposure = cached
+                    with correlation(request_id):
+                        esg_impact = await esg_compliance.analyze_esg_impact(
+                            {**policy.to_dict(), "location": location}
+                        )
+                    metrics.observe("request", time.perf_counter() - started)
+                    yield {
+                        summary_output: _summary(mga_results, risk_eval, policy, exposure, esg_impact),
+                        category_output: mga_results.to_dict(),
+                        risk_output: risk_eval.to_dict(),
+                        policy_output: policy.to_dict(),
+                        exposure_output: exposure.to_dict(),
+                        accumulation_output: accumulation.query_location(location, accumulation_radius_km),
+                        esg_output: esg_impact,
+                        risk_chart: risk_figure(exposure),
+                        esg_chart: esg_figure(esg_impact),
+                        portfolio_chart: portfolio_figure(*rebin(portfolio.histogram())),
+                        status_bar: "✅ Analiza uspešno zaključena (rezultati agentov iz predpomnilnika)"
+                    }
+                    return
+
+                # MGA analiza
+                with correlation(request_id):
+                    mga_results, stage_samples = await executor.run_timed(analyze_inquiry, text, paths)
+                samples += stage_samples
+
+                # Dodatna analiza z modelom le, ko ključne besede ne zadostujejo
+                if llm_classifier is not None and text and mga_analyst.needs_classification(mga_results):
+                    yield {
+                        summary_output: _summary(mga_results),
+                        category_output: mga_results.to_dict(),
+                        status_bar: "⏳ Dodatna analiza z jezikovnim modelom ..."
+                    }
+                    llm_started = time.perf_counter()
+                    with correlation(request_id):
+                        try:
+                            classification = await llm_classifier.classify(text)
+                            mga_results = mga_analyst.apply_classification(mga_results, classification)
+                            samples.append(("llm", time.perf_counter() - llm_started, False))
+                        except Exception as e:
+                            # Brez modela ostane rezultat ključnih besed
+                            logger.warning(f"Razvrščanje z modelom ni uspelo: {str(e)}")
+
+                yield {
+                    summary_output: _summary(mga_results),
+                    category_output: mga_results.to_dict(),
+                    status_bar: "⏳ Ocena tveganja ..."
+                }
+
                 # Ocena tveganja
-                risk_eval = underwriter.evaluate_risk(mga_results)
-                
-                # Generiranje police
-                policy = policy_manager.create_policy_draft(risk_eval)
-                
-                # Analiza izpostavljenosti
-                exposure = risk_exposure.calculate_exposure(policy)
-                
-                # ESG analiza
-                esg_impact = await esg_compliance.analyze_esg_impact(policy)
-                
-                # Generiranje vizualizacij
-                risk_fig = create_risk_visualization(exposure)
-                esg_fig = create_esg_visualization(esg_impact)
-                
-                summary = f"""
-                ## 📊 Povzetek analize
-                
-                ### 🎯 Kategorija zavarovanja
-                {mga_results['category']}
-                
-                ### ⚠️ Identificirana tveganja
-                {', '.join(mga_results['risks'])}
-                
-                ### 💡 Priporočilo
-                {mga_results['recommendation']}
-                
-                ### 📈 Ocena tveganja
-                {risk_eval['risk_score']}
-                
-                ### 🌍 ESG ocena
-                {esg_impact['esg_score']}
-                """
-                
-                return {
-                    summary_output: summary,
-                    category_output: mga_results,
-                    risk_output: risk_eval,
+                with correlation(request_id):
+                    risk_eval, stage_samples = await executor.run_timed(
+                        run_stage, "underwriter", "evaluate_risk", mga_results
+                    )
+                samples += stage_samples
+                yield {
+                    summary_output: _summary(mga_results, risk_eval),
+                    risk_output: risk_eval.to_dict(),
+                    status_bar: "⏳ Priprava osnutka police ..."
+                }
+
+                # Osnutek police
+                with correlation(request_id):
+                    policy, stage_samples = await executor.run_timed(
+                        run_stage, "policy_manager", "create_policy_draft", risk_eval
+                    )
+                samples += stage_samples
+                yield {
+                    summary_output: _summary(mga_results, risk_eval, policy),
+                    policy_output: policy.to_dict(),
+                    status_bar: "⏳ Izračun izpostavljenosti ..."
+                }
+
+                # Izpostavljenost
+                with correlation(request_id):
+                    exposure, stage_samples = await executor.run_timed(
+                        run_stage, "risk_exposure", "calculate_exposure", policy
+                    )
+                samples += stage_samples
+                yield {
+                    summary_output: _summary(mga_results, risk_eval, policy, exposure),
+                    exposure_output: exposure.to_dict(),
+                    accumulation_output: accumulation.query_location(location, accumulation_radius_km),
+                    risk_chart: risk_figure(exposure),
+                    # Portfelj se pošlje kot 20 razredov ne glede na število polic
+                    portfolio_chart: portfolio_figure(*rebin(portfolio.histogram())),
+                    status_bar: "⏳ ESG analiza ..."
+                }
+                result_cache.put(cache_key, (mga_results, risk_eval, policy, exposure))
+
+                # ESG analiza (omrežni klici) je zadnja, ker je najpočasnejša
+                esg_started = time.perf_counter()
+                with correlation(request_id):
+                    esg_impact = await esg_compliance.analyze_esg_impact(
+                        {**policy.to_dict(), "location": location}
+                    )
+                samples.append(("esg", time.perf_counter() - esg_started, False))
+
+                metrics.observe("request", time.perf_counter() - started)
+                yield {
+                    summary_output: _summary(mga_results, risk_eval, policy, exposure, esg_impact),
                     esg_output: esg_impact,
-                    risk_chart: risk_fig,
-                    esg_chart: esg_fig,
-                    status_bar: "✅ Analiza uspešno zaključena"
+                    esg_chart: esg_figure(esg_impact),
+                    status_bar: f"✅ Analiza uspešno zaključena  \n⏱️ {metrics.format_status(samples)}"
                 }
-                
+
             except Exception as e:
-                logger.error(f"Napaka pri procesiranju zahteve: {str(e)}")
-                return {
+                metrics.observe("request", time.perf_counter() - started, error=True)
+                with correlation(request_id):
+                    logger.error(f"Napaka pri procesiranju zahteve: {str(e)}")
+                yield {
                     status_bar: f"❌ Napaka: {str(e)}"
                 }
 
-        def create_risk_visualization(exposure_data: Dict) -> go.Figure:
-            fig = go.Figure(data=[
-                go.Bar(
-                    x=['Požar', 'Poplava', 'Vlom', 'Potres'],
-                    y=[0.3, 0.5, 0.2, 0.4]
-                )
-            ])
-            fig.update_layout(title='Ocena tveganj po kategorijah')
-            return fig
-
-        def create_esg_visualization(esg_data: Dict) -> go.Figure:
-            fig = go.Figure(data=[
-                go.Scatterpolar(
-                    r=[4, 3, 5],
-                    theta=['Okoljski vpliv', 'Socialni vpliv', 'Upravljanje'],
-                    fill='toself'
-                )
-            ])
-            fig.update_layout(title='ESG Analiza')
-            return fig
-
         def clear_inputs():
             return {
                 input_text: "",
@@ -144,13 +254,18 @@ def create_ui(mga_analyst, underwriter, policy_manager, risk_exposure, esg_compl
         submit_btn.click(
             fn=process_request,
             inputs=[input_text, file_input, location_input],
+            concurrency_limit=concurrency_limit,
             outputs=[
                 summary_output,
                 category_output,
                 risk_output,
+                policy_output,
+                exposure_output,
+                accumulation_output,
                 esg_output,
                 risk_chart,
                 esg_chart,
+                portfolio_chart,
                 status_bar
             ]
         )
@@ -158,7 +273,30 @@ def create_ui(mga_analyst, underwriter, policy_manager, risk_exposure, esg_compl
         clear_btn.click(
             fn=clear_inputs,
             inputs=[],
-            outputs=[input_text, file_input, location_input, status_bar]
+            outputs=[input_text, file_input, location_input, status_bar],
+            queue=False
         )
 
-    return app 
\ No newline at end of file
+    # Omejena vrsta: ob preobremenitvi nove zahteve čakajo ali so zavrnjene,
+    # namesto da bi se kopičile do prekinitve povezave
+    app.queue(max_size=max_queue_size)
+    return app
+
+def _summary(mga_results, risk_eval=None, policy=None, exposure=None, esg_impact=None) -> str:
+    """Povzetek z do zdaj znanimi rezultati; manjkajoči deli so označeni kot v obdelavi"""
+    pending = "⏳ v obdelavi"
+    sections = [
+        ("📊 Povzetek analize", None),
+        ("🎯 Kategorija zavarovanja", mga_results.category),
+        ("⚠️ Identificirana tveganja", ", ".join(mga_results.risks) or "/"),
+        ("💡 Priporočilo", mga_results.recommendation),
+        ("📈 Ocena tveganja", pending if risk_eval is None
+         else f"{risk_eval.risk_score} (premija {risk_eval.premium})"),
+        ("📄 Polica", pending if policy is None else policy.policy_type),
+        ("🧮 Izpostavljenost", pending if exposure is None else exposure.exposure_score),
+        ("🌍 ESG ocena", pending if esg_impact is None else esg_impact["esg_score"])
+    ]
+    lines = []
+    for title, value in sections:
+        lines.append(f"## {title}" if value is None else f"### {title}\n{value}\n")
+    return "\n".join(lines) 
\ No newline at end of file
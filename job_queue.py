@@ -0,0 +1,550 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+CHUNK_STATES = ("pending", "leased", "done", "dead")
+
+class Lease:
+    """Zakup enega kosa: velja do roka, potrdi ali zavrne ga lahko le imetnik žetona"""
+
+    __slots__ = ("job_id", "chunk_no", "token", "attempts", "payload")
+
+    def __init__(self, job_id: str, chunk_no: int, token: str, attempts: int, payload: bytes):
+        self.job_id = job_id
+        self.chunk_no = chunk_no
+        self.token = token
+        self.attempts = attempts
+        self.payload = payload
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def _retry_at(now: float, attempts: int, retry_delay: float) -> float:
+    # Eksponentno odlašanje: 1x, 2x, 4x ... retry_delay
+    return now + retry_delay * (2 ** max(0, attempts - 1))
+
+SQLITE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        spec TEXT NOT NULL,
+        max_attempts INTEGER NOT NULL,
+        total_chunks INTEGER,
+        created_at REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS chunks (
+        job_id TEXT NOT NULL,
+        chunk_no INTEGER NOT NULL,
+        rows INTEGER NOT NULL,
+        payload BLOB,
+        state TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        available_at REAL,
+        token TEXT,
+        worker_id TEXT,
+        error TEXT,
+        processed_rows INTEGER,
+        failed_rows INTEGER,
+        seconds REAL,
+        finished_at REAL,
+        PRIMARY KEY (job_id, chunk_no)
+    )""",
+    "CREATE INDEX IF NOT EXISTS chunks_ready ON chunks (state, available_at)",
+    """CREATE TABLE IF NOT EXISTS workers (
+        worker_id TEXT PRIMARY KEY,
+        info TEXT,
+        last_seen REAL NOT NULL
+    )"""
+)
+
+class SQLiteJobQueue:
+    """Vrsta kosov paketnih poslov v SQLite za en stroj ali lokalno testiranje.
+
+    Koordinator posel razdeli na kose (create_job, add_chunks, seal), delavci
+    pa kose zakupijo (lease) za lease_seconds in jih potrdijo (complete) ali
+    zavrnejo (fail). Kos, katerega zakup poteče (delavec se je zrušil), se
+    ob naslednjem zakupu dodeli drugemu delavcu; po max_attempts poskusih
+    obstane v stanju "dead" do ročnega retry_dead. Potrditev z žetonom
+    prejšnjega zakupa se ne upošteva, zato je vsak kos zaključen enkrat.
+    Vse metode so varne za hkratno uporabo iz več procesov.
+    """
+
+    def __init__(self, path: str = "jobs.sqlite3", timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._transaction() as conn:
+            for statement in SQLITE_SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            # WAL: bralci (status) ne čakajo na delavce, ki zapisujejo
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._connection())
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def create_job(self, job_id: str, spec: Dict, max_attempts: int = 3) -> bool:
+        """Ustvari posel; vrne False, če že obstaja (ponovni zagon koordinatorja)"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, spec, max_attempts, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(spec, ensure_ascii=False), max_attempts, time.time())
+            )
+            return cursor.rowcount == 1
+
+    def job(self, job_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT spec, max_attempts, total_chunks FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"spec": json.loads(row[0]), "max_attempts": row[1], "total_chunks": row[2]}
+
+    def add_chunks(self, job_id: str, chunks: Iterable[Tuple[int, int, bytes]]) -> int:
+        """Doda kose (številka, število vrstic, vsebina); obstoječi kosi ostanejo nespremenjeni"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO chunks (job_id, chunk_no, rows, payload, available_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((job_id, chunk_no, rows, payload, now) for chunk_no, rows, payload in chunks)
+            )
+            return cursor.rowcount
+
+    def seal(self, job_id: str, total_chunks: int) -> None:
+        """Označi, da so dodani vsi kosi posla"""
+        with self._transaction() as conn:
+            conn.execute("UPDATE jobs SET total_chunks = ? WHERE job_id = ?", (total_chunks, job_id))
+
+    def lease(self, worker_id: str, lease_seconds: float) -> Optional[Lease]:
+        """Zakupi naslednji razpoložljivi kos ali kos s poteklim zakupom"""
+        with self._transaction() as conn:
+            while True:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT c.job_id, c.chunk_no, c.attempts, j.max_attempts FROM chunks c "
+                    "JOIN jobs j ON j.job_id = c.job_id "
+                    "WHERE c.state = 'leased' AND c.available_at <= ? LIMIT 1", (now,)
+                ).fetchone() or conn.execute(
+                    "SELECT c.job_id, c.chunk_no, c.attempts, j.max_attempts FROM chunks c "
+                    "JOIN jobs j ON j.job_id = c.job_id "
+                    "WHERE c.state = 'pending' AND c.available_at <= ? "
+                    "ORDER BY c.available_at, c.job_id, c.chunk_no LIMIT 1", (now,)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                job_id, chunk_no, attempts, max_attempts = row
+                if attempts >= max_attempts:
+                    # Zakup je potekel že pri zadnjem dovoljenem poskusu
+                    conn.execute(
+                        "UPDATE chunks SET state = 'dead', token = NULL, error = ? "
+                        "WHERE job_id = ? AND chunk_no = ?",
+                        ("Zakup je potekel (delavec se ni odzval)", job_id, chunk_no)
+                    )
+                    continue
+
+                token = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE chunks SET state = 'leased', token = ?, worker_id = ?, "
+                    "attempts = attempts + 1, available_at = ? WHERE job_id = ? AND chunk_no = ?",
+                    (token, worker_id, now + lease_seconds, job_id, chunk_no)
+                )
+                payload = conn.execute(
+                    "SELECT payload FROM chunks WHERE job_id = ? AND chunk_no = ?", (job_id, chunk_no)
+                ).fetchone()[0]
+                return Lease(job_id, chunk_no, token, attempts + 1, payload)
+
+    def renew(self, lease: Lease, lease_seconds: float) -> bool:
+        """Podaljša zakup; False, če ga je medtem prevzel drug delavec"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE chunks SET available_at = ? WHERE job_id = ? AND chunk_no = ? "
+                "AND state = 'leased' AND token = ?",
+                (time.time() + lease_seconds, lease.job_id, lease.chunk_no, lease.token)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, lease: Lease, stats: Dict) -> bool:
+        """Zaključi kos s statistiko obdelave; False, če zakup ni več veljaven"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE chunks SET state = 'done', token = NULL, payload = NULL, error = NULL, "
+                "processed_rows = ?, failed_rows = ?, seconds = ?, finished_at = ? "
+                "WHERE job_id = ? AND chunk_no = ? AND state = 'leased' AND token = ?",
+                (stats["rows"], stats["failed"], stats["seconds"], time.time(),
+                 lease.job_id, lease.chunk_no, lease.token)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, lease: Lease, error: str, retry_delay: float = 5.0) -> Optional[str]:
+        """Vrne kos v vrsto z zamikom ali ga po zadnjem poskusu označi kot "dead"; vrne novo stanje"""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT j.max_attempts FROM chunks c JOIN jobs j ON j.job_id = c.job_id "
+                "WHERE c.job_id = ? AND c.chunk_no = ? AND c.state = 'leased' AND c.token = ?",
+                (lease.job_id, lease.chunk_no, lease.token)
+            ).fetchone()
+            if row is None:
+                return None
+            state = "dead" if lease.attempts >= row[0] else "pending"
+            conn.execute(
+                "UPDATE chunks SET state = ?, token = NULL, error = ?, available_at = ? "
+                "WHERE job_id = ? AND chunk_no = ?",
+                (state, error, _retry_at(time.time(), lease.attempts, retry_delay),
+                 lease.job_id, lease.chunk_no)
+            )
+            return state
+
+    def retry_dead(self, job_id: str) -> int:
+        """Kose, ki so izčrpali poskuse, vrne v vrsto s ponastavljenim številom poskusov"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE chunks SET state = 'pending', attempts = 0, available_at = ? "
+                "WHERE job_id = ? AND state = 'dead'", (time.time(), job_id)
+            )
+            return cursor.rowcount
+
+    def has_work(self) -> bool:
+        """Ali je v vrsti še kak čakajoč (tudi z odloženim ponovnim poskusom) ali zakupljen kos"""
+        return self._connection().execute(
+            "SELECT 1 FROM chunks WHERE state IN ('pending', 'leased') LIMIT 1"
+        ).fetchone() is not None
+
+    def heartbeat(self, worker_id: str, info: Dict) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workers (worker_id, info, last_seen) VALUES (?, ?, ?)",
+                (worker_id, json.dumps(info, ensure_ascii=False), time.time())
+            )
+
+    def done_chunks(self, job_id: str) -> List[int]:
+        return [row[0] for row in self._connection().execute(
+            "SELECT chunk_no FROM chunks WHERE job_id = ? AND state = 'done' ORDER BY chunk_no", (job_id,)
+        )]
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Napredek posla in prepustnost posameznih delavcev"""
+        job = self.job(job_id)
+        if job is None:
+            return None
+        conn = self._connection()
+        chunks = dict.fromkeys(CHUNK_STATES, 0)
+        chunks.update(conn.execute(
+            "SELECT state, COUNT(*) FROM chunks WHERE job_id = ? GROUP BY state", (job_id,)
+        ).fetchall())
+        workers = {
+            worker_id: _worker_summary(done, rows, failed, seconds)
+            for worker_id, done, rows, failed, seconds in conn.execute(
+                "SELECT worker_id, COUNT(*), SUM(processed_rows), SUM(failed_rows), SUM(seconds) "
+                "FROM chunks WHERE job_id = ? AND state = 'done' GROUP BY worker_id", (job_id,)
+            )
+        }
+        heartbeats = {
+            worker_id: (last_seen, json.loads(info) if info else {})
+            for worker_id, info, last_seen in conn.execute("SELECT worker_id, info, last_seen FROM workers")
+        }
+        errors = [
+            {"chunk": chunk_no, "state": state, "attempts": attempts, "error": error}
+            for chunk_no, state, attempts, error in conn.execute(
+                "SELECT chunk_no, state, attempts, error FROM chunks WHERE job_id = ? "
+                "AND error IS NOT NULL ORDER BY chunk_no LIMIT 20", (job_id,)
+            )
+        ]
+        return _job_status(job_id, job, chunks, workers, heartbeats, errors)
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE: pisalno zaklepanje že ob začetku, da se zakupi ne prekrivajo"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        self.conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+
+def _worker_summary(chunks: int, rows: int, failed: int, seconds: float) -> Dict:
+    return {
+        "chunks": chunks,
+        "rows": rows,
+        "failed_rows": failed,
+        "busy_seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds, 2) if seconds else 0.0
+    }
+
+def _job_status(job_id: str, job: Dict, chunks: Dict[str, int], workers: Dict[str, Dict],
+                heartbeats: Dict[str, Tuple[float, Dict]], errors: List[Dict]) -> Dict:
+    for worker_id, summary in workers.items():
+        if worker_id in heartbeats:
+            last_seen, info = heartbeats[worker_id]
+            summary["last_seen"] = round(time.time() - last_seen, 1)
+            # Zadnje stanje, ki ga je delavec poslal (skupaj za vse posle)
+            summary["heartbeat"] = info
+    total = job["total_chunks"]
+    return {
+        "job_id": job_id,
+        "input": job["spec"].get("input"),
+        "output": job["spec"].get("output"),
+        "total_chunks": total,
+        "chunks": chunks,
+        "rows_done": sum(summary["rows"] for summary in workers.values()),
+        "failed_rows": sum(summary["failed_rows"] for summary in workers.values()),
+        "complete": total is not None and chunks["done"] == total,
+        "workers": workers,
+        "errors": errors
+    }
+
+class RedisJobQueue:
+    """Enaka vrsta kot SQLiteJobQueue na strežniku Redis za delavce na več strojih.
+
+    Kosi, pripravljeni za zakup, so v urejeni množici po času razpoložljivosti,
+    zakupljeni pa v urejeni množici po roku zakupa. Prehodi stanj tečejo v
+    transakcijah WATCH/MULTI, zato se kos ne izgubi niti ne dodeli dvakrat.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "insurcap",
+                 client: Any = None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.redis = client
+        self.prefix = prefix
+
+    def _key(self, *parts: Any) -> str:
+        return ":".join([self.prefix, *(str(part) for part in parts)])
+
+    def _chunk_key(self, job_id: str, chunk_no: int) -> str:
+        return self._key("chunk", job_id, chunk_no)
+
+    def close(self) -> None:
+        self.redis.close()
+
+    def create_job(self, job_id: str, spec: Dict, max_attempts: int = 3) -> bool:
+        created = self.redis.hsetnx(self._key("job", job_id), "spec", json.dumps(spec, ensure_ascii=False))
+        if created:
+            self.redis.hset(self._key("job", job_id), mapping={
+                "max_attempts": max_attempts, "created_at": time.time()
+            })
+        return bool(created)
+
+    def job(self, job_id: str) -> Optional[Dict]:
+        values = self.redis.hgetall(self._key("job", job_id))
+        if not values:
+            return None
+        total = values.get(b"total_chunks")
+        return {
+            "spec": json.loads(values[b"spec"]),
+            "max_attempts": int(values.get(b"max_attempts", 3)),
+            "total_chunks": int(total) if total is not None else None
+        }
+
+    def add_chunks(self, job_id: str, chunks: Iterable[Tuple[int, int, bytes]]) -> int:
+        added = 0
+        for chunk_no, rows, payload in chunks:
+            key = self._chunk_key(job_id, chunk_no)
+            if not self.redis.hsetnx(key, "state", "pending"):
+                continue
+            pipe = self.redis.pipeline()
+            pipe.hset(key, mapping={"rows": rows, "payload": payload, "attempts": 0})
+            pipe.zadd(self._key("ready"), {f"{job_id}:{chunk_no}": time.time()})
+            pipe.execute()
+            added += 1
+        return added
+
+    def seal(self, job_id: str, total_chunks: int) -> None:
+        self.redis.hset(self._key("job", job_id), "total_chunks", total_chunks)
+
+    def lease(self, worker_id: str, lease_seconds: float) -> Optional[Lease]:
+        import redis
+
+        while True:
+            with self.redis.pipeline() as pipe:
+                try:
+                    pipe.watch(self._key("ready"), self._key("leased"))
+                    now = time.time()
+                    source = "leased"
+                    members = pipe.zrangebyscore(self._key("leased"), "-inf", now, start=0, num=1)
+                    if not members:
+                        source = "ready"
+                        members = pipe.zrangebyscore(self._key("ready"), "-inf", now, start=0, num=1)
+                    if not members:
+                        pipe.unwatch()
+                        return None
+
+                    member = members[0].decode()
+                    job_id, chunk_no = member.rsplit(":", 1)
+                    key = self._chunk_key(job_id, int(chunk_no))
+                    pipe.watch(key)
+                    attempts = int(pipe.hget(key, "attempts") or 0)
+                    max_attempts = int(pipe.hget(self._key("job", job_id), "max_attempts") or 3)
+
+                    pipe.multi()
+                    pipe.zrem(self._key(source), member)
+                    if source == "leased" and attempts >= max_attempts:
+                        pipe.hset(key, mapping={"state": "dead", "token": "",
+                                                "error": "Zakup je potekel (delavec se ni odzval)"})
+                        pipe.execute()
+                        continue
+
+                    token = uuid.uuid4().hex
+                    pipe.hset(key, mapping={"state": "leased", "token": token, "worker_id": worker_id,
+                                            "attempts": attempts + 1})
+                    pipe.zadd(self._key("leased"), {member: now + lease_seconds})
+                    pipe.hget(key, "payload")
+                    payload = pipe.execute()[-1]
+                    return Lease(job_id, int(chunk_no), token, attempts + 1, payload)
+                except redis.WatchError:
+                    # Kos je medtem zakupil drug delavec, poskusimo z naslednjim
+                    continue
+
+    def _transition(self, lease: Lease, apply) -> Any:
+        """Izvede prehod stanja, če ima kos še vedno žeton tega zakupa"""
+        import redis
+
+        key = self._chunk_key(lease.job_id, lease.chunk_no)
+        while True:
+            with self.redis.pipeline() as pipe:
+                try:
+                    pipe.watch(key)
+                    state, token = pipe.hmget(key, "state", "token")
+                    if state != b"leased" or (token or b"").decode() != lease.token:
+                        pipe.unwatch()
+                        return None
+                    pipe.multi()
+                    result = apply(pipe, key, f"{lease.job_id}:{lease.chunk_no}")
+                    pipe.execute()
+                    return result
+                except redis.WatchError:
+                    continue
+
+    def renew(self, lease: Lease, lease_seconds: float) -> bool:
+        def apply(pipe, key, member):
+            pipe.zadd(self._key("leased"), {member: time.time() + lease_seconds}, xx=True)
+            return True
+        return bool(self._transition(lease, apply))
+
+    def complete(self, lease: Lease, stats: Dict) -> bool:
+        def apply(pipe, key, member):
+            pipe.zrem(self._key("leased"), member)
+            pipe.hset(key, mapping={"state": "done", "token": "", "error": ""})
+            pipe.hdel(key, "payload")
+            pipe.sadd(self._key("done", lease.job_id), lease.chunk_no)
+            # Prepustnost po delavcih: seštevki v eni zgoščeni tabeli na posel
+            totals = self._key("workers", lease.job_id)
+            worker = stats["worker_id"]
+            pipe.hincrby(totals, f"{worker}:chunks", 1)
+            pipe.hincrby(totals, f"{worker}:rows", stats["rows"])
+            pipe.hincrby(totals, f"{worker}:failed", stats["failed"])
+            pipe.hincrbyfloat(totals, f"{worker}:seconds", stats["seconds"])
+            return True
+        return bool(self._transition(lease, apply))
+
+    def fail(self, lease: Lease, error: str, retry_delay: float = 5.0) -> Optional[str]:
+        max_attempts = int(self.redis.hget(self._key("job", lease.job_id), "max_attempts") or 3)
+        state = "dead" if lease.attempts >= max_attempts else "pending"
+
+        def apply(pipe, key, member):
+            pipe.zrem(self._key("leased"), member)
+            pipe.hset(key, mapping={"state": state, "token": "", "error": error})
+            if state == "pending":
+                pipe.zadd(self._key("ready"), {member: _retry_at(time.time(), lease.attempts, retry_delay)})
+            return state
+        return self._transition(lease, apply)
+
+    def retry_dead(self, job_id: str) -> int:
+        retried = 0
+        for chunk_no in range(self._chunk_count(job_id)):
+            key = self._chunk_key(job_id, chunk_no)
+            if self.redis.hget(key, "state") == b"dead":
+                pipe = self.redis.pipeline()
+                pipe.hset(key, mapping={"state": "pending", "attempts": 0})
+                pipe.zadd(self._key("ready"), {f"{job_id}:{chunk_no}": time.time()})
+                pipe.execute()
+                retried += 1
+        return retried
+
+    def has_work(self) -> bool:
+        return bool(self.redis.zcard(self._key("ready")) or self.redis.zcard(self._key("leased")))
+
+    def heartbeat(self, worker_id: str, info: Dict) -> None:
+        pipe = self.redis.pipeline()
+        pipe.hset(self._key("heartbeats"), worker_id, time.time())
+        pipe.hset(self._key("heartbeats", "info"), worker_id, json.dumps(info, ensure_ascii=False))
+        pipe.execute()
+
+    def done_chunks(self, job_id: str) -> List[int]:
+        return sorted(int(value) for value in self.redis.smembers(self._key("done", job_id)))
+
+    def _chunk_count(self, job_id: str) -> int:
+        job = self.job(job_id) or {}
+        if job.get("total_chunks") is not None:
+            return job["total_chunks"]
+        count = 0
+        while self.redis.exists(self._chunk_key(job_id, count)):
+            count += 1
+        return count
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        job = self.job(job_id)
+        if job is None:
+            return None
+        chunks = dict.fromkeys(CHUNK_STATES, 0)
+        errors = []
+        pipe = self.redis.pipeline()
+        count = self._chunk_count(job_id)
+        for chunk_no in range(count):
+            pipe.hmget(self._chunk_key(job_id, chunk_no), "state", "attempts", "error")
+        for chunk_no, (state, attempts, error) in enumerate(pipe.execute()):
+            if state is None:
+                # Zapisa kosa ni (npr. ključ je bil izbrisan), kos se ne šteje
+                continue
+            chunks[state.decode()] += 1
+            if error and len(errors) < 20:
+                errors.append({"chunk": chunk_no, "state": state.decode(),
+                               "attempts": int(attempts or 0), "error": error.decode()})
+
+        totals: Dict[str, Dict[str, float]] = {}
+        for field, value in self.redis.hgetall(self._key("workers", job_id)).items():
+            worker, name = field.decode().rsplit(":", 1)
+            totals.setdefault(worker, {})[name] = float(value)
+        workers = {
+            worker: _worker_summary(int(values.get("chunks", 0)), int(values.get("rows", 0)),
+                                    int(values.get("failed", 0)), values.get("seconds", 0.0))
+            for worker, values in totals.items()
+        }
+        info = self.redis.hgetall(self._key("heartbeats", "info"))
+        heartbeats = {
+            worker.decode(): (float(value), json.loads(info[worker]) if worker in info else {})
+            for worker, value in self.redis.hgetall(self._key("heartbeats")).items()
+        }
+        return _job_status(job_id, job, chunks, workers, heartbeats, errors)
+
+def create_job_queue(url: Optional[str] = None):
+    """Ustvari vrsto glede na JOB_QUEUE_URL (sqlite:///pot ali redis://strežnik:6379/0)"""
+    url = url or os.getenv("JOB_QUEUE_URL", "sqlite:///jobs.sqlite3")
+    if url.startswith("sqlite:///"):
+        return SQLiteJobQueue(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisJobQueue(url)
+    raise ValueError(f"Nepodprt naslov vrste: {url}")
@@ -0,0 +1,79 @@
+import re
+from typing import Dict, FrozenSet, List, Tuple
+
+class KeywordMatcher:
+    """Vnaprej preveden iskalnik ključnih besed za več skupin oznak.
+
+    Vse ključne besede so zložene v eno drevo predpon (trie) in prevedene
+    v en regularni izraz, zato je besedilo preiskano v enem prehodu ne
+    glede na število ključnih besed.
+    """
+
+    def __init__(self, groups: Dict[str, Dict[str, List[str]]]):
+        # Kopija vrstnega reda oznak, saj je prednost odvisna od vrstnega reda
+        self.groups = {
+            group: tuple(labels.keys()) for group, labels in groups.items()
+        }
+        self._pattern, self._expansion = self._compile(groups)
+        self._total = sum(len(labels) for labels in self.groups.values())
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """Vrne zadete oznake po skupinah v vrstnem redu definicije"""
+        found = set()
+        if self._pattern is not None:
+            for hit in self._pattern.finditer(text.lower()):
+                found.update(self._expansion[hit.group(1)])
+                if len(found) == self._total:
+                    break
+
+        return {
+            group: [label for label in labels if (group, label) in found]
+            for group, labels in self.groups.items()
+        }
+
+    def _compile(self, groups: Dict[str, Dict[str, List[str]]]):
+        """Zgradi regularni izraz in tabelo razširitev zadetkov"""
+        owners: Dict[str, set] = {}
+        for group, labels in groups.items():
+            for label, keywords in labels.items():
+                for keyword in keywords:
+                    keyword = keyword.lower()
+                    if keyword:
+                        owners.setdefault(keyword, set()).add((group, label))
+
+        if not owners:
+            return None, {}
+
+        trie: Dict = {}
+        for keyword in owners:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = True
+
+        # Izraz na vsakem mestu najde najdaljšo ključno besedo, zato morajo
+        # zadetki vključevati tudi vse krajše ključne besede, ki so njene predpone
+        expansion: Dict[str, FrozenSet[Tuple[str, str]]] = {}
+        for keyword in owners:
+            labels = set()
+            for end in range(1, len(keyword) + 1):
+                labels.update(owners.get(keyword[:end], ()))
+            expansion[keyword] = frozenset(labels)
+
+        pattern = re.compile("(?=(" + _trie_pattern(trie) + "))")
+        return pattern, expansion
+
+def _trie_pattern(node: Dict) -> str:
+    """Pretvori drevo predpon v požrešen regularni izraz"""
+    branches = [
+        re.escape(char) + _trie_pattern(child)
+        for char, child in sorted(node.items())
+        if char
+    ]
+    if not branches:
+        return ""
+
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        body = "(?:" + body + ")?"
+    return body
@@ -0,0 +1,316 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set, Tuple
+
+from metrics import metrics
+
+if TYPE_CHECKING:
+    from api_client import APIClient
+
+logger = logging.getLogger(__name__)
+
+# Sprememba navodil ali oblike odgovora razveljavi predpomnilnik
+PROMPT_VERSION = 1
+
+# Daljša besedila se skrajšajo, da paket ostane znotraj MAX_TOKENS
+MAX_TEXT_CHARS = 2000
+
+SYSTEM_PROMPT = (
+    "Si analitik zavarovalniških povpraševanj. Za vsako oštevilčeno povpraševanje "
+    "določi eno kategorijo zavarovanja izmed {categories} (ali \"drugo\", če nobena ne ustreza) "
+    "in seznam tveganj izmed {risks}. Odgovori samo z JSON poljem objektov "
+    "{{\"category\": ..., \"risks\": [...]}} v enakem vrstnem redu kot povpraševanja."
+)
+
+class ClassificationCache:
+    """Odgovori modela na disku, ena JSON datoteka na ključ (zgoščena vrednost poziva).
+
+    Datoteke so razdeljene v podmape po prvih dveh znakih ključa, zapis
+    pa je atomaren (začasna datoteka in os.replace), zato si predpomnilnik
+    lahko deli več procesov.
+    """
+
+    def __init__(self, directory: str = ".llm_cache"):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as handle:
+                value = json.load(handle)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Dict) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(descriptor, "w", encoding="utf-8") as handle:
+                json.dump(value, handle, ensure_ascii=False)
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.warning(f"Odgovora modela ni bilo mogoče shraniti v predpomnilnik: {str(e)}")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+class OpenAIBackend:
+    """Razvrščanje paketa povpraševanj z enim klicem Chat Completions API"""
+
+    def __init__(self, api_key: str, model: str = "gpt-4", temperature: float = 0.0,
+                 max_tokens: int = 2000, api_url: str = "https://api.openai.com",
+                 api_client: Optional["APIClient"] = None, timeout: float = 30.0):
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.api_url = api_url.rstrip("/")
+        self.timeout = timeout
+        self._api_client = api_client
+
+    @property
+    def api_client(self) -> "APIClient":
+        if self._api_client is None:
+            from api_client import APIClient
+
+            self._api_client = APIClient(timeout=self.timeout)
+        return self._api_client
+
+    async def classify_batch(self, texts: Sequence[str], categories: Sequence[str],
+                             risks: Sequence[str]) -> List[Dict]:
+        prompt = "\n\n".join(f"{index}. {text}" for index, text in enumerate(texts, start=1))
+        response = await self.api_client.request_json(
+            "POST",
+            f"{self.api_url}/v1/chat/completions",
+            json_body={
+                "model": self.model,
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+                "messages": [
+                    {"role": "system", "content": SYSTEM_PROMPT.format(
+                        categories=", ".join(categories), risks=", ".join(risks)
+                    )},
+                    {"role": "user", "content": prompt}
+                ]
+            },
+            headers={"Authorization": f"Bearer {self.api_key}"}
+        )
+        content = response["choices"][0]["message"]["content"]
+        # Model odgovor včasih ovije v ```json ... ```
+        content = content.strip()
+        if content.startswith("```"):
+            content = content.split("\n", 1)[-1].rsplit("```", 1)[0]
+        return json.loads(content)
+
+class MockBackend:
+    """Lokalni nadomestni model za testiranje brez omrežja in obremenitvene teste.
+
+    Po zakasnitvi latency (z naključnim odstopanjem jitter) vrne razvrstitev
+    po širšem naboru korenov besed kot MGAAnalyst. Šteje klice in velikosti
+    paketov, da lahko testi preverijo združevanje zahtev.
+    """
+
+    STEMS = {
+        "avtomobilsko": ("avtomobil", "vozil", "kasko", "avtomobilsk", "motorist"),
+        "nepremičninsko": ("nepremičnin", "stanovanj", "hiš", "vikend", "streh", "klet"),
+        "zdravstveno": ("zdravst", "zdravj", "bolnišnic", "poškodb", "zdravnik"),
+        "življenjsko": ("življenj", "pokojnin", "dedič", "upokojit")
+    }
+    RISK_STEMS = {
+        "požar": ("gori", "zgorel", "dim", "iskr"),
+        "poplava": ("popla", "narasl", "neurj", "toča", "zamaka"),
+        "vlom": ("ukrad", "vlomil", "tatov", "kraj"),
+        "potres": ("potres", "razpok", "sesu")
+    }
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self.batch_sizes: List[int] = []
+
+    async def classify_batch(self, texts: Sequence[str], categories: Sequence[str],
+                             risks: Sequence[str]) -> List[Dict]:
+        self.calls += 1
+        self.batch_sizes.append(len(texts))
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        results = []
+        for text in texts:
+            lowered = text.lower()
+            category = next(
+                (label for label in categories
+                 if any(stem in lowered for stem in self.STEMS.get(label, ()))),
+                "drugo"
+            )
+            results.append({
+                "category": category,
+                "risks": [risk for risk in risks
+                          if any(stem in lowered for stem in self.RISK_STEMS.get(risk, ()))]
+            })
+        return results
+
+class LLMClassifier:
+    """Razvrščanje povpraševanj z jezikovnim modelom, ko ključne besede ne zadostujejo.
+
+    Sočasne zahteve se zbirajo v pakete do batch_size povpraševanj ali
+    največ max_wait sekund, naenkrat pa teče največ max_in_flight klicev
+    modela. Enaka sočasna povpraševanja si delijo en klic, odgovori pa se
+    shranijo na disk po zgoščeni vrednosti poziva.
+    """
+
+    def __init__(self, backend, categories: Sequence[str], risks: Sequence[str],
+                 cache: Optional[ClassificationCache] = None, batch_size: int = 8,
+                 max_wait: float = 0.02, max_in_flight: int = 4, model: str = "mock",
+                 temperature: float = 0.0):
+        self.backend = backend
+        self.categories = tuple(categories)
+        self.risks = tuple(risks)
+        self.cache = cache or ClassificationCache()
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        self.model = model
+        self.temperature = temperature
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        # Semafor pripada zanki dogodkov, zato se ustvari ob prvi zahtevi
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls, categories: Sequence[str], risks: Sequence[str]) -> Optional["LLMClassifier"]:
+        """Nastavitve iz LLM_BACKEND (prazno = izklopljeno, "openai" ali "mock") in LLM_*;
+        model iz MODEL_NAME, TEMPERATURE in MAX_TOKENS"""
+        backend_name = os.getenv("LLM_BACKEND", "").strip().lower()
+        if not backend_name:
+            return None
+
+        model = os.getenv("MODEL_NAME", "gpt-4")
+        temperature = float(os.getenv("TEMPERATURE", "0.7"))
+        if backend_name == "openai":
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                logger.warning("LLM_BACKEND=openai brez OPENAI_API_KEY, razvrščanje z modelom je izklopljeno")
+                return None
+            backend = OpenAIBackend(
+                api_key, model=model, temperature=temperature,
+                max_tokens=int(os.getenv("MAX_TOKENS", "2000")),
+                api_url=os.getenv("OPENAI_API_URL", "https://api.openai.com"),
+                timeout=float(os.getenv("LLM_TIMEOUT", "30"))
+            )
+        elif backend_name == "mock":
+            backend = MockBackend(latency=float(os.getenv("LLM_MOCK_LATENCY_MS", "200")) / 1000)
+            model = "mock"
+        else:
+            raise ValueError(f"Neznan LLM_BACKEND: {backend_name}")
+
+        return cls(
+            backend, categories, risks,
+            cache=ClassificationCache(os.getenv("LLM_CACHE_DIR", ".llm_cache")),
+            batch_size=int(os.getenv("LLM_BATCH_SIZE", "8")),
+            max_wait=float(os.getenv("LLM_BATCH_WAIT_MS", "20")) / 1000,
+            max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "4")),
+            model=model,
+            temperature=temperature
+        )
+
+    def prompt_key(self, text: str) -> str:
+        """Zgoščena vrednost vsega, kar vpliva na odgovor modela"""
+        payload = json.dumps(
+            [PROMPT_VERSION, self.model, self.temperature, self.categories, self.risks, text],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def classify(self, text: str) -> Dict:
+        """Vrne {"category": ..., "risks": [...]} za eno povpraševanje"""
+        text = text[:MAX_TEXT_CHARS]
+        key = self.prompt_key(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Čakajoče zahteve prejšnje zanke (npr. zaporedni asyncio.run) se zavržejo
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._pending, self._in_flight, self._timer = [], {}, None
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = self._in_flight[key] = loop.create_future()
+            self._pending.append((key, text, future))
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.max_wait, self._flush)
+        # shield: preklic ene zahteve ne prekliče skupnega klica
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, str, asyncio.Future]]) -> None:
+        try:
+            async with self._semaphore:
+                started = time.perf_counter()
+                try:
+                    results = await self.backend.classify_batch(
+                        [text for _, text, _ in batch], self.categories, self.risks
+                    )
+                    if not isinstance(results, list) or len(results) != len(batch):
+                        raise ValueError("Odgovor modela se ne ujema s paketom povpraševanj")
+                except Exception as e:
+                    metrics.observe("llm.batch", time.perf_counter() - started, error=True)
+                    logger.warning(f"Razvrščanje z modelom ni uspelo ({len(batch)} povpraševanj): {str(e)}")
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    return
+                metrics.observe("llm.batch", time.perf_counter() - started)
+
+            for (key, _, future), result in zip(batch, results):
+                classification = self._validate(result)
+                self.cache.put(key, classification)
+                if not future.done():
+                    future.set_result(classification)
+        finally:
+            # Tudi ob preklicu paketa (CancelledError ni Exception) čakajoči ne smejo obviseti,
+            # naslednja enaka zahteva pa sproži nov klic
+            for key, _, future in batch:
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
+                if not future.done():
+                    future.cancel()
+
+    def _validate(self, result) -> Dict:
+        """Obdrži le znane kategorije in tveganja"""
+        if not isinstance(result, dict):
+            return {"category": "drugo", "risks": []}
+        category = result.get("category")
+        risks = result.get("risks") or []
+        return {
+            "category": category if category in self.categories else "drugo",
+            "risks": [risk for risk in self.risks if risk in risks]
+        }
@@ -0,0 +1,191 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator, List, Optional
+
+# Identifikator zahteve, ki se doda vsakemu zapisu v dnevniku
+correlation_id: contextvars.ContextVar[str] = contextvars.ContextVar("correlation_id", default="-")
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(correlation_id)s] %(message)s'
+
+# Standardni atributi LogRecord; vse ostalo (extra=...) se zapiše v JSON
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "correlation_id"}
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+@contextmanager
+def correlation(value: Optional[str] = None) -> Iterator[str]:
+    """Nastavi identifikator zahteve za trenutni kontekst (nit ali asyncio opravilo)"""
+    token = correlation_id.set(value or new_correlation_id())
+    try:
+        yield correlation_id.get()
+    finally:
+        correlation_id.reset(token)
+
+def call_with_correlation(value: str, fn: Callable, *args: Any) -> Any:
+    """Izvede funkcijo z danim identifikatorjem (za niti in procese, kamor se kontekst ne prenese)"""
+    token = correlation_id.set(value)
+    try:
+        return fn(*args)
+    finally:
+        correlation_id.reset(token)
+
+class JsonFormatter(logging.Formatter):
+    """En JSON objekt na vrstico s časom v UTC, ravnjo, izvorom in identifikatorjem zahteve"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", "-"),
+            "process": record.process,
+            "thread": record.threadName
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Zapis v omejeno vrsto brez čakanja na disk.
+
+    Ko je vrsta polna, se zapisi pod ravnjo block_level zavržejo (in
+    prešteje), opozorila in napake pa počakajo največ block_timeout sekund.
+    Število zavrženih zapisov se zabeleži ob naslednjem uspešnem vpisu.
+    """
+
+    def __init__(self, log_queue: queue.Queue, block_level: int = logging.WARNING,
+                 block_timeout: float = 1.0):
+        super().__init__(log_queue)
+        self.block_level = block_level
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Sporočilo in sled izjeme se oblikujeta v klicoči niti, oblika zapisa pa v pisalni
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.correlation_id = correlation_id.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.dropped:
+            self._report_dropped()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= self.block_level:
+                try:
+                    self.queue.put(record, timeout=self.block_timeout)
+                    return
+                except queue.Full:
+                    pass
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _report_dropped(self) -> None:
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        notice = logging.makeLogRecord({
+            "name": __name__,
+            "levelno": logging.WARNING,
+            "levelname": "WARNING",
+            "msg": f"Vrsta dnevnika je bila polna, zavrženih {dropped} zapisov",
+            "correlation_id": "-",
+            "dropped": dropped
+        })
+        try:
+            self.queue.put_nowait(notice)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += dropped
+
+def create_file_handler(path: str, rotation: str = "size", max_bytes: int = 50 * 1024 * 1024,
+                        backup_count: int = 10, when: str = "midnight") -> logging.Handler:
+    """Datotečni zapisovalnik z rotacijo po velikosti ("size") ali času ("time")"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if rotation == "size":
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+    elif rotation == "time":
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding="utf-8", utc=True
+        )
+    else:
+        raise ValueError(f"Neznan način rotacije dnevnika: {rotation}")
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+def configure_logging(path: str = "insurance_system.log", level: int = logging.INFO,
+                      rotation: str = "size", max_bytes: int = 50 * 1024 * 1024,
+                      backup_count: int = 10, when: str = "midnight",
+                      queue_size: int = 10000, console: bool = False) -> logging.handlers.QueueListener:
+    """Korenskemu zapisovalniku nastavi vrsto; na disk piše ozadna nit.
+
+    Vrne zagnani QueueListener, ki se ob izhodu iz programa ustavi in
+    izprazni vrsto.
+    """
+    handlers: List[logging.Handler] = [
+        create_file_handler(path, rotation, max_bytes, backup_count, when)
+    ]
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(stream)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(NonBlockingQueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener.start()
+    atexit.register(_stop_listener, listener, handlers)
+    return listener
+
+def configure_logging_from_env(console: bool = False) -> logging.handlers.QueueListener:
+    """Nastavitve iz LOG_FILE, LOG_LEVEL, LOG_ROTATION, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_WHEN in LOG_QUEUE_SIZE"""
+    return configure_logging(
+        path=os.getenv("LOG_FILE", "insurance_system.log"),
+        level=logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper()),
+        rotation=os.getenv("LOG_ROTATION", "size"),
+        max_bytes=int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024))),
+        backup_count=int(os.getenv("LOG_BACKUP_COUNT", "10")),
+        when=os.getenv("LOG_WHEN", "midnight"),
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        console=console
+    )
+
+def _stop_listener(listener: logging.handlers.QueueListener, handlers: List[logging.Handler]) -> None:
+    if listener._thread is not None:
+        listener.stop()
+    for handler in handlers:
+        handler.close()
@@ -1,37 +1,40 @@
 import os
-from dotenv import load_dotenv
+import sys
 import logging
-from agents.mga_analyst import MGAAnalyst
-from agents.underwriter import Underwriter
-from agents.policy_manager import PolicyManager
-from agents.risk_exposure import RiskExposure
-from agents.esg_compliance import ESGCompliance
-from utils.document_processor import DocumentProcessor
-from utils.input_validator import InputValidator
-from utils.api_client import APIClient
-from ui.gradio_interface import create_ui
+from dotenv import load_dotenv
 
 # Nalaganje okoljskih spremenljivk
 load_dotenv()
 
-# Konfiguracija beleženja
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename='insurance_system.log'
-)
-
 logger = logging.getLogger(__name__)
 
-async def main():
+def run_ui():
+    # Beleženje prek vrste: zapis na disk ne teče v zanki dogodkov
+    from log_pipeline import configure_logging_from_env
+    configure_logging_from_env()
+
+    # Agenti in gradio se naložijo šele ob zagonu uporabniškega vmesnika
+    from mga_analyst import MGAAnalyst
+    from underwriter import Underwriter
+    from policy_manager import PolicyManager
+    from risk_exposure import RiskExposure
+    from esg_compliance import ESGCompliance
+    from gradio_interface import create_ui
+
     try:
+        # Prometheus metrike faz verige (le če je nastavljen METRICS_PORT)
+        metrics_port = os.getenv("METRICS_PORT")
+        if metrics_port:
+            from metrics import start_metrics_server
+            start_metrics_server(int(metrics_port))
+
         # Inicializacija agentov in pomožnih razredov
         mga_analyst = MGAAnalyst()
         underwriter = Underwriter()
         policy_manager = PolicyManager()
         risk_exposure = RiskExposure()
         esg_compliance = ESGCompliance()
-        
+
         # Zagon uporabniškega vmesnika
         app = create_ui(
             mga_analyst,
@@ -40,11 +43,11 @@ async def main():
             risk_exposure,
             esg_compliance
         )
-        
+
         # Zagon strežnika
-        await app.launch(
+        app.launch(
             server_name=os.getenv("GRADIO_SERVER_NAME"),
-            server_port=int(os.getenv("GRADIO_SERVER_PORT")),
+            server_port=int(os.getenv("GRADIO_SERVER_PORT", "7860")),
             share=True,
             debug=True
         )
@@ -52,6 +55,22 @@ async def main():
         logger.error(f"Napaka pri zagonu aplikacije: {str(e)}")
         raise
 
+def main(argv=None) -> int:
+    """Zagon: brez argumentov uporabniški vmesnik, "batch ..." paketna obdelava brez gradio,
+    "jobs ..." porazdeljena paketna obdelava (koordinator in delavci), "simulate ..." simulacija izgub portfelja"""
+    args = sys.argv[1:] if argv is None else argv
+    if args and args[0] == "batch":
+        from batch_pipeline import main as batch_main
+        return batch_main(args[1:])
+    if args and args[0] == "jobs":
+        from batch_jobs import main as jobs_main
+        return jobs_main(args[1:])
+    if args and args[0] == "simulate":
+        from simulation import main as simulation_main
+        return simulation_main(args[1:])
+
+    run_ui()
+    return 0
+
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
+    sys.exit(main())
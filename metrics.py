@@ -0,0 +1,315 @@
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Meje razredov v sekundah; posamezne faze trajajo od nekaj µs do sekund (ESG)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (faza, trajanje v sekundah, napaka)
+Sample = Tuple[str, float, bool]
+
+class _StageStats:
+    __slots__ = ("buckets", "count", "total", "errors")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+class _Capture(threading.local):
+    # Privzeta vrednost na razredu; getattr z AttributeError je bistveno počasnejši
+    samples: Optional[List[Sample]] = None
+
+class StageMetrics:
+    """Histogrami trajanja, število klicev in napak po fazah verige agentov"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, namespace: str = "insurcap"):
+        self.bounds = tuple(buckets)
+        self.namespace = namespace
+        self._stages: Dict[str, _StageStats] = {}
+        self._lock = threading.Lock()
+        self._local = _Capture()
+
+    def observe(self, stage: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = _StageStats(len(self.bounds) + 1)
+            stats.buckets[bisect_left(self.bounds, seconds)] += 1
+            stats.count += 1
+            stats.total += seconds
+            if error:
+                stats.errors += 1
+
+        samples = self._local.samples
+        if samples is not None:
+            samples.append((stage, seconds, error))
+
+    def record(self, samples: Iterable[Sample]) -> None:
+        """Doda meritve, zbrane v drugem procesu"""
+        for stage, seconds, error in samples:
+            self.observe(stage, seconds, error)
+
+    @contextmanager
+    def capture(self) -> Iterator[List[Sample]]:
+        """Poleg registra zbira meritve trenutne niti (npr. za eno zahtevo)"""
+        previous = self._local.samples
+        samples: List[Sample] = []
+        self._local.samples = samples
+        try:
+            yield samples
+        finally:
+            self._local.samples = previous
+            if previous is not None:
+                previous.extend(samples)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Izmeri trajanje bloka; izjema se šteje kot napaka in posreduje naprej"""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(name, time.perf_counter() - started, error=True)
+            raise
+        self.observe(name, time.perf_counter() - started)
+
+    def instrument(self, name: str) -> Callable:
+        """Dekorator za sinhrone in asinhrone metode agentov"""
+        # Merjenje brez contextmanagerja, ker faze pogosto trajajo le nekaj µs
+        observe, clock = self.observe, time.perf_counter
+
+        def decorator(fn: Callable) -> Callable:
+            if asyncio.iscoroutinefunction(fn):
+                @wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    started = clock()
+                    try:
+                        result = await fn(*args, **kwargs)
+                    except BaseException:
+                        observe(name, clock() - started, True)
+                        raise
+                    observe(name, clock() - started)
+                    return result
+                return async_wrapper
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = clock()
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException:
+                    observe(name, clock() - started, True)
+                    raise
+                observe(name, clock() - started)
+                return result
+            return wrapper
+        return decorator
+
+    def quantile(self, stage: str, q: float) -> Optional[float]:
+        """Oceni kvantil iz razredov histograma (linearna interpolacija kot histogram_quantile)"""
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None or stats.count == 0:
+                return None
+            buckets, count = list(stats.buckets), stats.count
+
+        rank = q * count
+        cumulative = 0
+        for index, bucket in enumerate(buckets):
+            if bucket and cumulative + bucket >= rank:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                return lower + (self.bounds[index] - lower) * (rank - cumulative) / bucket
+            cumulative += bucket
+        return self.bounds[-1]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                stage: {
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "sum_seconds": stats.total,
+                    "buckets": dict(zip(self.bounds + (float("inf"),), stats.buckets))
+                }
+                for stage, stats in self._stages.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def render_prometheus(self) -> str:
+        """Izvoz v tekstovni obliki Prometheus (text/plain; version=0.0.4)"""
+        histogram = f"{self.namespace}_stage_duration_seconds"
+        errors = f"{self.namespace}_stage_errors_total"
+        with self._lock:
+            stages = sorted(
+                (stage, list(stats.buckets), stats.count, stats.total, stats.errors)
+                for stage, stats in self._stages.items()
+            )
+
+        lines = [
+            f"# HELP {histogram} Trajanje faz verige agentov v sekundah.",
+            f"# TYPE {histogram} histogram"
+        ]
+        for stage, buckets, count, total, _ in stages:
+            label = _escape_label(stage)
+            cumulative = 0
+            for bound, bucket in zip(self.bounds, buckets):
+                cumulative += bucket
+                lines.append(f'{histogram}_bucket{{stage="{label}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{histogram}_bucket{{stage="{label}",le="+Inf"}} {count}')
+            lines.append(f'{histogram}_sum{{stage="{label}"}} {total!r}')
+            lines.append(f'{histogram}_count{{stage="{label}"}} {count}')
+
+        lines += [
+            f"# HELP {errors} Število klicev faze, ki so se končali z napako.",
+            f"# TYPE {errors} counter"
+        ]
+        for stage, _, _, _, error_count in stages:
+            lines.append(f'{errors}{{stage="{_escape_label(stage)}"}} {error_count}')
+        return "\n".join(lines) + "\n"
+
+    def format_status(self, samples: Sequence[Sample] = (), stage: str = "request") -> str:
+        """Kratek povzetek za statusno vrstico: faze zahteve in p50/p95 celotnih zahtev"""
+        parts = [f"{name.split('.')[-1]} {seconds * 1000:.2f} ms" for name, seconds, _ in samples]
+        p50, p95 = self.quantile(stage, 0.5), self.quantile(stage, 0.95)
+        if p50 is not None:
+            parts.append(f"{stage} p50 {p50 * 1000:.1f} ms / p95 {p95 * 1000:.1f} ms")
+        return " · ".join(parts)
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class SlowRequestProfiler:
+    """Vzorčni cProfile za počasne zahteve.
+
+    Ko je izklopljen (privzeto), profile() ne naredi ničesar razen enega
+    preverjanja. Ko je vklopljen, profilira delež zahtev (sample_rate) in za
+    tiste, ki trajajo dlje od praga, shrani .pstats datoteko ter v dnevnik
+    zapiše najdražje funkcije. Hkrati teče največ en profil, ker cProfile
+    ne podpira vzporednih profilov.
+    """
+
+    def __init__(self, threshold_ms: Optional[float] = None, sample_rate: float = 1.0,
+                 output_dir: str = "profiles", top: int = 20):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.top = top
+        self.dumped = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SlowRequestProfiler":
+        """Nastavitve iz PROFILE_SLOW_MS (prazno = izklopljeno), PROFILE_SAMPLE_RATE in PROFILE_DIR"""
+        threshold = os.getenv("PROFILE_SLOW_MS")
+        return cls(
+            threshold_ms=float(threshold) if threshold else None,
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "1.0")),
+            output_dir=os.getenv("PROFILE_DIR", "profiles")
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms is not None
+
+    def enable(self, threshold_ms: float, sample_rate: Optional[float] = None) -> None:
+        self.threshold_ms = threshold_ms
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+
+    def disable(self) -> None:
+        self.threshold_ms = None
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        if (self.threshold_ms is None
+                or (self.sample_rate < 1.0 and random.random() >= self.sample_rate)
+                or not self._lock.acquire(blocking=False)):
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+        finally:
+            self._lock.release()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            threshold = self.threshold_ms
+            if threshold is not None and elapsed_ms >= threshold:
+                self._dump(name, profiler, elapsed_ms)
+
+    def _dump(self, name: str, profiler: cProfile.Profile, elapsed_ms: float) -> None:
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+            path = os.path.join(self.output_dir, f"{name}-{stamp}-{os.getpid()}.pstats")
+            profiler.dump_stats(path)
+            self.dumped += 1
+
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(self.top)
+            logger.warning(
+                f"Počasna zahteva {name}: {elapsed_ms:.1f} ms, profil shranjen v {path}\n"
+                f"{summary.getvalue()}"
+            )
+        except Exception as e:
+            logger.error(f"Napaka pri shranjevanju profila: {str(e)}")
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: StageMetrics
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Prometheus bere vsakih nekaj sekund, dostopni dnevnik ni potreben
+        pass
+
+def start_metrics_server(port: int, host: str = "0.0.0.0",
+                         registry: Optional["StageMetrics"] = None) -> ThreadingHTTPServer:
+    """Zažene HTTP strežnik s potjo /metrics v ozadni niti"""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry or metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics", daemon=True)
+    thread.start()
+    logger.info(f"Metrike so na voljo na http://{host}:{server.server_port}/metrics")
+    return server
+
+# Register in profiler procesa; delavci v načinu "process" imajo svoje
+metrics = StageMetrics()
+profiler = SlowRequestProfiler.from_env()
+instrument = metrics.instrument
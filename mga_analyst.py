@@ -1,60 +1,120 @@
-from typing import List, Dict, Union
+from typing import Iterable, List, Dict, Optional, Union
 from datetime import datetime
 import logging
+from keyword_matcher import KeywordMatcher
+from records import InquiryAnalysis
+from metrics import instrument
+from rules import CompiledRules, RulesConsumer, RulesState, RulesStore
 
 logger = logging.getLogger(__name__)
 
-class MGAAnalyst:
-    def __init__(self):
-        self.categories = {
-            "avtomobilsko": ["avto", "vozilo", "motor"],
-            "nepremičninsko": ["hiša", "stanovanje", "zgradba"],
-            "zdravstveno": ["zdravje", "bolezen", "nezgoda"],
-            "življenjsko": ["življenje", "smrt", "varčevanje"]
-        }
-        
-    def analyze_input(self, input_data: Union[str, Dict]) -> Dict:
+class MGAAnalyst(RulesConsumer):
+    def __init__(self, rules_store: Optional[RulesStore] = None):
+        # Kategorije, ključne besede in priporočila so v datoteki pravil
+        self._attach_rules(rules_store)
+
+    @property
+    def categories(self):
+        return self.rules.categories
+
+    @property
+    def risk_keywords(self):
+        return self.rules.risk_keywords
+
+    def prepare_rules(self, rules: CompiledRules) -> RulesState:
+        """Iskalnik ključnih besed se prevede enkrat za vsako različico pravil"""
+        return RulesState(rules, KeywordMatcher({
+            "category": rules.categories,
+            "risk": rules.risk_keywords
+        }))
+
+    def reload_keywords(self, categories: Optional[Dict[str, List[str]]] = None,
+                        risk_keywords: Optional[Dict[str, List[str]]] = None) -> None:
+        """Zamenja ključne besede tega agenta (npr. po dodanih sklonih ali sinonimih).
+
+        Sprememba velja do naslednje spremembe datoteke pravil.
+        """
+        sections = {}
+        if categories is not None:
+            sections["categories"] = categories
+        if risk_keywords is not None:
+            sections["risk_keywords"] = risk_keywords
+        # Nov iskalnik se zgradi v celoti in šele nato zamenja starega
+        self.apply_rules(self.prepare_rules(self.rules.replace(**sections) if sections else self.rules))
+
+    @instrument("mga_analyst.analyze_input")
+    def analyze_input(self, input_data: Union[str, Dict]) -> InquiryAnalysis:
         try:
+            state = self._rules_state
             input_text = input_data if isinstance(input_data, str) else str(input_data)
-            detected_category = self._detect_category(input_text)
-            risks = self._identify_risks(input_text)
-            recommendation = self._generate_recommendation(detected_category, risks)
-            
-            return {
-                "category": detected_category,
-                "risks": risks,
-                "recommendation": recommendation,
-                "timestamp": datetime.now().isoformat()
-            }
+            matches = state.derived.match(input_text)
+            return self._build_analysis(matches["category"], matches["risk"], state.rules)
         except Exception as e:
             logger.error(f"Napaka pri analizi vhodnih podatkov: {str(e)}")
             raise
 
+    @instrument("mga_analyst.analyze_stream")
+    def analyze_stream(self, chunks: Iterable[str]) -> InquiryAnalysis:
+        """Analizira besedilo po kosih (npr. strani dokumenta) brez združevanja v en niz"""
+        try:
+            state = self._rules_state
+            rules = state.rules
+            categories, risks = set(), set()
+            for chunk in chunks:
+                matches = state.derived.match(chunk)
+                categories.update(matches["category"])
+                risks.update(matches["risk"])
+
+            return self._build_analysis(
+                [category for category in rules.categories if category in categories],
+                [risk for risk in rules.risk_keywords if risk in risks],
+                rules
+            )
+        except Exception as e:
+            logger.error(f"Napaka pri analizi dokumentov: {str(e)}")
+            raise
+
+    def needs_classification(self, analysis: InquiryAnalysis) -> bool:
+        """Ključne besede niso določile kategorije (kandidat za razvrščanje z modelom)"""
+        return analysis.category == "drugo"
+
+    def apply_classification(self, analysis: InquiryAnalysis, classification: Dict) -> InquiryAnalysis:
+        """Dopolni analizo s kategorijo in tveganji, ki jih je določil jezikovni model"""
+        rules = self.rules
+        category = classification.get("category")
+        found = set(analysis.risks) | set(classification.get("risks") or ())
+        return self._build_analysis(
+            [category] if category in rules.categories else [],
+            [risk for risk in rules.risk_keywords if risk in found],
+            rules
+        )
+
+    def _build_analysis(self, categories: List[str], risks: List[str],
+                        rules: Optional[CompiledRules] = None) -> InquiryAnalysis:
+        rules = rules or self.rules
+        detected_category = self._select_category(categories)
+        recommendation = self._generate_recommendation(detected_category, risks, rules)
+
+        return InquiryAnalysis(
+            category=detected_category,
+            risks=risks,
+            recommendation=recommendation,
+            timestamp=datetime.now().isoformat(),
+            rules_version=rules.version
+        )
+
     def _detect_category(self, text: str) -> str:
-        for category, keywords in self.categories.items():
-            if any(keyword in text.lower() for keyword in keywords):
-                return category
-        return "drugo"
+        return self._select_category(self._rules_state.derived.match(text)["category"])
+
+    def _select_category(self, categories: List[str]) -> str:
+        return categories[0] if categories else "drugo"
 
     def _identify_risks(self, text: str) -> List[str]:
-        risk_keywords = {
-            "požar": ["požar", "ogenj"],
-            "poplava": ["poplava", "voda"],
-            "vlom": ["vlom", "kraja"],
-            "potres": ["potres", "tresenje"]
-        }
-        
-        return [risk for risk, keywords in risk_keywords.items() 
-                if any(keyword in text.lower() for keyword in keywords)]
-
-    def _generate_recommendation(self, category: str, risks: List[str]) -> str:
-        recommendations = {
-            "avtomobilsko": "Priporočamo avtomobilsko zavarovanje s kritjem za {risks}",
-            "nepremičninsko": "Priporočamo nepremičninsko zavarovanje z vključenim kritjem za {risks}",
-            "zdravstveno": "Priporočamo zdravstveno zavarovanje s poudarkom na {risks}",
-            "življenjsko": "Priporočamo življenjsko zavarovanje z dodatnim kritjem za {risks}"
-        }
-        
-        return recommendations.get(category, "Potrebna je dodatna analiza").format(
+        return self._rules_state.derived.match(text)["risk"]
+
+    def _generate_recommendation(self, category: str, risks: List[str],
+                                 rules: Optional[CompiledRules] = None) -> str:
+        recommendations = (rules or self.rules).recommendations
+        return recommendations.get(category, recommendations["drugo"]).format(
             risks=", ".join(risks) if risks else "osnovna tveganja"
         ) 
\ No newline at end of file
@@ -1,60 +1,109 @@
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 import logging
 from datetime import datetime
+from records import FrozenDict, PolicyDraft, freeze
+from metrics import instrument
+from rules import CompiledRules, RulesConsumer, RulesState, RulesStore
 
 logger = logging.getLogger(__name__)
 
-class PolicyManager:
-    def __init__(self):
-        self.coverage_types = {
-            "avtomobilsko": [
-                "osnovno",
-                "delni kasko",
-                "polni kasko",
-                "asistenca"
-            ],
-            "nepremičninsko": [
-                "požar",
-                "vlom",
-                "poplave",
-                "potres"
-            ],
-            "zdravstveno": [
-                "osnovno",
-                "dodatno",
-                "zobozdravstvo",
-                "specialistični pregledi"
-            ],
-            "življenjsko": [
-                "smrt",
-                "nezgoda",
-                "kritične bolezni",
-                "varčevanje"
-            ]
-        }
+class PolicyManager(RulesConsumer):
+    # Predstavniki intervalov med mejami 0.4, 0.6, 0.7 in 0.8, ki
+    # pokrijejo vse dosegljive kombinacije pasov kritja in posebnih pogojev
+    BAND_SAMPLES = (0.0, 0.5, 0.65, 0.75, 0.9)
+
+    def __init__(self, rules_store: Optional[RulesStore] = None):
+        # Kritja in izključitve so v datoteki pravil, predloge se zgradijo ob vsaki različici
+        self._attach_rules(rules_store)
+
+    @property
+    def coverage_types(self):
+        return self.rules.coverage_types
+
+    @property
+    def standard_exclusions(self):
+        return self.rules.standard_exclusions
+
+    def prepare_rules(self, rules: CompiledRules) -> RulesState:
+        return RulesState(rules, self._build_templates(rules))
 
-    def create_policy_draft(self, risk_evaluation: Dict) -> Dict:
+    def rebuild_templates(self) -> None:
+        """Ponovno zgradi predloge iz trenutnih pravil"""
+        self.apply_rules(self.prepare_rules(self.rules))
+
+    def _build_templates(self, rules: CompiledRules) -> Dict[Tuple, FrozenDict]:
+        """Vnaprej zgradi nespremenljive predloge za vse kombinacije tipa police in pasov tveganja"""
+        templates = {}
+        for policy_type in list(rules.coverage_types) + [None]:
+            for risk_score in self.BAND_SAMPLES:
+                evaluation = {"suggested_policy": policy_type, "risk_score": risk_score}
+                templates[self._template_key(policy_type, risk_score, rules)] = freeze(
+                    self._build_template(policy_type, evaluation, rules)
+                )
+        return templates
+
+    @instrument("policy_manager.create_policy_draft")
+    def create_policy_draft(self, risk_evaluation: Dict) -> PolicyDraft:
         try:
+            state = self._rules_state
             policy_type = risk_evaluation.get("suggested_policy")
-            coverage = self._determine_coverage(policy_type, risk_evaluation)
-            exclusions = self._determine_exclusions(policy_type, risk_evaluation)
-            terms = self._generate_terms(coverage, risk_evaluation)
+            template = state.derived[
+                self._template_key(policy_type, risk_evaluation.get("risk_score", 0.0), state.rules)
+            ]
             
-            return {
-                "policy_type": policy_type,
-                "coverage": coverage,
-                "exclusions": exclusions,
-                "terms": terms,
-                "created_at": datetime.now().isoformat(),
-                "status": "draft"
-            }
+            # Deljena predloga je nespremenljiva, vpišemo le polja posameznega klica
+            return PolicyDraft(
+                policy_type=policy_type,
+                coverage=template["coverage"],
+                exclusions=template["exclusions"],
+                terms=template["terms"],
+                created_at=datetime.now().isoformat(),
+                status="draft",
+                rules_version=state.rules.version
+            )
         except Exception as e:
             logger.error(f"Napaka pri ustvarjanju osnutka police: {str(e)}")
             raise
 
-    def _determine_coverage(self, policy_type: str, risk_evaluation: Dict) -> List[str]:
+    def _template_key(self, policy_type: Optional[str], risk_score: float,
+                      rules: Optional[CompiledRules] = None) -> Tuple:
+        """Ključ predloge: (tip police, pas kritja, pas posebnih pogojev)"""
+        if policy_type not in (rules or self.rules).coverage_types:
+            policy_type = None
+
+        if risk_score > 0.7:
+            coverage_band = 2
+        elif risk_score > 0.4:
+            coverage_band = 1
+        else:
+            coverage_band = 0
+
+        if risk_score > 0.8:
+            conditions_band = 2
+        elif risk_score > 0.6:
+            conditions_band = 1
+        else:
+            conditions_band = 0
+
+        return (policy_type, coverage_band, conditions_band)
+
+    def _build_template(self, policy_type: str, risk_evaluation: Dict,
+                        rules: Optional[CompiledRules] = None) -> Dict:
+        """Zgradi kritje, izključitve in pogoje police brez predpomnjenja"""
+        coverage = self._determine_coverage(policy_type, risk_evaluation, rules)
+        exclusions = self._determine_exclusions(policy_type, risk_evaluation, rules)
+        terms = self._generate_terms(coverage, risk_evaluation)
+
+        return {
+            "coverage": coverage,
+            "exclusions": exclusions,
+            "terms": terms
+        }
+
+    def _determine_coverage(self, policy_type: str, risk_evaluation: Dict,
+                            rules: Optional[CompiledRules] = None) -> List[str]:
         """Določi primerno kritje glede na tip police in oceno tveganja"""
-        base_coverage = self.coverage_types.get(policy_type, [])
+        base_coverage = list((rules or self.rules).coverage_types.get(policy_type, ()))
         risk_score = risk_evaluation.get("risk_score", 0.0)
         
         if risk_score > 0.7:
@@ -64,16 +113,10 @@ class PolicyManager:
         else:
             return base_coverage[:2]  # Samo osnovno kritje
 
-    def _determine_exclusions(self, policy_type: str, risk_evaluation: Dict) -> List[str]:
+    def _determine_exclusions(self, policy_type: str, risk_evaluation: Dict,
+                              rules: Optional[CompiledRules] = None) -> List[str]:
         """Določi izključitve glede na tip police in oceno tveganja"""
-        standard_exclusions = {
-            "avtomobilsko": ["namerna škoda", "vožnja pod vplivom"],
-            "nepremičninsko": ["vojna", "jedrska nesreča"],
-            "zdravstveno": ["predhodne bolezni", "kozmetični posegi"],
-            "življenjsko": ["samomor v prvem letu", "ekstremni športi"]
-        }
-        
-        return standard_exclusions.get(policy_type, [])
+        return list((rules or self.rules).standard_exclusions.get(policy_type, ()))
 
     def _generate_terms(self, coverage: List[str], risk_evaluation: Dict) -> Dict:
         """Generira pogoje police"""
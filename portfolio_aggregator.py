@@ -0,0 +1,215 @@
+from typing import Dict, Hashable, List, Optional, Tuple
+import logging
+import os
+from risk_exposure import RiskExposure
+
+logger = logging.getLogger(__name__)
+
+# Ocene izpostavljenosti so zaokrožene na dve decimalki na intervalu 0-1,
+# zato histogram s 101 celico omogoča natančne kvantile
+SCORE_BINS = 101
+
+class _Bucket:
+    """Tekoči seštevki za eno skupino polic"""
+
+    __slots__ = ("count", "total_cents", "histogram", "factors", "high_factors")
+
+    def __init__(self):
+        self.count = 0
+        # Vsota v stotinkah je celoštevilska, zato odštevanje ne kopiči napake
+        self.total_cents = 0
+        self.histogram = [0] * SCORE_BINS
+        self.factors = 0
+        self.high_factors = 0
+
+    def apply(self, cents: int, factors: int, high_factors: int, sign: int) -> None:
+        self.count += sign
+        self.total_cents += sign * cents
+        self.histogram[cents] += sign
+        self.factors += sign * factors
+        self.high_factors += sign * high_factors
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = max(1, int(-(-q * self.count // 1)))
+        seen = 0
+        for cents, count in enumerate(self.histogram):
+            seen += count
+            if seen >= rank:
+                return cents / 100
+        return 1.0
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "exposure_sum": self.total_cents / 100,
+            "exposure_mean": round(self.total_cents / 100 / self.count, 4) if self.count else 0.0,
+            "high_severity_share": (
+                round(self.high_factors / self.factors, 4) if self.factors else 0.0
+            ),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99)
+        }
+
+class PortfolioAggregator:
+    """Sprotni seštevki izpostavljenosti portfelja z O(1) posodobitvami.
+
+    Za vsako polico hrani le njen prispevek, zato dodajanje, sprememba in
+    preklic police ne zahtevajo ponovnega izračuna celotnega portfelja.
+    """
+
+    def __init__(self, risk_exposure: Optional[RiskExposure] = None):
+        self._severity = (risk_exposure or RiskExposure())._determine_severity
+        self._policies: Dict[Hashable, Tuple[str, str, int, int, int]] = {}
+        self._total = _Bucket()
+        self._by_type: Dict[str, _Bucket] = {}
+        self._by_severity: Dict[str, _Bucket] = {}
+
+    @classmethod
+    def from_env(cls, risk_exposure: Optional[RiskExposure] = None) -> "PortfolioAggregator":
+        """Prazen portfelj ali portfelj iz stolpčnega nabora v PORTFOLIO_DIR"""
+        aggregator = cls(risk_exposure)
+        root = os.getenv("PORTFOLIO_DIR")
+        if root and os.path.isdir(root):
+            try:
+                from portfolio_store import PortfolioSnapshot
+
+                added = aggregator.add_snapshot(PortfolioSnapshot(root))
+                logger.info(f"Portfelj naložen iz {root}: {added} polic")
+            except Exception as e:
+                # Brez shranjenega portfelja vmesnik še vedno deluje
+                logger.error(f"Portfelja iz {root} ni bilo mogoče naložiti: {str(e)}")
+        return aggregator
+
+    def __len__(self) -> int:
+        return len(self._policies)
+
+    def __contains__(self, policy_id: Hashable) -> bool:
+        return policy_id in self._policies
+
+    def add(self, policy_id: Hashable, policy_type: str, exposure: Dict) -> None:
+        """Doda vezano polico z njenim poročilom o izpostavljenosti"""
+        if policy_id in self._policies:
+            raise KeyError(f"Polica {policy_id} je že v portfelju")
+
+        score = exposure["exposure_score"]
+        cents = int(round(score * 100))
+        if not 0 <= cents < SCORE_BINS:
+            logger.warning(f"Ocena izpostavljenosti police {policy_id} ({score}) je izven intervala 0-1, "
+                           f"v seštevkih je omejena")
+            cents = min(SCORE_BINS - 1, max(0, cents))
+        risk_factors = exposure["risk_factors"]
+        high_factors = sum(1 for factor in risk_factors if factor["severity"] == "visoko")
+        contribution = (policy_type, self._severity(score), cents, len(risk_factors), high_factors)
+
+        self._policies[policy_id] = contribution
+        self._apply(contribution, 1)
+
+    def add_snapshot(self, snapshot, **filters) -> int:
+        """Doda vse police stolpčnega portfelja (PortfolioSnapshot); vrne število polic.
+
+        Seštevki se izračunajo vektorsko po stolpcih, ne polico za polico.
+        Če je bila polica izvožena večkrat (npr. ponovljena paketna obdelava),
+        velja zadnji osnutek; polica, ki je že v portfelju, se zamenja.
+        """
+        import numpy as np
+        import pyarrow.compute as pc
+        from portfolio_store import to_numpy
+
+        table = snapshot.table(
+            ["policy_ref", "policy_type", "exposure_score", "factor_count", "high_factors"],
+            latest=True, **filters
+        )
+        refs = table.column("policy_ref").to_pylist()
+        for policy_id in self._policies.keys() & set(refs):
+            self.cancel(policy_id)
+
+        cents = np.rint(to_numpy(table.column("exposure_score"), 0.0) * 100)
+        outside = int(((cents < 0) | (cents >= SCORE_BINS)).sum())
+        if outside:
+            logger.warning(f"{outside} polic ima oceno izpostavljenosti izven intervala 0-1, "
+                           f"v seštevkih je omejena")
+        cents = np.clip(cents, 0, SCORE_BINS - 1).astype(np.intp)
+        factors = to_numpy(table.column("factor_count"), 0).astype(np.int64)
+        high_factors = to_numpy(table.column("high_factors"), 0).astype(np.int64)
+        policy_types = pc.dictionary_encode(table.column("policy_type")).combine_chunks()
+        type_names = policy_types.dictionary.to_pylist() + [None]
+        type_codes = policy_types.indices.fill_null(len(type_names) - 1).to_numpy()
+        # Resnost je odvisna le od ocene, zato jo izračunamo za vsako stotinko enkrat
+        severity_names = sorted({self._severity(cell / 100) for cell in range(SCORE_BINS)})
+        severity_of = np.array([
+            severity_names.index(self._severity(cell / 100)) for cell in range(SCORE_BINS)
+        ])
+        severity_codes = severity_of[cents]
+
+        self._policies.update(zip(refs, zip(
+            [type_names[code] for code in type_codes.tolist()],
+            [severity_names[code] for code in severity_codes.tolist()],
+            cents.tolist(), factors.tolist(), high_factors.tolist()
+        )))
+
+        groups = [(self._total, slice(None))]
+        groups.extend(
+            (self._by_type.setdefault(name, _Bucket()), type_codes == code)
+            for code, name in enumerate(type_names) if (type_codes == code).any()
+        )
+        groups.extend(
+            (self._by_severity.setdefault(name, _Bucket()), severity_codes == code)
+            for code, name in enumerate(severity_names) if (severity_codes == code).any()
+        )
+        for bucket, mask in groups:
+            selected = cents[mask]
+            bucket.count += len(selected)
+            bucket.total_cents += int(selected.sum())
+            bucket.factors += int(factors[mask].sum())
+            bucket.high_factors += int(high_factors[mask].sum())
+            counts = np.bincount(selected, minlength=SCORE_BINS).tolist()
+            bucket.histogram = [old + new for old, new in zip(bucket.histogram, counts)]
+        return len(refs)
+
+    def modify(self, policy_id: Hashable, policy_type: str, exposure: Dict) -> None:
+        """Zamenja prispevek obstoječe police"""
+        self.cancel(policy_id)
+        self.add(policy_id, policy_type, exposure)
+
+    def cancel(self, policy_id: Hashable) -> None:
+        """Odstrani preklicano polico iz seštevkov"""
+        contribution = self._policies.pop(policy_id, None)
+        if contribution is None:
+            raise KeyError(f"Police {policy_id} ni v portfelju")
+        self._apply(contribution, -1)
+
+    def quantile(self, q: float, policy_type: Optional[str] = None) -> Optional[float]:
+        """Natančen kvantil ocen izpostavljenosti (celotni portfelj ali en tip police)"""
+        bucket = self._total if policy_type is None else self._by_type.get(policy_type)
+        return bucket.quantile(q) if bucket else None
+
+    def histogram(self, policy_type: Optional[str] = None) -> List[int]:
+        """Število polic po ocenah izpostavljenosti 0.00, 0.01, ..., 1.00"""
+        bucket = self._total if policy_type is None else self._by_type.get(policy_type)
+        return list(bucket.histogram) if bucket else [0] * SCORE_BINS
+
+    def snapshot(self) -> Dict:
+        """Povzetek portfelja po tipih polic in pasovih resnosti"""
+        return {
+            "total": self._total.summary(),
+            "by_policy_type": {
+                policy_type: bucket.summary()
+                for policy_type, bucket in self._by_type.items() if bucket.count
+            },
+            "by_severity": {
+                severity: bucket.summary()
+                for severity, bucket in self._by_severity.items() if bucket.count
+            }
+        }
+
+    def _apply(self, contribution: Tuple[str, str, int, int, int], sign: int) -> None:
+        policy_type, severity, cents, factors, high_factors = contribution
+        for bucket in (
+            self._total,
+            self._by_type.setdefault(policy_type, _Bucket()),
+            self._by_severity.setdefault(severity, _Bucket())
+        ):
+            bucket.apply(cents, factors, high_factors, sign)
@@ -0,0 +1,376 @@
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+# Oblike zapisa: arrow (IPC brez stiskanja) se bere prek preslikave v
+# pomnilnik brez kopiranja, parquet je manjši in primeren za izmenjavo
+FORMATS = {"arrow": ("ipc", ".arrow"), "parquet": ("parquet", ".parquet")}
+SCHEMA_FILE = "_schema.arrow"
+# Ime mape za manjkajočo vrednost particije (enako kot pri Hive in pyarrow)
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+PARTITION_SCHEMA = pa.schema([("policy_type", pa.string()), ("date", pa.string())])
+
+_TEXT = pa.dictionary(pa.int32(), pa.string())
+_TEXT_LIST = pa.list_(pa.string())
+
+BASE_FIELDS = (
+    ("policy_ref", pa.string()),
+    ("row", pa.int64()),
+    ("created_at", pa.timestamp("us")),
+    ("status", _TEXT),
+    ("category", _TEXT),
+    ("risks", _TEXT_LIST),
+    ("peril_mask", pa.int32()),
+    ("risk_score", pa.float64()),
+    ("premium", pa.float64()),
+    ("coverage", _TEXT_LIST),
+    ("exclusions", _TEXT_LIST),
+    ("special_conditions", _TEXT_LIST),
+    ("duration", _TEXT),
+    ("payment_frequency", _TEXT),
+    ("waiting_period", _TEXT),
+    ("location", _TEXT),
+    ("sum_insured", pa.float64()),
+    ("exposure_score", pa.float64()),
+    ("confidence_level", pa.float64()),
+    ("factor_count", pa.int8()),
+    ("high_factors", pa.int8()),
+    ("mitigation_suggestions", _TEXT_LIST),
+    ("analysis_timestamp", pa.timestamp("us")),
+    ("rules_version", _TEXT)
+)
+
+def build_schema(perils: Sequence[str], factors: Iterable[str], format: str = "arrow") -> pa.Schema:
+    """Shema datotek portfelja: osnovni stolpci in <faktor>_score za vsak faktor tveganja"""
+    factors = list(dict.fromkeys(factors))
+    fields = [pa.field(name, kind) for name, kind in BASE_FIELDS]
+    fields.extend(pa.field(f"{factor}_score", pa.float64()) for factor in factors)
+    return pa.schema(fields, metadata={
+        "perils": json.dumps(list(perils), ensure_ascii=False),
+        "factors": json.dumps(factors, ensure_ascii=False),
+        "format": format
+    })
+
+def _metadata(schema: pa.Schema, key: str):
+    return json.loads(schema.metadata[key.encode()].decode())
+
+def _timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def to_numpy(values: pa.ChunkedArray, fill: float = np.nan) -> np.ndarray:
+    """Stolpec kot numpy polje; manjkajoče vrednosti dobijo vrednost fill.
+
+    Stolpec iz ene datoteke brez manjkajočih vrednosti se ne kopira.
+    """
+    if values.null_count:
+        values = values.fill_null(fill)
+    if values.num_chunks == 1:
+        return values.chunk(0).to_numpy(zero_copy_only=False)
+    return values.to_numpy()
+
+def remap_perils(masks: np.ndarray, written: Sequence[str], perils: Sequence[str]) -> np.ndarray:
+    """Biti nevarnosti sledijo vrstnemu redu ob zapisu, zato jih preuredimo na perils"""
+    if tuple(perils) == tuple(written):
+        return masks
+    remapped = np.zeros_like(masks)
+    for bit, peril in enumerate(written):
+        if peril in perils:
+            remapped |= ((masks >> bit) & 1) << list(perils).index(peril)
+    return remapped
+
+def _partition_path(policy_type: Optional[str], date: str) -> str:
+    # Vrednosti particij so kodirane kot URI, kar pyarrow ob branju dekodira
+    segment = NULL_PARTITION if policy_type is None else quote(policy_type, safe="")
+    return os.path.join(f"policy_type={segment}", f"date={date}")
+
+class PortfolioWriter:
+    """Sproti zapisuje osnutke polic in poročila o izpostavljenosti v stolpčni nabor.
+
+    Vrstice se zbirajo po particijah (tip police, datum osnutka); particija
+    se zapiše kot nova datoteka, ko zbere rows_per_file vrstic, ostale ob
+    flush() oziroma close(). Obstoječe datoteke
+    se nikoli ne prepisujejo. Datoteka nastane v mapi _staging in se šele
+    nato premakne v particijo, zato bralci nikoli ne vidijo delnega zapisa.
+    """
+
+    def __init__(self, root: str, perils: Sequence[str], factors: Iterable[str],
+                 format: str = "arrow", rows_per_file: int = 100_000):
+        if format not in FORMATS:
+            raise ValueError(f"Neznana oblika zapisa portfelja: {format}")
+        self.root = root
+        self.format = format
+        self.rows_per_file = rows_per_file
+        self.perils = tuple(perils)
+        self.schema = self._merge_schema(build_schema(self.perils, factors, format))
+        self._factor_columns = {factor: f"{factor}_score" for factor in _metadata(self.schema, "factors")}
+        self._buffers: Dict[Tuple[Optional[str], str], Dict[str, List]] = {}
+        self.written = 0
+        self.files = 0
+
+    def _merge_schema(self, schema: pa.Schema) -> pa.Schema:
+        """Združi shemo z obstoječim naborom; novi faktorji se dodajo na konec"""
+        os.makedirs(os.path.join(self.root, "_staging"), exist_ok=True)
+        existing = read_schema(self.root)
+        if existing is not None:
+            if existing.metadata.get(b"format", b"").decode() != self.format:
+                raise ValueError(f"Portfelj v {self.root} ni v obliki {self.format}")
+            if _metadata(existing, "perils") != list(self.perils):
+                raise ValueError(f"Portfelj v {self.root} ima drugačen seznam nevarnosti")
+            known = _metadata(existing, "factors")
+            added = [factor for factor in _metadata(schema, "factors") if factor not in known]
+            if not added:
+                return existing
+            schema = pa.schema(
+                list(existing) + [pa.field(f"{factor}_score", pa.float64()) for factor in added],
+                metadata={**existing.metadata, b"factors": json.dumps(known + added, ensure_ascii=False)}
+            )
+
+        staging = os.path.join(self.root, "_staging", f"{uuid.uuid4().hex}{SCHEMA_FILE}")
+        with pa.OSFile(staging, "wb") as sink, pa.ipc.new_file(sink, schema):
+            pass
+        os.replace(staging, os.path.join(self.root, SCHEMA_FILE))
+        return schema
+
+    def add(self, record: Dict, location: Optional[str] = None,
+            sum_insured: Optional[float] = None, source: Optional[str] = None) -> None:
+        """Doda rezultat verige (analysis, risk_evaluation, policy, exposure) za eno polico.
+
+        policy_ref je "<source>:<id>", zato se police iz različnih vhodnih
+        datotek (source, npr. zgoščena vrednost datoteke) z enakim id ali
+        številko vrstice ne prekrivajo.
+        """
+        analysis = record.get("analysis") or {}
+        risk_evaluation = record.get("risk_evaluation") or {}
+        policy = record["policy"]
+        exposure = record["exposure"]
+        terms = policy.get("terms") or {}
+        risk_factors = exposure.get("risk_factors") or []
+        risks = list(analysis.get("risks") or [])
+
+        created_at = _timestamp(policy.get("created_at")) or datetime.now()
+        key = (policy.get("policy_type"), created_at.date().isoformat())
+        columns = self._buffers.get(key)
+        if columns is None:
+            columns = self._buffers[key] = {field.name: [] for field in self.schema}
+
+        ref = str(record.get("id", record.get("row")))
+        values = {
+            "policy_ref": ref if source is None else f"{source}:{ref}",
+            "row": record.get("row"),
+            "created_at": created_at,
+            "status": policy.get("status"),
+            "category": analysis.get("category"),
+            "risks": risks,
+            "peril_mask": sum(1 << self.perils.index(risk) for risk in set(risks) if risk in self.perils),
+            "risk_score": risk_evaluation.get("risk_score"),
+            "premium": risk_evaluation.get("premium"),
+            "coverage": list(policy.get("coverage") or []),
+            "exclusions": list(policy.get("exclusions") or []),
+            "special_conditions": list(terms.get("special_conditions") or []),
+            "duration": terms.get("duration"),
+            "payment_frequency": terms.get("payment_frequency"),
+            "waiting_period": terms.get("waiting_period"),
+            "location": location,
+            "sum_insured": None if sum_insured in (None, "") else float(sum_insured),
+            "exposure_score": exposure.get("exposure_score"),
+            "confidence_level": exposure.get("confidence_level"),
+            "factor_count": len(risk_factors),
+            "high_factors": sum(1 for factor in risk_factors if factor["severity"] == "visoko"),
+            "mitigation_suggestions": list(exposure.get("mitigation_suggestions") or []),
+            "analysis_timestamp": _timestamp(exposure.get("analysis_timestamp")),
+            "rules_version": policy.get("rules_version")
+        }
+        for factor in risk_factors:
+            column = self._factor_columns.get(factor["factor"])
+            if column is not None:
+                values[column] = factor["score"]
+        for name, column in columns.items():
+            column.append(values.get(name))
+
+        if len(columns["policy_ref"]) >= self.rows_per_file:
+            self._write_partition(key, self._buffers.pop(key))
+
+    def flush(self) -> None:
+        """Zapiše vse zbrane vrstice, po eno novo datoteko za vsako particijo"""
+        buffers, self._buffers = self._buffers, {}
+        for key, columns in buffers.items():
+            self._write_partition(key, columns)
+
+    def _write_partition(self, key: Tuple[Optional[str], str], columns: Dict[str, List]) -> None:
+        backend, extension = FORMATS[self.format]
+        table = pa.Table.from_pydict(columns, schema=self.schema)
+        name = f"part-{uuid.uuid4().hex}{extension}"
+        staging = os.path.join(self.root, "_staging", name)
+        if backend == "ipc":
+            with pa.OSFile(staging, "wb") as sink, pa.ipc.new_file(sink, self.schema) as writer:
+                writer.write_table(table, max_chunksize=self.rows_per_file)
+        else:
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, staging, compression="zstd")
+
+        directory = os.path.join(self.root, _partition_path(*key))
+        os.makedirs(directory, exist_ok=True)
+        os.replace(staging, os.path.join(directory, name))
+        self.written += table.num_rows
+        self.files += 1
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "PortfolioWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.flush()
+
+def read_schema(root: str) -> Optional[pa.Schema]:
+    """Shema nabora ali None, če nabor še ne obstaja"""
+    path = os.path.join(root, SCHEMA_FILE)
+    if not os.path.exists(path):
+        return None
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).schema
+
+class PortfolioSnapshot:
+    """Branje stolpčnega nabora portfelja brez razčlenjevanja JSON.
+
+    Odpiranje prebere le shemo in seznam datotek, zato je takojšnje ne
+    glede na velikost portfelja. Datoteke arrow se preslikajo v pomnilnik:
+    številski stolpci brez manjkajočih vrednosti se vrnejo kot pogledi na
+    preslikane strani, podatki pa se z diska berejo šele ob dostopu.
+    Filtri po tipu police in datumu preskočijo neustrezne particije.
+    """
+
+    def __init__(self, root: str):
+        schema = read_schema(root)
+        if schema is None:
+            raise FileNotFoundError(f"V {root} ni portfelja ({SCHEMA_FILE})")
+        self.root = root
+        self.format = schema.metadata[b"format"].decode()
+        self.perils = tuple(_metadata(schema, "perils"))
+        self.factors = _metadata(schema, "factors")
+        self.schema = pa.unify_schemas([schema, PARTITION_SCHEMA])
+        self.dataset = ds.dataset(
+            root,
+            schema=self.schema,
+            format=FORMATS[self.format][0],
+            partitioning=ds.HivePartitioning(PARTITION_SCHEMA, null_fallback=NULL_PARTITION,
+                                             segment_encoding="uri"),
+            filesystem=pafs.LocalFileSystem(use_mmap=True)
+        )
+
+    def __len__(self) -> int:
+        return self.dataset.count_rows()
+
+    def _filter(self, policy_type: Optional[str], date_from: Optional[str],
+                date_to: Optional[str]) -> Optional[ds.Expression]:
+        expression = None
+        for condition in (
+            None if policy_type is None else ds.field("policy_type") == policy_type,
+            None if date_from is None else ds.field("date") >= date_from,
+            None if date_to is None else ds.field("date") <= date_to
+        ):
+            if condition is not None:
+                expression = condition if expression is None else expression & condition
+        return expression
+
+    def table(self, columns: Optional[Sequence[str]] = None, policy_type: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              latest: bool = False) -> pa.Table:
+        """Izbrani stolpci (privzeto vsi) za police določenega tipa in obdobje (YYYY-MM-DD).
+
+        Z latest=True ostane za vsak policy_ref le zadnji osnutek (če je bila
+        ista datoteka obdelana večkrat), sicer so vrnjene vse vrstice.
+        """
+        filter = self._filter(policy_type, date_from, date_to)
+        if not latest:
+            return self.dataset.to_table(columns=columns and list(columns), filter=filter)
+
+        names = list(columns) if columns is not None else self.schema.names
+        table = self.dataset.to_table(
+            columns=list(dict.fromkeys(names + ["policy_ref", "created_at"])), filter=filter
+        )
+        refs = table.column("policy_ref").to_pylist()
+        if len(set(refs)) != len(refs):
+            order = pc.sort_indices(table, [("created_at", "ascending")]).to_numpy().tolist()
+            newest = dict(zip([refs[index] for index in order], order))
+            table = table.take(sorted(newest.values()))
+        return table.select(names)
+
+    def to_pandas(self, columns: Optional[Sequence[str]] = None, **filters) -> "pd.DataFrame":
+        return self.table(columns, **filters).to_pandas()
+
+    def column(self, name: str, **filters) -> np.ndarray:
+        """En stolpec kot numpy polje; brez manjkajočih vrednosti v eni datoteki brez kopiranja"""
+        return to_numpy(self.table([name], **filters).column(0))
+
+    def exposure_frame(self, latest: bool = True, **filters) -> "pd.DataFrame":
+        """Izpostavljenost v obliki RiskExposure.calculate_exposure_batch (privzeto zadnji osnutki)"""
+        import pandas as pd
+
+        factors = self.factors
+        table = self.table(
+            ["policy_ref", "policy_type", "exposure_score", "confidence_level"]
+            + [f"{factor}_score" for factor in factors], latest=latest, **filters
+        )
+        frame = pd.DataFrame({
+            "exposure_score": to_numpy(table.column("exposure_score")),
+            "confidence_level": to_numpy(table.column("confidence_level"))
+        }, index=pd.Index(table.column("policy_ref").to_pylist(), name="policy_ref"))
+        for factor in factors:
+            scores = to_numpy(table.column(f"{factor}_score"))
+            frame[f"{factor}_score"] = scores
+            severity_codes = np.where(
+                np.isnan(scores), -1, (scores >= 0.3).astype(int) + (scores >= 0.7)
+            )
+            frame[f"{factor}_severity"] = pd.Categorical.from_codes(
+                severity_codes, categories=["nizko", "srednje", "visoko"]
+            )
+        return frame
+
+    def book(self, perils: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Stolpci za simulation.LossModel, enako kot simulation.read_book iz JSONL"""
+        from accumulation import DEFAULT_SUM_INSURED, load_municipalities, normalize_location
+
+        municipalities = {name: index for index, name in enumerate(load_municipalities(), start=1)}
+        table = self.table(["policy_type", "sum_insured", "exposure_score", "peril_mask", "location"],
+                           latest=True)
+
+        # Privzete vsote in regije se preslikajo enkrat za vsako različno vrednost
+        policy_types = pc.dictionary_encode(table.column("policy_type")).combine_chunks()
+        type_sums = np.array(
+            [DEFAULT_SUM_INSURED.get(name, 50000.0) for name in policy_types.dictionary.to_pylist()]
+            + [DEFAULT_SUM_INSURED.get(None, 50000.0)]
+        )
+        type_codes = policy_types.indices.fill_null(len(type_sums) - 1).to_numpy()
+        sums = to_numpy(table.column("sum_insured"))
+        sums = np.where(np.isnan(sums), type_sums[type_codes], sums)
+
+        locations = table.column("location").combine_chunks()
+        if not pa.types.is_dictionary(locations.type):
+            locations = pc.dictionary_encode(locations)
+        region_of = np.array(
+            [municipalities.get(normalize_location(name or ""), 0) for name in locations.dictionary.to_pylist()]
+            + [0], dtype=np.int64
+        )
+        regions = region_of[locations.indices.fill_null(len(region_of) - 1).to_numpy()]
+
+        return {
+            "sum_insured": sums,
+            "exposure": to_numpy(table.column("exposure_score")),
+            "mask": remap_perils(to_numpy(table.column("peril_mask"), 0).astype(np.int64),
+                                 self.perils, perils),
+            "region": regions,
+            "region_count": len(municipalities) + 1
+        }
@@ -0,0 +1,115 @@
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tabele imajo 2^n vrstic za n nevarnosti, zato je njihovo število omejeno
+# (12 nevarnosti: 4096 kombinacij, tabele se zgradijo v manj kot desetinki sekunde)
+MAX_PERILS = 12
+
+class RatingEngine:
+    """Tabelarični izračun premij.
+
+    Ob zagonu zgradi tabele premij za vse kombinacije tipa police, pasu
+    tveganja in nabora nevarnosti (požar, poplava, vlom, potres). Izračun
+    ponudbe je nato le iskanje pasu z bisekcijo in branje iz tabele, zato
+    skalarni in paketni način vrneta enake zneske.
+    """
+
+    # Zgornje meje pasov ocene tveganja
+    BAND_BOUNDS = (0.2, 0.4, 0.6, 0.8, 1.0)
+    BAND_LABELS = ("zelo nizko", "nizko", "srednje", "visoko", "zelo visoko")
+    BAND_FACTORS = (0.8, 1.0, 1.25, 1.6, 2.0)
+    # Letna osnovna premija (EUR) po tipu police; None za neznan tip
+    BASE_PREMIUMS = {
+        "avtomobilsko": 450.0,
+        "nepremičninsko": 300.0,
+        "zdravstveno": 600.0,
+        "življenjsko": 500.0,
+        None: 250.0
+    }
+    # Doplačilo za nevarnost kot delež osnovne premije, pomnožen z utežjo nevarnosti
+    PERIL_LOADING = 0.5
+
+    def __init__(self, risk_weights: Dict[str, float]):
+        if len(risk_weights) > MAX_PERILS:
+            raise ValueError(f"Največje podprto število nevarnosti je {MAX_PERILS}, podanih je {len(risk_weights)}")
+        self.perils = tuple(risk_weights)
+        self.risk_weights = dict(risk_weights)
+        self._peril_bits = {peril: 1 << index for index, peril in enumerate(self.perils)}
+        self._policy_index = {policy_type: index for index, policy_type in enumerate(self.BASE_PREMIUMS)}
+        self._build_tables()
+
+    def _build_tables(self) -> None:
+        combinations = 1 << len(self.perils)
+        self.risk_scores: Tuple[float, ...] = tuple(
+            round(min(1.0, sum(
+                (weight for peril, weight in self.risk_weights.items()
+                 if mask & self._peril_bits[peril]),
+                0.0
+            )), 2)
+            for mask in range(combinations)
+        )
+        self.band_index: Tuple[int, ...] = tuple(self.band_for(score) for score in self.risk_scores)
+
+        # premiums[tip police][maska nevarnosti] -> premija za pas te maske
+        premiums: List[Tuple[float, ...]] = []
+        loadings: List[Dict[str, float]] = []
+        for policy_type, base in self.BASE_PREMIUMS.items():
+            peril_loadings = {
+                peril: base * weight * self.PERIL_LOADING
+                for peril, weight in self.risk_weights.items()
+            }
+            loadings.append(peril_loadings)
+            premiums.append(tuple(
+                round(
+                    base * self.BAND_FACTORS[self.band_index[mask]]
+                    + sum(
+                        loading for peril, loading in peril_loadings.items()
+                        if mask & self._peril_bits[peril]
+                    ),
+                    2
+                )
+                for mask in range(combinations)
+            ))
+        self.premiums: Tuple[Tuple[float, ...], ...] = tuple(premiums)
+        self.peril_loadings: Tuple[Dict[str, float], ...] = tuple(loadings)
+
+    def peril_mask(self, perils: Iterable[str]) -> int:
+        """Bitna maska nevarnosti; neznane nevarnosti se prezrejo"""
+        mask = 0
+        for peril in perils:
+            mask |= self._peril_bits.get(peril, 0)
+        return mask
+
+    def band_for(self, risk_score: float) -> int:
+        """Indeks pasu tveganja (iskanje z bisekcijo)"""
+        return min(bisect_left(self.BAND_BOUNDS, risk_score), len(self.BAND_BOUNDS) - 1)
+
+    def policy_index(self, policy_type: Optional[str]) -> int:
+        return self._policy_index.get(policy_type, self._policy_index[None])
+
+    def quote(self, policy_type: Optional[str], perils: Iterable[str]) -> Tuple[float, int, float]:
+        """Vrne (ocena tveganja, indeks pasu, premija) za eno ponudbo"""
+        mask = self.peril_mask(perils)
+        return (
+            self.risk_scores[mask],
+            self.band_index[mask],
+            self.premiums[self.policy_index(policy_type)][mask]
+        )
+
+    def quote_batch(self, policy_types: Sequence[Optional[str]], peril_masks: Sequence[int]):
+        """Paketni izračun; vrne NumPy polja ocen, pasov in premij"""
+        import numpy as np
+
+        masks = np.asarray(peril_masks, dtype=np.int64)
+        types = np.fromiter(
+            (self.policy_index(policy_type) for policy_type in policy_types),
+            dtype=np.int64, count=len(masks)
+        )
+        return (
+            np.asarray(self.risk_scores)[masks],
+            np.asarray(self.band_index)[masks],
+            np.asarray(self.premiums)[types, masks]
+        )
@@ -0,0 +1,142 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+class FrozenDict(dict):
+    """Slovar, ki ga ni mogoče spreminjati (deljen med osnutki polic in različicami pravil)"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenDict ni mogoče spreminjati")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+def freeze(value: Any) -> Any:
+    """Rekurzivno pretvori slovarje in sezname v nespremenljive oblike"""
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+class Record:
+    """Osnova za kompaktne zapise rezultatov agentov.
+
+    Zapisi uporabljajo __slots__ namesto slovarja atributov. Za združljivost
+    s kodo, ki pričakuje slovarje, podpirajo branje s [] in get(), za
+    izpis v uporabniškem vmesniku pa to_dict().
+    """
+
+    __slots__ = ()
+
+    def to_dict(self) -> Dict:
+        return {name: _plain(getattr(self, name)) for name in self.__slots__}
+
+    def keys(self) -> Sequence[str]:
+        return self.__slots__
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.__slots__:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__slots__
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+def _plain(value: Any) -> Any:
+    """Pretvori gnezdene zapise v slovarje, ostale vrednosti pusti nespremenjene"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, (list, tuple)) and value and isinstance(value[0], Record):
+        return [item.to_dict() for item in value]
+    return value
+
+class InquiryAnalysis(Record):
+    """Rezultat MGAAnalyst.analyze_input"""
+
+    __slots__ = ("category", "risks", "recommendation", "timestamp", "rules_version")
+
+    def __init__(self, category: str, risks: List[str], recommendation: str, timestamp: str,
+                 rules_version: Optional[str] = None):
+        self.category = category
+        self.risks = risks
+        self.recommendation = recommendation
+        self.timestamp = timestamp
+        self.rules_version = rules_version
+
+class RiskEvaluation(Record):
+    """Rezultat Underwriter.evaluate_risk"""
+
+    __slots__ = ("risk_score", "suggested_policy", "premium", "details", "rules_version")
+
+    def __init__(self, risk_score: Optional[float], suggested_policy: Optional[str],
+                 premium: Optional[float], details: Optional[Dict],
+                 rules_version: Optional[str] = None):
+        self.risk_score = risk_score
+        self.suggested_policy = suggested_policy
+        self.premium = premium
+        self.details = details
+        self.rules_version = rules_version
+
+class PolicyDraft(Record):
+    """Rezultat PolicyManager.create_policy_draft"""
+
+    __slots__ = ("policy_type", "coverage", "exclusions", "terms", "created_at", "status",
+                 "rules_version")
+
+    def __init__(self, policy_type: Optional[str], coverage: Sequence[str],
+                 exclusions: Sequence[str], terms: Dict, created_at: str, status: str = "draft",
+                 rules_version: Optional[str] = None):
+        self.policy_type = policy_type
+        self.coverage = coverage
+        self.exclusions = exclusions
+        self.terms = terms
+        self.created_at = created_at
+        self.status = status
+        self.rules_version = rules_version
+
+class RiskFactor(Record):
+    """Ovrednoten posamezni faktor tveganja"""
+
+    __slots__ = ("factor", "score", "weight", "impact", "severity")
+
+    def __init__(self, factor: str, score: float, weight: float, impact: float, severity: str):
+        self.factor = factor
+        self.score = score
+        self.weight = weight
+        self.impact = impact
+        self.severity = severity
+
+class ExposureReport(Record):
+    """Rezultat RiskExposure.calculate_exposure"""
+
+    __slots__ = ("exposure_score", "risk_factors", "mitigation_suggestions",
+                 "analysis_timestamp", "confidence_level", "rules_version")
+
+    def __init__(self, exposure_score: float, risk_factors: List[RiskFactor],
+                 mitigation_suggestions: List[str], analysis_timestamp: str,
+                 confidence_level: float, rules_version: Optional[str] = None):
+        self.exposure_score = exposure_score
+        self.risk_factors = risk_factors
+        self.mitigation_suggestions = mitigation_suggestions
+        self.analysis_timestamp = analysis_timestamp
+        self.confidence_level = confidence_level
+        self.rules_version = rules_version
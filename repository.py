@@ -0,0 +1,331 @@
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DRAFT_COLUMNS = ("policy_ref", "policy_type", "coverage", "exclusions", "terms", "status", "created_at")
+EXPOSURE_COLUMNS = ("policy_ref", "exposure_score", "confidence_level", "risk_factors",
+                    "mitigation_suggestions", "analysis_timestamp")
+
+SCHEMA = {
+    "postgresql": (
+        """CREATE TABLE IF NOT EXISTS policy_drafts (
+            id BIGSERIAL PRIMARY KEY,
+            policy_ref TEXT NOT NULL,
+            policy_type TEXT,
+            coverage JSONB,
+            exclusions JSONB,
+            terms JSONB,
+            status TEXT,
+            created_at TIMESTAMP
+        )""",
+        "CREATE INDEX IF NOT EXISTS policy_drafts_ref ON policy_drafts (policy_ref)",
+        """CREATE TABLE IF NOT EXISTS exposure_reports (
+            id BIGSERIAL PRIMARY KEY,
+            policy_ref TEXT NOT NULL,
+            exposure_score DOUBLE PRECISION,
+            confidence_level DOUBLE PRECISION,
+            risk_factors JSONB,
+            mitigation_suggestions JSONB,
+            analysis_timestamp TIMESTAMP
+        )""",
+        "CREATE INDEX IF NOT EXISTS exposure_reports_ref ON exposure_reports (policy_ref)"
+    ),
+    "sqlite": (
+        """CREATE TABLE IF NOT EXISTS policy_drafts (
+            id INTEGER PRIMARY KEY,
+            policy_ref TEXT NOT NULL,
+            policy_type TEXT,
+            coverage TEXT,
+            exclusions TEXT,
+            terms TEXT,
+            status TEXT,
+            created_at TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS policy_drafts_ref ON policy_drafts (policy_ref)",
+        """CREATE TABLE IF NOT EXISTS exposure_reports (
+            id INTEGER PRIMARY KEY,
+            policy_ref TEXT NOT NULL,
+            exposure_score REAL,
+            confidence_level REAL,
+            risk_factors TEXT,
+            mitigation_suggestions TEXT,
+            analysis_timestamp TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS exposure_reports_ref ON exposure_reports (policy_ref)"
+    )
+}
+
+class PostgresConnectionManager:
+    """Bazen povezav na PostgreSQL (nastavitve iz DB_* okoljskih spremenljivk)"""
+
+    dialect = "postgresql"
+
+    def __init__(self, min_connections: int = 1, max_connections: int = 10, **connect_kwargs):
+        from psycopg2.pool import ThreadedConnectionPool
+
+        params = {
+            "host": os.getenv("DB_HOST", "localhost"),
+            "port": int(os.getenv("DB_PORT", "5432")),
+            "dbname": os.getenv("DB_NAME"),
+            "user": os.getenv("DB_USER"),
+            "password": os.getenv("DB_PASSWORD")
+        }
+        params.update(connect_kwargs)
+        self._pool = ThreadedConnectionPool(min_connections, max_connections, **params)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Izposodi povezavo iz bazena; ob napaki razveljavi transakcijo"""
+        conn = self._pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._pool.putconn(conn)
+
+    def close(self) -> None:
+        self._pool.closeall()
+
+class SQLiteConnectionManager:
+    """Nadomestek za lokalno testiranje brez strežnika PostgreSQL"""
+
+    dialect = "sqlite"
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Baza v pomnilniku obstaja le v eni povezavi, zato si jo niti delijo
+        self._shared = sqlite3.connect(path, check_same_thread=False) if path == ":memory:" else None
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        if self._shared is not None:
+            with self._lock:
+                yield from self._transaction(self._shared)
+            return
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+        yield from self._transaction(conn)
+
+    def _transaction(self, conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def close(self) -> None:
+        if self._shared is not None:
+            self._shared.close()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+
+def create_connection_manager():
+    """Ustvari upravljalnik povezav glede na DB_BACKEND (postgresql ali sqlite)"""
+    backend = os.getenv("DB_BACKEND", "postgresql")
+    if backend == "sqlite":
+        return SQLiteConnectionManager(os.getenv("DB_PATH", ":memory:"))
+    if backend == "postgresql":
+        return PostgresConnectionManager(
+            min_connections=int(os.getenv("DB_POOL_MIN", "1")),
+            max_connections=int(os.getenv("DB_POOL_MAX", "10"))
+        )
+    raise ValueError(f"Neznan DB_BACKEND: {backend}")
+
+class PolicyRepository:
+    """Shranjevanje osnutkov polic in poročil o izpostavljenosti v paketih"""
+
+    def __init__(self, db, batch_size: int = 1000, use_copy: bool = True):
+        self.db = db
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+
+    def ensure_schema(self) -> None:
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            for statement in SCHEMA[self.db.dialect]:
+                cursor.execute(statement)
+
+    def save_drafts(self, items: Iterable[Tuple[str, Dict]]) -> int:
+        """Shrani pare (ključ police, osnutek); vrne število zapisanih vrstic"""
+        rows = (self._draft_row(ref, draft) for ref, draft in items)
+        return self._write("policy_drafts", DRAFT_COLUMNS, rows)
+
+    def save_exposures(self, items: Iterable[Tuple[str, Dict]]) -> int:
+        """Shrani pare (ključ police, poročilo o izpostavljenosti)"""
+        rows = (self._exposure_row(ref, exposure) for ref, exposure in items)
+        return self._write("exposure_reports", EXPOSURE_COLUMNS, rows)
+
+    def save_batch(self, drafts: Sequence[Tuple[str, Dict]],
+                   exposures: Sequence[Tuple[str, Dict]]) -> Tuple[int, int]:
+        """Shrani osnutke in poročila enega paketa v eni transakciji.
+
+        Ob napaki se ne zapiše nič, zato v bazi ne ostanejo osnutki brez
+        poročil. Vrne število zapisanih osnutkov in poročil.
+        """
+        draft_rows = [self._draft_row(ref, draft) for ref, draft in drafts]
+        exposure_rows = [self._exposure_row(ref, exposure) for ref, exposure in exposures]
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            self._insert(cursor, "policy_drafts", DRAFT_COLUMNS, draft_rows)
+            self._insert(cursor, "exposure_reports", EXPOSURE_COLUMNS, exposure_rows)
+        return len(draft_rows), len(exposure_rows)
+
+    def bulk_writer(self) -> "BulkWriter":
+        return BulkWriter(self)
+
+    def get_draft(self, policy_ref: str) -> Optional[Dict]:
+        row = self._lookup("policy_drafts", DRAFT_COLUMNS, policy_ref)
+        return self._decode(row, DRAFT_COLUMNS, ("coverage", "exclusions", "terms"))
+
+    def get_exposure(self, policy_ref: str) -> Optional[Dict]:
+        row = self._lookup("exposure_reports", EXPOSURE_COLUMNS, policy_ref)
+        return self._decode(row, EXPOSURE_COLUMNS, ("risk_factors", "mitigation_suggestions"))
+
+    def _write(self, table: str, columns: Sequence[str], rows: Iterable[Tuple]) -> int:
+        written = 0
+        iterator = iter(rows)
+        while True:
+            batch = list(islice(iterator, self.batch_size))
+            if not batch:
+                return written
+            with self.db.connection() as conn:
+                self._insert(conn.cursor(), table, columns, batch)
+            written += len(batch)
+
+    def _insert(self, cursor, table: str, columns: Sequence[str], batch: List[Tuple]) -> None:
+        if not batch:
+            return
+        if self.db.dialect == "postgresql":
+            self._write_postgres(cursor, table, columns, batch)
+        else:
+            placeholders = ", ".join("?" for _ in columns)
+            cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", batch
+            )
+
+    def _write_postgres(self, cursor, table: str, columns: Sequence[str], batch: List[Tuple]) -> None:
+        if self.use_copy:
+            # COPY je najhitrejši način za večje pakete vrstic
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in batch:
+                writer.writerow("" if value is None else value for value in row)
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        else:
+            from psycopg2.extras import execute_values
+
+            execute_values(
+                cursor,
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s",
+                batch,
+                page_size=len(batch)
+            )
+
+    def _lookup(self, table: str, columns: Sequence[str], policy_ref: str) -> Optional[Tuple]:
+        # Parametriziran stavek brez stanja na povezavi, saj bazen povezave zapira in odpira
+        placeholder = "%s" if self.db.dialect == "postgresql" else "?"
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT {', '.join(columns)} FROM {table} WHERE policy_ref = {placeholder} "
+                f"ORDER BY id DESC LIMIT 1", (policy_ref,)
+            )
+            return cursor.fetchone()
+
+    def _decode(self, row: Optional[Tuple], columns: Sequence[str], json_columns: Sequence[str]) -> Optional[Dict]:
+        if row is None:
+            return None
+        result = dict(zip(columns, row))
+        for column in json_columns:
+            if isinstance(result[column], str):
+                result[column] = json.loads(result[column])
+        return result
+
+    def _draft_row(self, policy_ref: str, draft: Dict) -> Tuple:
+        return (
+            str(policy_ref),
+            draft["policy_type"],
+            _json(draft["coverage"]),
+            _json(draft["exclusions"]),
+            _json(draft["terms"]),
+            draft["status"],
+            draft["created_at"]
+        )
+
+    def _exposure_row(self, policy_ref: str, exposure: Dict) -> Tuple:
+        risk_factors = [
+            factor.to_dict() if hasattr(factor, "to_dict") else factor
+            for factor in exposure["risk_factors"]
+        ]
+        return (
+            str(policy_ref),
+            exposure["exposure_score"],
+            exposure["confidence_level"],
+            _json(risk_factors),
+            _json(exposure["mitigation_suggestions"]),
+            exposure["analysis_timestamp"]
+        )
+
+class BulkWriter:
+    """Zbira rezultate in jih v paketih zapisuje v bazo (en paket, ena transakcija)"""
+
+    def __init__(self, repository: PolicyRepository):
+        self.repository = repository
+        self._drafts: List[Tuple[str, Dict]] = []
+        self._exposures: List[Tuple[str, Dict]] = []
+        self.drafts_written = 0
+        self.exposures_written = 0
+
+    @property
+    def written(self) -> int:
+        """Število vseh zapisanih vrstic (osnutki in poročila)"""
+        return self.drafts_written + self.exposures_written
+
+    def add(self, policy_ref: str, draft: Optional[Dict] = None, exposure: Optional[Dict] = None) -> None:
+        if draft is not None:
+            self._drafts.append((policy_ref, draft))
+        if exposure is not None:
+            self._exposures.append((policy_ref, exposure))
+        if max(len(self._drafts), len(self._exposures)) >= self.repository.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._drafts and not self._exposures:
+            return
+        # Ob napaki paket ostane v medpomnilniku in se lahko zapiše znova
+        drafts, exposures = self.repository.save_batch(self._drafts, self._exposures)
+        self._drafts = []
+        self._exposures = []
+        self.drafts_written += drafts
+        self.exposures_written += exposures
+
+    def __enter__(self) -> "BulkWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.flush()
+
+def _json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
@@ -0,0 +1,122 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: Optional[str]) -> str:
+    """Poenoti velike črke in presledke, da se skoraj enaka povpraševanja ujemajo"""
+    return " ".join((text or "").lower().split())
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 vsebine datoteke, bran po blokih"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def make_key(text: Optional[str], location: Optional[str], files: Sequence[str] = ()) -> str:
+    """Ključ po vsebini: normalizirano besedilo, lokacija in zgoščene priložene datoteke"""
+    parts = [normalize_text(text), normalize_text(location)]
+    parts.extend(sorted(file_digest(path) for path in files))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+def rules_fingerprint(*agents) -> str:
+    """Prstni odtis pravil, od katerih so odvisni rezultati verige.
+
+    Pravila so že zgoščena ob nalaganju, zato je dovolj združiti digest
+    različic, ki jih agenti (vsi, katerih rezultati so v predpomnilniku)
+    trenutno uporabljajo.
+    """
+    digests = [agent.rules.digest for agent in agents]
+    return hashlib.sha256("\x1f".join(digests).encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """LRU predpomnilnik rezultatov, omejen s številom vnosov in velikostjo v bajtih.
+
+    Ob vsakem branju primerja prstni odtis pravil agentov; če se pravila
+    spremenijo, se predpomnilnik izprazni.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 fingerprint: Optional[Callable[[], str]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._fingerprint = fingerprint
+        self._current_fingerprint = fingerprint() if fingerprint else None
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, fingerprint: Optional[Callable[[], str]] = None) -> "ResultCache":
+        return cls(
+            max_entries=int(os.getenv("RESULT_CACHE_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("RESULT_CACHE_BYTES", str(64 * 1024 * 1024))),
+            fingerprint=fingerprint
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            self._check_fingerprint()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: Any) -> None:
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._check_fingerprint()
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+    def _check_fingerprint(self) -> None:
+        if self._fingerprint is None:
+            return
+        fingerprint = self._fingerprint()
+        if fingerprint != self._current_fingerprint:
+            logger.info("Pravila agentov so se spremenila, predpomnilnik rezultatov je izpraznjen")
+            self._entries.clear()
+            self._bytes = 0
+            self._current_fingerprint = fingerprint
+            self.invalidations += 1
@@ -2,117 +2,214 @@ from typing import Dict, List, Optional
 import logging
 from datetime import datetime
 import math
+from records import ExposureReport, RiskFactor
+from metrics import instrument
+from rules import CompiledRules, RulesConsumer, RulesStore
 
 logger = logging.getLogger(__name__)
 
-class RiskExposure:
-    def __init__(self):
-        self.risk_factors = {
-            "avtomobilsko": {
-                "starost_vozila": 0.3,
-                "voznikove_izkušnje": 0.4,
-                "območje_vožnje": 0.3
-            },
-            "nepremičninsko": {
-                "lokacija": 0.4,
-                "starost_objekta": 0.3,
-                "varnostni_sistemi": 0.3
-            },
-            "zdravstveno": {
-                "starost": 0.4,
-                "življenjski_slog": 0.3,
-                "zdravstvena_zgodovina": 0.3
-            },
-            "življenjsko": {
-                "starost": 0.3,
-                "poklic": 0.3,
-                "zdravstveno_stanje": 0.4
-            }
-        }
-
-    def calculate_exposure(self, policy_draft: Dict) -> Dict:
+class RiskExposure(RulesConsumer):
+    def __init__(self, rules_store: Optional[RulesStore] = None):
+        # Uteži, razponi in ocene kategorij faktorjev so v datoteki pravil
+        self._attach_rules(rules_store)
+
+    @property
+    def risk_factors(self):
+        return self.rules.risk_factors
+
+    @property
+    def factor_ranges(self):
+        return self.rules.factor_ranges
+
+    @property
+    def category_scores(self):
+        return self.rules.category_scores
+
+    @instrument("risk_exposure.calculate_exposure")
+    def calculate_exposure(self, policy_draft: Dict) -> ExposureReport:
         try:
+            rules = self.rules
             policy_type = policy_draft.get("policy_type")
-            exposure_score = self._calculate_exposure_score(policy_type, policy_draft)
-            risk_factors = self._analyze_risk_factors(policy_type, policy_draft)
+            risk_factors = self._analyze_risk_factors(policy_type, policy_draft, rules)
+            exposure_score = self._sum_impacts(risk_factors)
             mitigation = self._suggest_mitigation(exposure_score, risk_factors)
             
-            return {
-                "exposure_score": exposure_score,
-                "risk_factors": risk_factors,
-                "mitigation_suggestions": mitigation,
-                "analysis_timestamp": datetime.now().isoformat(),
-                "confidence_level": self._calculate_confidence(risk_factors)
-            }
+            return ExposureReport(
+                exposure_score=exposure_score,
+                risk_factors=risk_factors,
+                mitigation_suggestions=mitigation,
+                analysis_timestamp=datetime.now().isoformat(),
+                confidence_level=self._calculate_confidence(risk_factors),
+                rules_version=rules.version
+            )
         except Exception as e:
             logger.error(f"Napaka pri izračunu izpostavljenosti: {str(e)}")
             raise
 
-    def _calculate_exposure_score(self, policy_type: str, policy_data: Dict) -> float:
-        """Izračuna skupno oceno izpostavljenosti"""
-        factors = self.risk_factors.get(policy_type, {})
+    def calculate_exposure_batch(self, policies: "pd.DataFrame") -> "pd.DataFrame":
+        """Vektorsko izračuna izpostavljenost za celoten portfelj polic.
+
+        Vsaka vrstica je ena polica s stolpcem policy_type in stolpci faktorjev
+        tveganja. Manjkajoče vrednosti (NaN/None) se obravnavajo kot neznani
+        podatki, enako kot manjkajoč ključ pri calculate_exposure. Rezultat
+        vsebuje exposure_score, confidence_level ter stolpca <faktor>_score
+        in <faktor>_severity za vsak faktor.
+        """
+        import numpy as np
+        import pandas as pd
+
+        try:
+            rules = self.rules
+            size = len(policies)
+            if "policy_type" in policies:
+                type_codes, type_names = pd.factorize(policies["policy_type"])
+            else:
+                type_codes, type_names = np.full(size, -1), []
+            type_index = {name: code for code, name in enumerate(type_names)}
+
+            total = np.zeros(size)
+            confidence = np.zeros(size)
+            factor_scores: Dict[str, np.ndarray] = {}
+
+            for policy_type, factors in rules.risk_factors.items():
+                if policy_type not in type_index:
+                    continue
+
+                mask = type_codes == type_index[policy_type]
+                rows = policies.loc[mask]
+                known = np.zeros(len(rows), dtype=int)
+                for factor, weight in factors.items():
+                    scores = self._evaluate_factor_column(factor, rows, rules)
+                    # Enak vrstni red seštevanja kot v skalarni poti
+                    total[mask] += scores * weight
+                    known += scores != 0.5
+                    factor_scores.setdefault(factor, np.full(size, np.nan))[mask] = scores
+
+                # Zaupanje ima le nekaj možnih vrednosti, zato ga preberemo iz tabele
+                confidence_table = np.array(
+                    [round(count / len(factors), 2) for count in range(len(factors) + 1)]
+                )
+                confidence[mask] = confidence_table[known]
+
+            result = pd.DataFrame(index=policies.index)
+            result["exposure_score"] = self._round_column(total)
+            result["confidence_level"] = confidence
+            for factor, scores in factor_scores.items():
+                result[f"{factor}_score"] = scores
+                severity_codes = np.where(
+                    np.isnan(scores), -1, (scores >= 0.3).astype(int) + (scores >= 0.7)
+                )
+                result[f"{factor}_severity"] = pd.Categorical.from_codes(
+                    severity_codes, categories=["nizko", "srednje", "visoko"]
+                )
+
+            return result
+        except Exception as e:
+            logger.error(f"Napaka pri paketnem izračunu izpostavljenosti: {str(e)}")
+            raise
+
+    def _round_column(self, values: "np.ndarray") -> "np.ndarray":
+        """Zaokroži na dve decimalki enako kot vgrajeni round"""
+        import numpy as np
+
+        rounded = np.round(values, 2)
+        # np.round se od round lahko razlikuje le tik ob meji x.xx5
+        scaled = values * 100
+        ambiguous = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        if ambiguous.any():
+            rounded[ambiguous] = [round(value, 2) for value in values[ambiguous].tolist()]
+        return rounded
+
+    def _evaluate_factor_column(self, factor: str, rows: "pd.DataFrame",
+                                rules: Optional[CompiledRules] = None) -> "np.ndarray":
+        """Vektorsko ovrednoti en faktor tveganja za vse vrstice"""
+        import numpy as np
+        import pandas as pd
+
+        rules = rules or self.rules
+        size = len(rows)
+        scores = np.full(size, 0.5)
+        if factor not in rows:
+            return scores
+
+        column = rows[factor]
+        if pd.api.types.is_numeric_dtype(column):
+            values = column.to_numpy(dtype=float)
+            numeric = ~np.isnan(values)
+            strings = np.zeros(size, dtype=bool)
+        else:
+            raw = column.to_numpy(dtype=object)
+            numeric = np.fromiter(
+                (isinstance(value, (int, float, np.number)) and value == value for value in raw),
+                dtype=bool, count=size
+            )
+            strings = np.fromiter(
+                (isinstance(value, str) for value in raw), dtype=bool, count=size
+            )
+            values = np.where(numeric, raw, np.nan).astype(float)
+
+        if numeric.any():
+            min_val, max_val = rules.factor_ranges.get(factor, (0, 1))
+            normalized = (values[numeric] - min_val) / (max_val - min_val)
+            scores[numeric] = np.clip(normalized, 0, 1)
+
+        if strings.any():
+            table = rules.category_scores.get(factor, {})
+            scores[strings] = column[strings].map(table).fillna(0.5).to_numpy(dtype=float)
+
+        return scores
+
+    def _sum_impacts(self, risk_factors: List[RiskFactor]) -> float:
+        """Izračuna skupno oceno iz že ovrednotenih faktorjev"""
         total_score = 0.0
-        
-        for factor, weight in factors.items():
-            factor_score = self._evaluate_factor(factor, policy_data)
-            total_score += factor_score * weight
-            
+
+        for factor in risk_factors:
+            total_score += factor.impact
+
         return round(total_score, 2)
 
-    def _evaluate_factor(self, factor: str, policy_data: Dict) -> float:
+    def _evaluate_factor(self, factor: str, policy_data: Dict,
+                         rules: Optional[CompiledRules] = None) -> float:
         """Ovrednoti posamezni faktor tveganja"""
         factor_data = policy_data.get(factor, {})
         
         if isinstance(factor_data, (int, float)):
-            return self._normalize_value(factor_data, factor)
+            if factor_data != factor_data:
+                return 0.5  # NaN je manjkajoč podatek, enako kot v calculate_exposure_batch
+            return self._normalize_value(factor_data, factor, rules)
         elif isinstance(factor_data, str):
-            return self._evaluate_categorical(factor_data, factor)
+            return self._evaluate_categorical(factor_data, factor, rules)
         else:
             return 0.5  # Privzeta vrednost za neznane podatke
 
-    def _normalize_value(self, value: float, factor: str) -> float:
+    def _normalize_value(self, value: float, factor: str,
+                         rules: Optional[CompiledRules] = None) -> float:
         """Normalizira številske vrednosti na lestvico 0-1"""
-        factor_ranges = {
-            "starost": (18, 100),
-            "starost_vozila": (0, 20),
-            "starost_objekta": (0, 100)
-        }
-        
-        min_val, max_val = factor_ranges.get(factor, (0, 1))
+        min_val, max_val = (rules or self.rules).factor_ranges.get(factor, (0, 1))
         normalized = (value - min_val) / (max_val - min_val)
         return max(0, min(1, normalized))
 
-    def _evaluate_categorical(self, value: str, factor: str) -> float:
+    def _evaluate_categorical(self, value: str, factor: str,
+                              rules: Optional[CompiledRules] = None) -> float:
         """Ovrednoti kategorične vrednosti"""
-        category_scores = {
-            "voznikove_izkušnje": {
-                "začetnik": 0.8,
-                "izkušen": 0.4,
-                "profesionalec": 0.2
-            },
-            "območje_vožnje": {
-                "mesto": 0.6,
-                "podeželje": 0.4,
-                "avtocesta": 0.5
-            }
-        }
-        
-        return category_scores.get(factor, {}).get(value, 0.5)
+        return (rules or self.rules).category_scores.get(factor, {}).get(value, 0.5)
 
-    def _analyze_risk_factors(self, policy_type: str, policy_data: Dict) -> List[Dict]:
+    def _analyze_risk_factors(self, policy_type: str, policy_data: Dict,
+                              rules: Optional[CompiledRules] = None) -> List[RiskFactor]:
         """Analizira posamezne faktorje tveganja"""
-        factors = self.risk_factors.get(policy_type, {})
+        rules = rules or self.rules
+        factors = rules.risk_factors.get(policy_type, {})
         analysis = []
         
         for factor, weight in factors.items():
-            score = self._evaluate_factor(factor, policy_data)
-            analysis.append({
-                "factor": factor,
-                "score": score,
-                "weight": weight,
-                "impact": score * weight,
-                "severity": self._determine_severity(score)
-            })
+            score = self._evaluate_factor(factor, policy_data, rules)
+            analysis.append(RiskFactor(
+                factor=factor,
+                score=score,
+                weight=weight,
+                impact=score * weight,
+                severity=self._determine_severity(score)
+            ))
             
         return analysis
 
@@ -125,21 +222,21 @@ class RiskExposure:
         else:
             return "visoko"
 
-    def _suggest_mitigation(self, exposure_score: float, risk_factors: List[Dict]) -> List[str]:
+    def _suggest_mitigation(self, exposure_score: float, risk_factors: List[RiskFactor]) -> List[str]:
         """Predlaga ukrepe za zmanjšanje tveganja"""
         suggestions = []
         
         for factor in risk_factors:
-            if factor["severity"] == "visoko":
-                suggestions.append(f"Zmanjšajte {factor['factor']} z dodatnimi varnostnimi ukrepi")
-            elif factor["severity"] == "srednje":
-                suggestions.append(f"Spremljajte {factor['factor']} in načrtujte preventivne ukrepe")
+            if factor.severity == "visoko":
+                suggestions.append(f"Zmanjšajte {factor.factor} z dodatnimi varnostnimi ukrepi")
+            elif factor.severity == "srednje":
+                suggestions.append(f"Spremljajte {factor.factor} in načrtujte preventivne ukrepe")
                 
         return suggestions
 
-    def _calculate_confidence(self, risk_factors: List[Dict]) -> float:
+    def _calculate_confidence(self, risk_factors: List[RiskFactor]) -> float:
         """Izračuna stopnjo zaupanja v analizo"""
-        known_factors = sum(1 for factor in risk_factors if factor["score"] != 0.5)
+        known_factors = sum(1 for factor in risk_factors if factor.score != 0.5)
         total_factors = len(risk_factors)
         
         return round(known_factors / total_factors, 2) if total_factors > 0 else 0.0 
\ No newline at end of file
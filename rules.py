@@ -0,0 +1,260 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+from rating_engine import MAX_PERILS
+from records import FrozenDict, freeze
+
+logger = logging.getLogger(__name__)
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "rules.json")
+
+# Razdelki datoteke pravil in njihov pričakovani tip
+SECTIONS = {
+    "categories": dict,
+    "risk_keywords": dict,
+    "recommendations": dict,
+    "risk_weights": dict,
+    "policy_types": list,
+    "coverage_types": dict,
+    "standard_exclusions": dict,
+    "risk_factors": dict,
+    "factor_ranges": dict,
+    "category_scores": dict
+}
+
+class CompiledRules:
+    """Nespremenljiva različica pravil: razdelki so FrozenDict s terkami.
+
+    version je oznaka iz datoteke z dodanim začetkom zgoščene vrednosti
+    vsebine (npr. "1.0+3f2a9c1d"), zato se razlikuje tudi, če je bila
+    datoteka spremenjena brez nove oznake.
+    """
+
+    __slots__ = ("version", "digest", "source", "loaded_at", "raw") + tuple(SECTIONS)
+
+    def __init__(self, raw: Dict, digest: str, source: Optional[str] = None,
+                 loaded_at: Optional[float] = None):
+        set_field = super().__setattr__
+        set_field("raw", freeze(raw))
+        set_field("digest", digest)
+        set_field("version", f"{raw['version']}+{digest[:8]}")
+        set_field("source", source)
+        set_field("loaded_at", loaded_at if loaded_at is not None else time.time())
+        for section in SECTIONS:
+            set_field(section, self.raw[section])
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise TypeError("Pravil ni mogoče spreminjati, uporabite replace()")
+
+    def __reduce__(self):
+        return (_restore_rules, (_thaw(self.raw), self.digest, self.source, self.loaded_at))
+
+    def __repr__(self) -> str:
+        return f"CompiledRules(version={self.version!r}, source={self.source!r})"
+
+    def replace(self, **sections: Any) -> "CompiledRules":
+        """Nova različica z zamenjanimi razdelki (npr. za preizkus brez spremembe datoteke)"""
+        raw = {**_thaw(self.raw), **sections}
+        # Brez izvora: shramba takih pravil ob prenosu v delovni proces ne zamenja
+        return compile_rules(raw)
+
+def _restore_rules(raw: Dict, digest: str, source: Optional[str], loaded_at: float) -> CompiledRules:
+    return CompiledRules(raw, digest, source, loaded_at)
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, FrozenDict):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+def compile_rules(raw: Dict, digest: Optional[str] = None, source: Optional[str] = None) -> CompiledRules:
+    """Preveri razdelke in vrne prevedena pravila; ob napaki sproži ValueError"""
+    if not isinstance(raw, dict) or not raw.get("version"):
+        raise ValueError("Pravila morajo vsebovati oznako različice (version)")
+    for section, expected in SECTIONS.items():
+        if not isinstance(raw.get(section), expected):
+            raise ValueError(f"Razdelek pravil {section} manjka ali ni tipa {expected.__name__}")
+
+    if len(raw["risk_weights"]) > MAX_PERILS:
+        raise ValueError(f"Pravila smejo določati največ {MAX_PERILS} nevarnosti (risk_weights), "
+                         f"določajo jih {len(raw['risk_weights'])}")
+    for peril, weight in raw["risk_weights"].items():
+        if not isinstance(weight, (int, float)) or weight < 0:
+            raise ValueError(f"Utež nevarnosti {peril} mora biti nenegativno število")
+    for policy_type, factors in raw["risk_factors"].items():
+        if not all(isinstance(weight, (int, float)) and weight >= 0 for weight in factors.values()):
+            raise ValueError(f"Uteži faktorjev za {policy_type} morajo biti nenegativna števila")
+        # Ocene faktorjev so na intervalu 0-1, zato je tudi izpostavljenost največ 1
+        if sum(factors.values()) > 1 + 1e-9:
+            raise ValueError(f"Vsota uteži faktorjev za {policy_type} je večja od 1")
+    for factor, table in raw["category_scores"].items():
+        if not all(isinstance(score, (int, float)) and 0 <= score <= 1 for score in table.values()):
+            raise ValueError(f"Ocene kategorij faktorja {factor} morajo biti na intervalu 0-1")
+    for factor, bounds in raw["factor_ranges"].items():
+        if len(bounds) != 2 or not bounds[0] < bounds[1]:
+            raise ValueError(f"Razpon faktorja {factor} mora biti [min, max] z min < max")
+    if "drugo" not in raw["recommendations"]:
+        raise ValueError("Priporočila morajo vsebovati privzeto besedilo za \"drugo\"")
+
+    if digest is None:
+        canonical = json.dumps(raw, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return CompiledRules(raw, digest, source)
+
+def load_rules(path: str = RULES_FILE) -> CompiledRules:
+    """Prebere in prevede datoteko pravil (JSON)"""
+    with open(path, "rb") as handle:
+        content = handle.read()
+    return compile_rules(
+        json.loads(content.decode("utf-8")), hashlib.sha256(content).hexdigest(), path
+    )
+
+class RulesState:
+    """Pravila in strukture, ki jih agent zgradi iz njih (iskalnik, tabele premij, predloge)"""
+
+    __slots__ = ("rules", "derived")
+
+    def __init__(self, rules: CompiledRules, derived: Any = None):
+        self.rules = rules
+        self.derived = derived
+
+class RulesStore:
+    """Trenutna pravila procesa z zamenjavo ob spremembi datoteke.
+
+    Ozadna nit vsakih check_interval sekund preveri čas spremembe datoteke.
+    Nova pravila in strukture vseh naročenih agentov se zgradijo v tej
+    niti, nato pa se pri vsakem agentu zamenja ena referenca, zato zahteve
+    v teku ne čakajo na prevajanje in ne vidijo mešanice dveh različic.
+    Neveljavna datoteka se zavrne, veljavna pravila ostanejo v uporabi.
+    """
+
+    _shared: Dict[Tuple[str, float], "RulesStore"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str = RULES_FILE, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._current = load_rules(path)
+        self._mtime = self._stat()
+        self._consumers: "weakref.WeakSet" = weakref.WeakSet()
+        self._lock = threading.RLock()
+        self._watcher: Optional[threading.Thread] = None
+        self.reloads = 0
+        self.failures = 0
+
+    @classmethod
+    def shared(cls, path: Optional[str] = None, check_interval: Optional[float] = None) -> "RulesStore":
+        """Skupna shramba procesa za datoteko; privzeto iz RULES_FILE in RULES_CHECK_INTERVAL"""
+        path = os.path.abspath(path or os.getenv("RULES_FILE") or RULES_FILE)
+        if check_interval is None:
+            check_interval = float(os.getenv("RULES_CHECK_INTERVAL", "2"))
+        key = (path, check_interval)
+        with cls._shared_lock:
+            store = cls._shared.get(key)
+            if store is None:
+                store = cls._shared[key] = cls(path, check_interval)
+            return store
+
+    def __reduce__(self):
+        # V delovnem procesu se uporabi (ali ustvari) njegova skupna shramba
+        return (RulesStore.shared, (self.path, self.check_interval))
+
+    def current(self) -> CompiledRules:
+        return self._current
+
+    def subscribe(self, consumer: "RulesConsumer") -> None:
+        """Agent bo ob vsaki zamenjavi pravil prejel svoje novo stanje"""
+        with self._lock:
+            rules = consumer.rules
+            if rules.source is not None and rules.digest != self._current.digest:
+                consumer.apply_rules(consumer.prepare_rules(self._current))
+            self._consumers.add(consumer)
+            if self._watcher is None and self.check_interval > 0:
+                self._watcher = threading.Thread(target=self._watch, name="rules-watcher", daemon=True)
+                self._watcher.start()
+
+    def reload(self, force: bool = False) -> bool:
+        """Ponovno naloži datoteko, če se je spremenila; vrne True ob zamenjavi pravil"""
+        with self._lock:
+            mtime = self._stat()
+            if not force and mtime == self._mtime:
+                return False
+            # Neuspešna datoteka se ne bere znova, dokler se ne spremeni
+            self._mtime = mtime
+            try:
+                rules = load_rules(self.path)
+                if rules.digest == self._current.digest:
+                    return False
+                consumers = list(self._consumers)
+                prepared = [(consumer, consumer.prepare_rules(rules)) for consumer in consumers]
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Pravil iz {self.path} ni bilo mogoče naložiti, ostaja "
+                             f"{self._current.version}: {str(e)}")
+                return False
+
+            previous = self._current
+            self._current = rules
+            for consumer, state in prepared:
+                consumer.apply_rules(state)
+            self.reloads += 1
+            logger.info(f"Pravila zamenjana: {previous.version} -> {rules.version} "
+                        f"({len(prepared)} agentov)")
+            return True
+
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Napaka pri preverjanju pravil: {str(e)}")
+
+class RulesConsumer:
+    """Osnova za agente, ki delajo s pravili iz RulesStore.
+
+    Pravila in iz njih zgrajene strukture so en objekt RulesState, ki ga
+    metoda prebere enkrat na klic; zamenjava je ena dodelitev atributa.
+    """
+
+    _rules_state: RulesState
+    _rules_store: RulesStore
+
+    def _attach_rules(self, store: Optional[RulesStore] = None) -> None:
+        self._rules_store = store or RulesStore.shared()
+        self.apply_rules(self.prepare_rules(self._rules_store.current()))
+        self._rules_store.subscribe(self)
+
+    def prepare_rules(self, rules: CompiledRules) -> RulesState:
+        """Zgradi stanje agenta za nova pravila (v niti, ki pravila nalaga)"""
+        return RulesState(rules)
+
+    def apply_rules(self, state: RulesState) -> None:
+        self._rules_state = state
+
+    @property
+    def rules(self) -> CompiledRules:
+        return self._rules_state.rules
+
+    @property
+    def rules_version(self) -> str:
+        return self._rules_state.rules.version
+
+    def __setstate__(self, state: Dict) -> None:
+        # Agent, prenesen v delovni proces, se naroči na shrambo tega procesa
+        self.__dict__.update(state)
+        self._rules_store.subscribe(self)
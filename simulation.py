@@ -0,0 +1,389 @@
+import json
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from accumulation import DEFAULT_SUM_INSURED, load_municipalities, normalize_location
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Model nevarnosti. Katastrofalne nevarnosti so dogodki, ki v enem letu
+# prizadenejo vse police v regiji (frequency = dogodki na regijo na leto,
+# damage = parametra beta porazdelitve stopnje škode dogodka). Ostale so
+# neodvisne škode posameznih polic (frequency = škode na polico na leto,
+# mean_damage = povprečna stopnja škode, shape = oblika gama porazdelitve).
+PERIL_MODEL = {
+    "požar": {"catastrophe": False, "frequency": 0.004, "mean_damage": 0.3, "shape": 0.8},
+    "poplava": {"catastrophe": True, "frequency": 0.05, "damage": (1.2, 8.0)},
+    "vlom": {"catastrophe": False, "frequency": 0.015, "mean_damage": 0.04, "shape": 2.0},
+    "potres": {"catastrophe": True, "frequency": 0.01, "damage": (0.8, 4.0)}
+}
+
+# Povratne dobe (1 na N let) za PML in ravni zaupanja za VaR/TVaR
+RETURN_PERIODS = (10, 50, 100, 200, 250, 500, 1000)
+CONFIDENCE_LEVELS = (0.99, 0.995, 0.999)
+
+class LossSketch:
+    """Združljiv pribl. histogram izgub za kvantile brez hranjenja vseh poskusov.
+
+    Pozitivne izgube se štejejo v logaritemske razrede s širino, pri kateri
+    je relativna napaka vsakega kvantila največ relative_accuracy; ničelne
+    izgube imajo svoj razred. Povprečje, varianca in maksimum so natančni.
+    Skice iz različnih procesov se seštejejo z merge().
+    """
+
+    def __init__(self, relative_accuracy: float = 0.005):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.count = 0
+        self.zeros = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.max = 0.0
+        self._offset = 0
+        self._counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, losses: np.ndarray) -> None:
+        losses = np.asarray(losses, dtype=float)
+        if not len(losses):
+            return
+        self.count += len(losses)
+        self.total += float(losses.sum())
+        self.total_squares += float(np.dot(losses, losses))
+        self.max = max(self.max, float(losses.max()))
+
+        positive = losses[losses > 0]
+        self.zeros += len(losses) - len(positive)
+        if len(positive):
+            keys = np.ceil(np.log(positive) / self._log_gamma).astype(np.int64)
+            low = int(keys.min())
+            self._add_counts(low, np.bincount(keys - low))
+
+    def merge(self, other: "LossSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Skici izgub imata različno natančnost")
+        self.count += other.count
+        self.zeros += other.zeros
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self.max = max(self.max, other.max)
+        if len(other._counts):
+            self._add_counts(other._offset, other._counts)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        if self.count < 2:
+            return 0.0
+        variance = (self.total_squares - self.total * self.mean) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def quantile(self, q: float) -> float:
+        """Izguba, ki je presežena z verjetnostjo 1 - q"""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return 0.0
+        cumulative = np.cumsum(self._counts) + self.zeros
+        index = int(np.searchsorted(cumulative, rank, side="right"))
+        return min(self._value(index), self.max)
+
+    def tail_mean(self, q: float) -> float:
+        """Povprečna izguba v najslabšem deležu 1 - q poskusov (TVaR)"""
+        tail = (1 - q) * self.count
+        if tail <= 0:
+            return self.max
+        # Razredi od najvišjega navzdol, dokler ni zajet delež repa
+        counts = self._counts[::-1]
+        values = np.minimum(self._value(np.arange(len(counts))[::-1]), self.max)
+        taken = np.minimum(counts, np.maximum(tail - (np.cumsum(counts) - counts), 0))
+        return float(np.dot(taken, values)) / tail
+
+    def _value(self, index):
+        # Sredina razreda (v relativnem smislu), napaka največ relative_accuracy
+        return 2 * self._gamma ** (index + self._offset) / (self._gamma + 1)
+
+    def _add_counts(self, low: int, counts: np.ndarray) -> None:
+        if not len(self._counts):
+            self._offset, self._counts = low, counts.astype(np.int64)
+            return
+        start = min(self._offset, low)
+        end = max(self._offset + len(self._counts), low + len(counts))
+        if start != self._offset or end != self._offset + len(self._counts):
+            grown = np.zeros(end - start, dtype=np.int64)
+            grown[self._offset - start:self._offset - start + len(self._counts)] = self._counts
+            self._offset, self._counts = start, grown
+        self._counts[low - start:low - start + len(counts)] += counts
+
+class LossModel:
+    """Strnjen portfelj za simulacijo.
+
+    Katastrofalne nevarnosti hranijo le izpostavljeno vrednost po regijah,
+    ostale pa razrede polic s podobno pričakovano škodo (širina razreda
+    class_ratio). Velikost modela zato ni odvisna od števila polic in se
+    poceni prenese v delovne procese.
+    """
+
+    def __init__(self, perils: Sequence[str], peril_model: Dict[str, Dict],
+                 catastrophe: Dict[str, np.ndarray], attritional: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                 policies: int, sum_insured: float):
+        self.perils = tuple(perils)
+        self.peril_model = peril_model
+        self.catastrophe = catastrophe
+        self.attritional = attritional
+        self.policies = policies
+        self.sum_insured = sum_insured
+
+    @classmethod
+    def from_policies(cls, risk_weights: Dict[str, float], sums_insured, exposure_scores,
+                      peril_masks, regions=None, region_count: Optional[int] = None,
+                      peril_model: Optional[Dict[str, Dict]] = None,
+                      class_ratio: float = 1.05) -> "LossModel":
+        """Zgradi model iz stolpcev portfelja.
+
+        Biti v peril_masks sledijo vrstnemu redu risk_weights (kot
+        RatingEngine.peril_mask). Ranljivost police za nevarnost je utež
+        nevarnosti glede na najtežjo, pomnožena z 0.5 + exposure_score.
+        Police brez regije (regions=None) so vse v isti regiji.
+        """
+        peril_model = peril_model or PERIL_MODEL
+        perils = tuple(risk_weights)
+        sums = np.asarray(sums_insured, dtype=float)
+        scores = np.asarray(exposure_scores, dtype=float)
+        masks = np.asarray(peril_masks, dtype=np.int64)
+        regions = np.zeros(len(sums), dtype=np.intp) if regions is None else np.asarray(regions, dtype=np.intp)
+        region_count = region_count or (int(regions.max()) + 1 if len(regions) else 1)
+        heaviest = max(risk_weights.values())
+
+        catastrophe, attritional = {}, {}
+        for bit, peril in enumerate(perils):
+            if peril not in peril_model:
+                continue
+            covered = (masks >> bit) & 1 == 1
+            value = sums[covered] * np.clip(risk_weights[peril] / heaviest * (0.5 + scores[covered]), 0.0, 1.0)
+            settings = peril_model[peril]
+            if settings["catastrophe"]:
+                catastrophe[peril] = np.bincount(regions[covered], weights=value, minlength=region_count)
+                continue
+
+            # Razredi po pričakovani škodi; povprečje razreda ohrani pričakovano izgubo
+            claims = value * settings["mean_damage"]
+            claims = claims[claims > 0]
+            if not len(claims):
+                continue
+            classes = np.floor(np.log(claims) / math.log(class_ratio)).astype(np.int64)
+            classes, members = np.unique(classes, return_inverse=True)
+            counts = np.bincount(members)
+            attritional[peril] = (
+                counts * settings["frequency"],
+                np.bincount(members, weights=claims) / counts
+            )
+
+        return cls(perils, peril_model, catastrophe, attritional, len(sums), float(sums.sum()))
+
+def simulate_chunk(model: LossModel, trials: int, seed: np.random.SeedSequence,
+                   relative_accuracy: float = 0.005) -> Tuple[LossSketch, LossSketch, np.ndarray]:
+    """Simulira trials let; vrne skici letne (AEP) in največje posamične (OEP) izgube ter izgube po nevarnostih"""
+    rng = np.random.default_rng(seed)
+    aggregate = np.zeros(trials)
+    occurrence = np.zeros(trials)
+    by_peril = np.zeros(len(model.perils))
+
+    for index, peril in enumerate(model.perils):
+        settings = model.peril_model.get(peril)
+        if peril in model.catastrophe:
+            exposure = model.catastrophe[peril]
+            events = rng.poisson(settings["frequency"] * len(exposure), trials)
+            total = int(events.sum())
+            if not total:
+                continue
+            losses = rng.beta(*settings["damage"], total) * exposure[rng.integers(0, len(exposure), total)]
+            owner = np.repeat(np.arange(trials), events)
+            aggregate += np.bincount(owner, weights=losses, minlength=trials)
+            np.maximum.at(occurrence, owner, losses)
+            by_peril[index] = losses.sum()
+
+        elif peril in model.attritional:
+            rates, claims = model.attritional[peril]
+            shape = settings["shape"]
+            # Vsota N gama škod z enako skalo je ena gama vrednost z obliko N * shape
+            counts = rng.poisson(rates, (trials, len(rates)))
+            losses = rng.gamma(counts * shape, 1.0 / shape) @ claims
+            aggregate += losses
+            by_peril[index] = losses.sum()
+
+    sketches = LossSketch(relative_accuracy), LossSketch(relative_accuracy)
+    sketches[0].add(aggregate)
+    sketches[1].add(occurrence)
+    return sketches[0], sketches[1], by_peril
+
+# Model v delovnem procesu se nastavi enkrat ob zagonu bazena
+_model: Optional[LossModel] = None
+
+def _init_worker(model: LossModel) -> None:
+    global _model
+    _model = model
+
+def _run_chunk(task: Tuple[int, np.random.SeedSequence, float]) -> Tuple[LossSketch, LossSketch, np.ndarray]:
+    trials, seed, relative_accuracy = task
+    return simulate_chunk(_model, trials, seed, relative_accuracy)
+
+def simulate(model: LossModel, trials: int = 100_000, seed: int = 42,
+             chunk_trials: int = 10_000, workers: int = 0,
+             relative_accuracy: float = 0.005) -> Dict:
+    """Monte Carlo simulacija letnih izgub portfelja.
+
+    Poskusi se izvajajo v kosih po chunk_trials; vsak kos ima svoje seme iz
+    SeedSequence(seed), zato je rezultat ponovljiv ne glede na število
+    delovnih procesov (workers=0 pomeni izvajanje v trenutnem procesu).
+    """
+    started = time.perf_counter()
+    sizes = [min(chunk_trials, trials - start) for start in range(0, trials, chunk_trials)]
+    tasks = [
+        (size, child, relative_accuracy)
+        for size, child in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes)))
+    ]
+
+    aggregate, occurrence = LossSketch(relative_accuracy), LossSketch(relative_accuracy)
+    by_peril = np.zeros(len(model.perils))
+    with metrics.stage("simulation"):
+        for done, (chunk_aggregate, chunk_occurrence, chunk_perils) in enumerate(
+                _run_tasks(model, tasks, workers), start=1):
+            aggregate.merge(chunk_aggregate)
+            occurrence.merge(chunk_occurrence)
+            by_peril += chunk_perils
+            if done % 10 == 0 or done == len(tasks):
+                logger.info(f"Simulacija: {aggregate.count}/{trials} poskusov")
+
+    return {
+        "trials": trials,
+        "seed": seed,
+        "policies": model.policies,
+        "sum_insured": round(model.sum_insured, 2),
+        "expected_loss": round(aggregate.mean, 2),
+        "std": round(aggregate.std, 2),
+        "max_loss": round(aggregate.max, 2),
+        "expected_loss_by_peril": {
+            peril: round(total / trials, 2) for peril, total in zip(model.perils, by_peril.tolist())
+        },
+        "var": {f"{level:.1%}": round(aggregate.quantile(level), 2) for level in CONFIDENCE_LEVELS},
+        "tvar": {f"{level:.1%}": round(aggregate.tail_mean(level), 2) for level in CONFIDENCE_LEVELS},
+        "pml": {
+            "aggregate": {str(period): round(aggregate.quantile(1 - 1 / period), 2) for period in RETURN_PERIODS},
+            "occurrence": {str(period): round(occurrence.quantile(1 - 1 / period), 2) for period in RETURN_PERIODS}
+        },
+        "relative_accuracy": relative_accuracy,
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+
+def _run_tasks(model: LossModel, tasks: List[Tuple], workers: int) -> Iterator[Tuple]:
+    if workers <= 0:
+        for trials, seed, relative_accuracy in tasks:
+            yield simulate_chunk(model, trials, seed, relative_accuracy)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model,)
+    ) as pool:
+        # map ohrani vrstni red kosov, zato so tudi vsote v plavajoči vejici ponovljive
+        yield from pool.map(_run_chunk, tasks)
+
+def read_book(path: str, risk_weights: Dict[str, float]) -> Dict[str, np.ndarray]:
+    """Prebere portfelj iz izhoda paketne obdelave (JSONL) v stolpce za LossModel.
+
+    Vrstice brez police se preskočijo. Zavarovalna vsota je sum_insured
+    vrstice ali privzeta vsota za tip police, regija pa občina iz polja
+    location (neznane lokacije so v skupni regiji). Mapa je stolpčni
+    portfelj (batch_pipeline --export), ki se bere brez razčlenjevanja JSON.
+    """
+    perils = tuple(risk_weights)
+    if os.path.isdir(path):
+        from portfolio_store import PortfolioSnapshot
+
+        return PortfolioSnapshot(path).book(perils)
+    municipalities = {name: index for index, name in enumerate(load_municipalities(), start=1)}
+    columns = {"sum_insured": [], "exposure": [], "mask": [], "region": []}
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "policy" not in record:
+                continue
+            policy_type = record["policy"].get("policy_type")
+            risks = (record.get("analysis") or {}).get("risks") or []
+            columns["sum_insured"].append(
+                float(record.get("sum_insured") or DEFAULT_SUM_INSURED.get(policy_type, 50000.0))
+            )
+            columns["exposure"].append(float(record["exposure"]["exposure_score"]))
+            columns["mask"].append(sum(1 << perils.index(risk) for risk in set(risks) if risk in perils))
+            columns["region"].append(municipalities.get(normalize_location(record.get("location") or ""), 0))
+    book = {name: np.asarray(values) for name, values in columns.items()}
+    book["region_count"] = len(municipalities) + 1
+    return book
+
+def synthetic_book(count: int, perils: Sequence[str], seed: int = 42) -> Dict[str, np.ndarray]:
+    """Sintetični portfelj nepremičnin, razporejen po občinah"""
+    rng = np.random.default_rng(seed)
+    region_count = len(load_municipalities())
+    return {
+        "sum_insured": rng.choice([50_000.0, 100_000.0, 150_000.0, 250_000.0, 400_000.0], count),
+        "exposure": np.round(rng.random(count), 2),
+        "mask": rng.integers(1, 1 << len(perils), count),
+        "region": rng.integers(0, region_count, count),
+        "region_count": region_count
+    }
+
+def main(argv: Optional[list] = None) -> int:
+    import argparse
+
+    from log_pipeline import configure_logging_from_env
+    from underwriter import Underwriter
+
+    parser = argparse.ArgumentParser(description="Monte Carlo simulacija izgub portfelja (VaR, TVaR, PML)")
+    parser.add_argument("book", nargs="?", help="Izhod paketne obdelave (JSONL ali mapa --export); brez datoteke sintetični portfelj")
+    parser.add_argument("--synthetic", type=int, default=100_000,
+                        help="Število polic sintetičnega portfelja")
+    parser.add_argument("--trials", type=int, default=100_000, help="Število simuliranih let")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-trials", type=int, default=10_000,
+                        help="Število poskusov v enem kosu")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Število delovnih procesov (0 = v glavnem procesu)")
+    parser.add_argument("--accuracy", type=float, default=0.005,
+                        help="Relativna natančnost kvantilov")
+    args = parser.parse_args(argv)
+
+    configure_logging_from_env(console=True)
+    risk_weights = Underwriter().risk_weights
+    if args.book:
+        book = read_book(args.book, risk_weights)
+    else:
+        book = synthetic_book(args.synthetic, tuple(risk_weights), args.seed)
+
+    model = LossModel.from_policies(
+        risk_weights, book["sum_insured"], book["exposure"], book["mask"],
+        book["region"], book["region_count"]
+    )
+    result = simulate(model, args.trials, args.seed, args.chunk_trials, args.workers, args.accuracy)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Moduli projekta so v korenski mapi, testi pa jih uvažajo neposredno
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Agenti v testih ne zaganjajo niti za preverjanje datoteke pravil
+os.environ.setdefault("RULES_CHECK_INTERVAL", "0")
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from accumulation import AccumulationIndex, haversine_km
+
+PERILS = ("požar", "poplava", "vlom", "potres")
+
+@pytest.fixture
+def index():
+    return AccumulationIndex(PERILS)
+
+def test_resolve_rejects_coordinates_out_of_range(index):
+    assert index.resolve("46.05, 14.5") == (46.05, 14.5)
+    assert index.resolve("Ljubljana") == (46.0569, 14.5058)
+    assert index.resolve("1000,1000") is None
+    assert index.resolve((95.0, 0.0)) is None
+    assert index.resolve("nan,14") is None
+    assert not index.add("x", "-91,14", 1000.0, 0.5, ["poplava"])
+    with pytest.raises(ValueError):
+        index.add_many(["y"], [46.0], [190.0], [1000.0], [0.5], [1])
+
+def test_distant_points_do_not_grow_grid(index):
+    index.add("lj", "Ljubljana", 100000.0, 0.5, ["poplava"])
+    cells = index._grid.shape[0] * index._grid.shape[1]
+    index.add("nz", "-45,-170", 50000.0, 0.2, ["potres"])
+    index.add("eq", "0,0", 20000.0, 0.1, ["požar"])
+
+    assert index._grid.shape[0] * index._grid.shape[1] == cells
+    far = index.query(-45.0, -170.0, 10)
+    assert far["total"]["policies"] == 1
+    assert far["by_peril"]["potres"]["sum_insured"] == 50000.0
+    assert index.query_location("Ljubljana", 25)["total"]["sum_insured"] == 100000.0
+
+    index.cancel("nz")
+    assert index.query(-45.0, -170.0, 10)["total"]["policies"] == 0
+
+def test_query_matches_scan_with_outliers(index):
+    rng = np.random.default_rng(3)
+    size = 2000
+    # Večina polic v Sloveniji, nekaj po vsem svetu
+    lat = np.where(rng.random(size) < 0.9, rng.uniform(45.4, 46.9, size), rng.uniform(-60, 70, size))
+    lon = np.where(lat > 45.3, rng.uniform(13.4, 16.6, size), rng.uniform(-180, 180, size))
+    lat, lon = np.round(lat, 5), np.round(lon, 5)
+    sums = rng.choice([25000.0, 150000.0], size)
+    masks = rng.integers(0, 16, size)
+    index.add_many(range(size), lat, lon, sums, rng.random(size), masks)
+
+    for center_lat, center_lon, radius in ((46.05, 14.5, 30), (lat[-1], lon[-1], 500), (0.0, 0.0, 3000)):
+        inside = (haversine_km(center_lat, center_lon, lat, lon) <= radius) & ((masks & 2) != 0)
+        result = index.query(center_lat, center_lon, radius)
+        assert result["by_peril"]["poplava"]["sum_insured"] == pytest.approx(sums[inside].sum())
+
+def test_add_snapshot_indexes_bound_policies(tmp_path, index):
+    pytest.importorskip("pyarrow")
+    from portfolio_store import PortfolioSnapshot, PortfolioWriter
+
+    def record(ref, risks):
+        return {
+            "id": ref,
+            "analysis": {"risks": risks},
+            "policy": {"policy_type": "nepremičninsko", "created_at": "2026-01-05T10:00:00"},
+            "exposure": {"exposure_score": 0.4, "risk_factors": []}
+        }
+
+    # Drugačen vrstni red nevarnosti ob zapisu
+    with PortfolioWriter(str(tmp_path), list(reversed(PERILS)), []) as writer:
+        writer.add(record("a", ["poplava"]), "Ljubljana", 200000.0)
+        writer.add(record("b", ["potres"]), "Maribor")
+        writer.add(record("c", ["poplava"]), "neznana vas")
+
+    assert index.add_snapshot(PortfolioSnapshot(str(tmp_path))) == 2
+    ljubljana = index.query_location("Ljubljana", 10)
+    assert ljubljana["by_peril"]["poplava"]["sum_insured"] == 200000.0
+    maribor = index.query_location("Maribor", 10)
+    assert maribor["by_peril"]["potres"]["sum_insured"] == 150000.0
@@ -0,0 +1,103 @@
+import json
+import threading
+
+import pytest
+
+from batch_pipeline import BatchPipeline
+
+def write_jsonl(path, rows):
+    with open(path, "w", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle]
+
+def test_run_processes_every_stage(tmp_path):
+    source, target = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_jsonl(source, [
+        {"id": "a", "text": "Zavarovanje za avto, nevarnost poplava", "starost_vozila": 5},
+        {"id": "b", "text": "Hiša ob reki, požar in vlom"},
+        {"id": "c"}
+    ])
+
+    stats = BatchPipeline(report_every=0).run(str(source), str(target))
+
+    assert (stats["rows"], stats["succeeded"], stats["failed"]) == (3, 2, 1)
+    records = read_jsonl(target)
+    assert [record["id"] for record in records] == ["a", "b", "c"]
+    assert records[0]["analysis"]["category"] == "avtomobilsko"
+    assert records[0]["policy"]["policy_type"] == "avtomobilsko"
+    assert records[0]["risk_evaluation"]["premium"] > 0
+    assert "exposure_score" in records[1]["exposure"]
+    assert "error" in records[2]
+
+def test_csv_input(tmp_path):
+    source, target = tmp_path / "in.csv", tmp_path / "out.jsonl"
+    source.write_text("id,text,starost_vozila\n1,avto in toča,4\n2,stanovanje in poplava,\n", encoding="utf-8")
+
+    stats = BatchPipeline(report_every=0).run(str(source), str(target))
+
+    assert stats["failed"] == 0
+    assert [record["id"] for record in read_jsonl(target)] == ["1", "2"]
+
+class StuckPipeline(BatchPipeline):
+    """Vrstica z besedilom "zatakne" čaka, dokler test ne sprosti dogodka"""
+
+    def __init__(self, release: threading.Event, **kwargs):
+        super().__init__(**kwargs)
+        self.release = release
+
+    def process_row(self, row):
+        if row.get("text") == "zatakne":
+            self.release.wait(10)
+        return super().process_row(row)
+
+def test_row_timeout_does_not_block_batch(tmp_path):
+    source, target = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_jsonl(source, [{"id": 1, "text": "avto"}, {"id": 2, "text": "zatakne"}, {"id": 3, "text": "hiša"}])
+    release = threading.Event()
+    try:
+        stats = StuckPipeline(release, report_every=0, row_timeout=0.2).run(str(source), str(target))
+    finally:
+        release.set()
+
+    assert (stats["succeeded"], stats["failed"]) == (2, 1)
+    records = read_jsonl(target)
+    assert "ni bila obdelana" in records[1]["error"]
+    assert records[2]["analysis"]["category"] == "nepremičninsko"
+
+def test_row_timeout_keeps_errors_and_results():
+    pipeline = BatchPipeline(row_timeout=5)
+    line, failed, _, stored = pipeline.process_record(0, {"id": "x", "text": "avto"}, keep_results=True)
+    assert not failed and stored["policy"]["policy_type"] == "avtomobilsko"
+
+    line, failed, _, stored = pipeline.process_record(1, {"id": "y"}, keep_results=True)
+    assert failed and stored is None
+    assert "besedila" in json.loads(line)["error"]
+
+def test_export_keeps_policies_from_different_inputs(tmp_path):
+    pytest.importorskip("pyarrow")
+    from portfolio_store import PortfolioSnapshot, PortfolioWriter
+
+    pipeline = BatchPipeline(report_every=0)
+    root = str(tmp_path / "portfelj")
+    pipeline.exporter = PortfolioWriter(
+        root, pipeline.underwriter.rating_engine.perils,
+        [factor for factors in pipeline.risk_exposure.risk_factors.values() for factor in factors]
+    )
+    # Obe datoteki imata vrstici 0 in 1 brez stolpca id
+    for name, texts in (("a", ["avto", "hiša in poplava"]), ("b", ["stanovanje", "avto in toča"])):
+        write_jsonl(tmp_path / f"{name}.jsonl", [{"text": text} for text in texts])
+        pipeline.run(str(tmp_path / f"{name}.jsonl"), str(tmp_path / f"{name}.out.jsonl"))
+    # Ponovna obdelava iste datoteke zamenja njene police
+    pipeline.run(str(tmp_path / "a.jsonl"), str(tmp_path / "a.out.jsonl"))
+
+    snapshot = PortfolioSnapshot(root)
+    assert len(snapshot) == 6
+    refs = snapshot.table(["policy_ref"], latest=True).column("policy_ref").to_pylist()
+    assert len(refs) == 4 and all(ref.endswith((":0", ":1")) for ref in refs)
+    frame = snapshot.exposure_frame()
+    assert frame.index.is_unique and sorted(frame.index) == sorted(refs)
+    assert len(snapshot.exposure_frame(latest=False)) == 6
@@ -0,0 +1,20 @@
+import pytest
+
+from charts import bin_scores, rebin
+from portfolio_aggregator import SCORE_BINS
+
+def test_rebin_groups_cents_into_bins():
+    histogram = [0] * SCORE_BINS
+    histogram[0], histogram[4], histogram[5], histogram[100] = 1, 2, 3, 4
+    centers, counts = rebin(histogram)
+
+    assert len(centers) == len(counts) == 20
+    assert centers[0] == 0.025 and centers[-1] == 0.975
+    assert counts[0] == 3 and counts[1] == 3 and counts[-1] == 4
+    assert sum(counts) == 10
+    assert bin_scores([0.0, 0.04, 0.04, 0.05, 0.05, 0.05, 1.0, 1.0, 1.0, 1.0]) == (centers, counts)
+
+@pytest.mark.parametrize("histogram", [[], [5], [1] * (SCORE_BINS - 1)])
+def test_rebin_rejects_other_histograms(histogram):
+    with pytest.raises(ValueError):
+        rebin(histogram)
@@ -0,0 +1,76 @@
+import tracemalloc
+
+import pytest
+
+from document_processor import DocumentProcessor
+
+def write_csv(path, rows):
+    path.write_text("opis,vrednost\n" + "".join(f"vrstica {row},{row}\n" for row in range(rows)),
+                    encoding="utf-8")
+
+def test_csv_is_read_in_chunks(tmp_path):
+    path = tmp_path / "podatki.csv"
+    write_csv(path, 25)
+    processor = DocumentProcessor(chunk_rows=10)
+
+    chunks = list(processor.iter_text(str(path)))
+
+    assert len(chunks) == 3
+    assert chunks[0].splitlines()[0] == "vrstica 0 0"
+    assert processor.last_stats["chunks"] == 3
+    assert processor.last_stats["peak_memory_bytes"] is None
+
+def test_xlsx_is_read_in_chunks(tmp_path):
+    from openpyxl import Workbook
+
+    path = tmp_path / "podatki.xlsx"
+    workbook = Workbook()
+    for row in range(5):
+        workbook.active.append([f"avto {row}", row])
+    workbook.save(path)
+
+    text = DocumentProcessor(chunk_rows=2).extract_text(str(path))
+
+    assert text.splitlines() == [f"avto {row} {row}" for row in range(5)]
+
+def test_peak_memory_is_reported_and_tracing_stopped(tmp_path):
+    path = tmp_path / "podatki.csv"
+    write_csv(path, 100)
+    processor = DocumentProcessor(track_memory=True)
+
+    processor.extract_text(str(path))
+
+    assert processor.last_stats["peak_memory_bytes"] > 0
+    assert not tracemalloc.is_tracing()
+
+def test_concurrent_readers_share_tracing(tmp_path):
+    first, second = tmp_path / "a.csv", tmp_path / "b.csv"
+    write_csv(first, 30)
+    write_csv(second, 30)
+    outer, inner = DocumentProcessor(chunk_rows=10, track_memory=True), DocumentProcessor(track_memory=True)
+
+    chunks = outer.iter_text(str(first))
+    next(chunks)
+    inner.extract_text(str(second))
+    # Drugi dokument ne ustavi sledenja, ki ga prvi še potrebuje
+    assert tracemalloc.is_tracing()
+    list(chunks)
+
+    assert inner.last_stats["peak_memory_bytes"] > 0
+    assert outer.last_stats["peak_memory_bytes"] > 0
+    assert not tracemalloc.is_tracing()
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("DOCUMENT_TRACK_MEMORY", "0")
+    monkeypatch.setenv("DOCUMENT_CHUNK_ROWS", "50")
+    processor = DocumentProcessor.from_env()
+    assert (processor.chunk_rows, processor.track_memory) == (50, False)
+
+    monkeypatch.delenv("DOCUMENT_TRACK_MEMORY")
+    assert DocumentProcessor.from_env().track_memory
+
+def test_unsupported_extension(tmp_path):
+    path = tmp_path / "star.doc"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError, match="docx"):
+        list(DocumentProcessor().iter_text(str(path)))
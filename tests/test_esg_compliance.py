@@ -0,0 +1,72 @@
+import asyncio
+import socket
+
+import pytest
+
+from api_client import APIClient
+from esg_compliance import ESGCompliance, configured_key
+from esg_stub_server import CALLS, start_stub_server, stub_urls
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+class FailingClient:
+    async def request_json(self, *args, **kwargs):
+        raise AssertionError("Brez ključa se API ne sme klicati")
+
+@pytest.mark.parametrize("value", ["", "  ", "your_climatiq_api_key", "YOUR_KEY"])
+def test_placeholder_keys_are_unset(monkeypatch, value):
+    monkeypatch.setenv("CLIMATIQ_API_KEY", value)
+    assert configured_key("CLIMATIQ_API_KEY") is None
+
+def test_default_env_skips_remote_calls(monkeypatch):
+    monkeypatch.setenv("CLIMATIQ_API_KEY", "your_climatiq_api_key")
+    monkeypatch.setenv("WEATHER_API_KEY", "your_weather_api_key")
+    esg = ESGCompliance(FailingClient())
+
+    result = asyncio.run(esg.analyze_esg_impact({"policy_type": "avtomobilsko"}))
+
+    assert result["carbon_footprint"] == {} and result["weather_impact"] == {}
+    assert result["esg_score"] == 10.0
+
+def test_stub_server_round_trip(monkeypatch):
+    port = free_port()
+    for name, url in stub_urls(port=port).items():
+        monkeypatch.setenv(name, url)
+    monkeypatch.setenv("CLIMATIQ_API_KEY", "test")
+    monkeypatch.setenv("WEATHER_API_KEY", "test")
+
+    async def scenario():
+        runner = await start_stub_server(port=port)
+        try:
+            esg = ESGCompliance()
+            first = await esg.analyze_esg_impact({"policy_type": "nepremičninsko", "location": "Maribor"})
+            second = await esg.analyze_esg_impact({"policy_type": "nepremičninsko", "location": " maribor "})
+            return first, second, runner.app[CALLS]
+        finally:
+            await APIClient.close()
+            await runner.cleanup()
+
+    first, second, calls = asyncio.run(scenario())
+    assert first["carbon_footprint"]["co2e"] > 0
+    assert first["weather_impact"]["condition"] == "stub"
+    assert first["esg_score"] == second["esg_score"]
+    # Drugi klic se postreže iz predpomnilnika
+    assert calls == {"climatiq": 1, "weather": 1}
+
+def test_session_of_finished_loop_is_closed():
+    client = APIClient()
+
+    async def open_session():
+        return await client.get_session()
+
+    first = asyncio.run(open_session())
+    assert not first.closed
+    second = asyncio.run(open_session())
+
+    assert first.closed and not second.closed
+    assert list(APIClient._sessions.values()) == [second]
+    asyncio.run(APIClient.close())
+    assert second.closed and APIClient._sessions == {}
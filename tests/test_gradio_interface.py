@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("gradio")
+
+from executor import AgentExecutor, default_agents
+from gradio_interface import create_ui
+from portfolio_aggregator import PortfolioAggregator
+
+class CountingESG:
+    """ESG brez omrežja; ocena pove, kolikokrat je bila analiza klicana"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze_esg_impact(self, data):
+        self.calls += 1
+        return {"esg_score": float(self.calls), "score_components": {"carbon": 5.0, "climate": 5.0}}
+
+@pytest.fixture
+def ui():
+    agents = default_agents()
+    esg = CountingESG()
+    app = create_ui(*agents.values(), esg, executor=AgentExecutor(agents, mode="inline"))
+    return app, esg
+
+def analyze(app, text, location="Ljubljana"):
+    """Izvede process_request in vrne zadnje vrednosti vseh posodobljenih komponent"""
+    async def run():
+        last = {}
+        async for update in app.fns[0].fn(text, None, location):
+            last.update(update)
+        return list(last.values())
+
+    return asyncio.run(run())
+
+def status(values):
+    return next(value for value in values if isinstance(value, str) and value[:1] in "✅❌")
+
+def test_cached_chain_refreshes_esg(ui):
+    app, esg = ui
+    first = analyze(app, "Zavarovanje hiše pred potresom")
+    second = analyze(app, "zavarovanje hiše  pred potresom")
+
+    assert "predpomnilnika" not in status(first)
+    assert "predpomnilnika" in status(second)
+    # Vreme v ESG se ne streže iz predpomnilnika rezultatov
+    assert esg.calls == 2
+
+def test_quotes_do_not_enter_portfolio():
+    agents = default_agents()
+    portfolio = PortfolioAggregator(agents["risk_exposure"])
+    app = create_ui(*agents.values(), CountingESG(), executor=AgentExecutor(agents, mode="inline"),
+                    portfolio=portfolio)
+    analyze(app, "Zavarovanje avtomobila za mlade voznike")
+    analyze(app, "Zavarovanje hiše pred poplavo")
+
+    assert len(portfolio) == 0
@@ -0,0 +1,110 @@
+import json
+import time
+
+import pytest
+
+from batch_jobs import JobWorker, merge, submit
+from job_queue import RedisJobQueue, SQLiteJobQueue
+
+@pytest.fixture(params=["sqlite", "redis"])
+def queue(request, tmp_path):
+    if request.param == "sqlite":
+        queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        queue = RedisJobQueue(client=fakeredis.FakeRedis(), prefix="test")
+    yield queue
+    queue.close()
+
+def add_job(queue, chunks=2, max_attempts=2):
+    assert queue.create_job("posel", {"digest": "x"}, max_attempts)
+    assert not queue.create_job("posel", {"digest": "x"}, max_attempts)
+    queue.add_chunks("posel", [(chunk_no, 10, b"vsebina") for chunk_no in range(chunks)])
+    queue.seal("posel", chunks)
+
+def test_chunks_are_leased_once_and_completed(queue):
+    add_job(queue)
+    first = queue.lease("w1", 60)
+    second = queue.lease("w2", 60)
+    assert {first.chunk_no, second.chunk_no} == {0, 1}
+    assert first.payload == b"vsebina" and first.attempts == 1
+    assert queue.lease("w3", 60) is None
+    assert queue.has_work()
+
+    assert queue.renew(first, 60)
+    for lease, worker in ((first, "w1"), (second, "w2")):
+        assert queue.complete(lease, {"worker_id": worker, "rows": 10, "failed": 1, "seconds": 0.5})
+    queue.heartbeat("w1", {"chunks": 1, "rows": 10})
+
+    status = queue.status("posel")
+    assert status["workers"]["w1"]["heartbeat"] == {"chunks": 1, "rows": 10}
+    assert "heartbeat" not in status["workers"]["w2"]
+    assert status["complete"] and status["chunks"]["done"] == 2
+    assert status["rows_done"] == 20 and status["failed_rows"] == 2
+    assert status["workers"]["w1"]["rows_per_second"] == 20.0
+    assert queue.done_chunks("posel") == [0, 1]
+    assert not queue.has_work()
+
+def test_expired_lease_moves_to_another_worker(queue):
+    add_job(queue, chunks=1)
+    stale = queue.lease("w1", 0.0)
+    time.sleep(0.01)
+    fresh = queue.lease("w2", 60)
+
+    assert fresh.chunk_no == stale.chunk_no and fresh.attempts == 2
+    # Potrditev s prejšnjim žetonom se ne upošteva
+    assert not queue.complete(stale, {"worker_id": "w1", "rows": 10, "failed": 0, "seconds": 1.0})
+    assert queue.complete(fresh, {"worker_id": "w2", "rows": 10, "failed": 0, "seconds": 1.0})
+    assert list(queue.status("posel")["workers"]) == ["w2"]
+
+def test_failed_chunk_is_retried_until_dead(queue):
+    add_job(queue, chunks=1)
+    lease = queue.lease("w1", 60)
+    assert queue.fail(lease, "napaka", retry_delay=0.05) == "pending"
+    # Ponovni poskus je odložen, kos pa ostane v vrsti
+    assert queue.lease("w1", 60) is None
+    assert queue.has_work()
+
+    time.sleep(0.06)
+    lease = queue.lease("w1", 60)
+    assert lease.attempts == 2
+    assert queue.fail(lease, "spet napaka", retry_delay=0.0) == "dead"
+    assert not queue.has_work()
+    status = queue.status("posel")
+    assert status["chunks"]["dead"] == 1
+    assert status["errors"] == [{"chunk": 0, "state": "dead", "attempts": 2, "error": "spet napaka"}]
+
+    assert queue.retry_dead("posel") == 1
+    assert queue.lease("w1", 60).attempts == 1
+
+def test_redis_status_skips_missing_chunks():
+    fakeredis = pytest.importorskip("fakeredis")
+    queue = RedisJobQueue(client=fakeredis.FakeRedis(), prefix="test")
+    add_job(queue)
+    queue.redis.delete(queue._chunk_key("posel", 1))
+
+    status = queue.status("posel")
+    assert status["chunks"] == {"pending": 1, "leased": 0, "done": 0, "dead": 0}
+    assert not status["complete"]
+
+class FlakyWorker(JobWorker):
+    """Prvi poskus vsakega kosa zavrne, kot da se je obdelava zrušila"""
+
+    def process(self, lease):
+        if lease.attempts == 1:
+            self.queue.fail(lease, "prehodna napaka", self.retry_delay)
+            return False
+        return super().process(lease)
+
+def test_worker_waits_for_delayed_retry_before_exiting(queue, tmp_path):
+    source = tmp_path / "in.jsonl"
+    source.write_text("\n".join(json.dumps({"id": number, "text": "avto"}) for number in range(5)),
+                      encoding="utf-8")
+    job_id = submit(queue, str(source), str(tmp_path / "kosi"), chunk_size=2)["job_id"]
+
+    worker = FlakyWorker(queue, worker_id="w1", retry_delay=0.05, idle_sleep=0.01)
+    stats = worker.run(exit_when_idle=True)
+
+    assert stats["chunks"] == 3
+    assert queue.status(job_id)["complete"]
+    assert merge(queue, job_id, str(tmp_path / "out.jsonl"))["rows"] == 5
@@ -0,0 +1,52 @@
+import itertools
+import random
+
+import pytest
+
+from keyword_matcher import KeywordMatcher
+from rules import RULES_FILE, load_rules
+
+SHIPPED = load_rules(RULES_FILE)
+GROUPS = {"category": SHIPPED.categories, "risk": SHIPPED.risk_keywords}
+
+# Prekrivajoče se ključne besede in predpone, kjer bi najdaljši zadetek lahko skril krajšega
+OVERLAPPING = {
+    "a": {"x": ["ab", "abc"], "y": ["bcd"], "z": ["c"]},
+    "b": {"x": ["abcd"], "y": ["d", "da"]}
+}
+
+def naive(groups, text):
+    """Osnovno iskanje podnizov, kot pred prevedenim iskalnikom"""
+    lowered = text.lower()
+    return {
+        group: [label for label, keywords in labels.items()
+                if any(keyword.lower() in lowered for keyword in keywords)]
+        for group, labels in groups.items()
+    }
+
+def sample_texts(groups, seed=11, count=300):
+    keywords = sorted({keyword for labels in groups.values()
+                       for words in labels.values() for keyword in words})
+    texts = list(keywords)
+    texts += ["".join(pair) for pair in itertools.permutations(keywords, 2)]
+    texts += [keyword[1:] + keyword[:-1] for keyword in keywords]
+    rng = random.Random(seed)
+    alphabet = "".join(sorted(set("".join(keywords)))) + " ."
+    for _ in range(count):
+        parts = [rng.choice(keywords).upper() if rng.random() < 0.2 else rng.choice(keywords)
+                 for _ in range(rng.randint(0, 4))]
+        noise = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 6))) for _ in parts]
+        texts.append("".join(itertools.chain.from_iterable(zip(noise, parts))))
+    return texts
+
+@pytest.mark.parametrize("groups", [GROUPS, OVERLAPPING], ids=["shipped", "overlapping"])
+def test_match_equals_substring_scan(groups):
+    matcher = KeywordMatcher(groups)
+    for text in sample_texts(groups):
+        assert matcher.match(text) == naive(groups, text), text
+
+def test_inquiry_examples():
+    matcher = KeywordMatcher(GROUPS)
+    text = "Zavarovanje za AVTO in hišo; požar in voda v kleti, kraja motorja"
+    assert matcher.match(text) == naive(GROUPS, text)
+    assert matcher.match("") == {"category": [], "risk": []}
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from llm_classifier import ClassificationCache, LLMClassifier, MockBackend
+
+CATEGORIES = ("avtomobilsko", "nepremičninsko", "zdravstveno", "življenjsko")
+RISKS = ("požar", "poplava", "vlom", "potres")
+
+class ConcurrencyBackend(MockBackend):
+    """MockBackend, ki beleži največje število sočasnih klicev"""
+
+    def __init__(self, latency: float = 0.02):
+        super().__init__(latency=latency)
+        self.active = 0
+        self.peak = 0
+
+    async def classify_batch(self, texts, categories, risks):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            return await super().classify_batch(texts, categories, risks)
+        finally:
+            self.active -= 1
+
+def classifier(tmp_path, backend, **options):
+    return LLMClassifier(backend, CATEGORIES, RISKS, cache=ClassificationCache(str(tmp_path)), **options)
+
+def classify_all(llm, texts):
+    async def run():
+        return await asyncio.gather(*(llm.classify(text) for text in texts))
+
+    return asyncio.run(run())
+
+def test_concurrent_requests_are_batched(tmp_path):
+    backend = MockBackend(latency=0.01)
+    llm = classifier(tmp_path, backend, batch_size=8, max_wait=0.05)
+    results = classify_all(llm, [f"Zavarovanje hiše št. {number} pred poplavo" for number in range(20)])
+
+    assert backend.calls == 3
+    assert sorted(backend.batch_sizes) == [4, 8, 8]
+    assert all(result == {"category": "nepremičninsko", "risks": ["poplava"]} for result in results)
+
+def test_identical_requests_share_one_call(tmp_path):
+    backend = MockBackend(latency=0.01)
+    llm = classifier(tmp_path, backend)
+    results = classify_all(llm, ["Kasko za avtomobil, ukradli so mi kolo"] * 5)
+
+    assert backend.batch_sizes == [1]
+    assert results == [{"category": "avtomobilsko", "risks": ["vlom"]}] * 5
+
+def test_in_flight_calls_are_capped(tmp_path):
+    backend = ConcurrencyBackend()
+    llm = classifier(tmp_path, backend, batch_size=1, max_in_flight=2)
+    classify_all(llm, [f"Življenjsko zavarovanje {number}" for number in range(6)])
+
+    assert backend.calls == 6
+    assert backend.peak == 2
+
+def test_answers_are_cached_on_disk(tmp_path):
+    first = MockBackend(latency=0.0)
+    classify_all(classifier(tmp_path, first), ["Zdravstveno zavarovanje po poškodbi"])
+
+    second = MockBackend(latency=0.0)
+    llm = classifier(tmp_path, second)
+    assert classify_all(llm, ["Zdravstveno zavarovanje po poškodbi"]) == [
+        {"category": "zdravstveno", "risks": []}
+    ]
+    assert second.calls == 0
+    assert llm.cache.hits == 1
+
+def test_cancelled_batch_does_not_block_later_requests(tmp_path):
+    backend = MockBackend(latency=60.0)
+    llm = classifier(tmp_path, backend, max_wait=0.0)
+    text = "Potres je razpokal steno hiše"
+
+    async def run():
+        waiting = asyncio.ensure_future(llm.classify(text))
+        await asyncio.sleep(0.01)
+        for task in list(llm._tasks):
+            task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert not llm._in_flight
+
+        backend.latency = 0.0
+        return await asyncio.wait_for(llm.classify(text), timeout=5)
+
+    assert asyncio.run(run()) == {"category": "nepremičninsko", "risks": ["potres"]}
+    assert backend.calls == 2
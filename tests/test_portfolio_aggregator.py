@@ -0,0 +1,61 @@
+import json
+import logging
+
+import pytest
+
+from portfolio_aggregator import PortfolioAggregator
+from risk_exposure import RiskExposure
+from rules import RULES_FILE, compile_rules
+
+@pytest.fixture(scope="module")
+def risk_exposure():
+    return RiskExposure()
+
+def base_rules():
+    with open(RULES_FILE, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+def exposure(score, severities=("srednje",)):
+    return {"exposure_score": score, "risk_factors": [{"severity": severity} for severity in severities]}
+
+def test_add_modify_cancel_keep_totals(risk_exposure):
+    portfolio = PortfolioAggregator(risk_exposure)
+    portfolio.add("a", "avtomobilsko", exposure(0.2, ["nizko", "visoko"]))
+    portfolio.add("b", "avtomobilsko", exposure(0.8))
+    portfolio.add("c", "nepremičninsko", exposure(0.5))
+    portfolio.modify("b", "avtomobilsko", exposure(0.6))
+    portfolio.cancel("c")
+
+    summary = portfolio.snapshot()
+    assert len(portfolio) == 2
+    assert summary["total"]["exposure_sum"] == 0.8
+    assert summary["total"]["high_severity_share"] == round(1 / 3, 4)
+    assert list(summary["by_policy_type"]) == ["avtomobilsko"]
+    assert portfolio.quantile(0.5) == 0.2 and portfolio.quantile(1.0) == 0.6
+
+    with pytest.raises(KeyError):
+        portfolio.add("a", "avtomobilsko", exposure(0.1))
+    with pytest.raises(KeyError):
+        portfolio.cancel("c")
+
+def test_out_of_range_score_is_logged(risk_exposure, caplog):
+    portfolio = PortfolioAggregator(risk_exposure)
+    with caplog.at_level(logging.WARNING, logger="portfolio_aggregator"):
+        portfolio.add("x", "avtomobilsko", exposure(1.3))
+
+    assert "izven intervala" in caplog.text
+    assert portfolio.histogram()[-1] == 1
+
+@pytest.mark.parametrize("change", [
+    {"risk_factors": {"avtomobilsko": {"starost_vozila": 0.7, "območje_vožnje": 0.5}}},
+    {"risk_factors": {"avtomobilsko": {"starost_vozila": -0.1}}},
+    {"category_scores": {"območje_vožnje": {"mesto": 1.5}}}
+])
+def test_rules_reject_weights_that_exceed_score_range(change):
+    with pytest.raises(ValueError):
+        compile_rules({**base_rules(), **change})
+
+def test_shipped_rules_keep_scores_in_range():
+    rules = compile_rules(base_rules())
+    for factors in rules.risk_factors.values():
+        assert sum(factors.values()) <= 1 + 1e-9
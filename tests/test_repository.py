@@ -0,0 +1,159 @@
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from repository import PolicyRepository, SQLiteConnectionManager
+
+def draft(policy_type="avtomobilsko"):
+    return {
+        "policy_type": policy_type,
+        "coverage": ["odgovornost", "kasko"],
+        "exclusions": ["namerna škoda"],
+        "terms": {"duration": "1 leto", "coverage_details": {"kasko": {"limit": 20000}}},
+        "status": "draft",
+        "created_at": "2026-10-18T12:00:00"
+    }
+
+def exposure(score=0.42):
+    return {
+        "exposure_score": score,
+        "confidence_level": 0.67,
+        "risk_factors": [{"factor": "starost_vozila", "score": 0.25, "weight": 0.3,
+                          "impact": 0.075, "severity": "nizko"}],
+        "mitigation_suggestions": ["Spremljajte starost_vozila"],
+        "analysis_timestamp": "2026-10-18T12:00:01"
+    }
+
+@pytest.fixture(params=["memory", "file"])
+def repository(request, tmp_path):
+    path = ":memory:" if request.param == "memory" else str(tmp_path / "policies.sqlite3")
+    db = SQLiteConnectionManager(path)
+    repository = PolicyRepository(db, batch_size=3)
+    repository.ensure_schema()
+    yield repository
+    db.close()
+
+def count(repository, table):
+    with repository.db.connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def test_save_and_get_round_trip(repository):
+    assert repository.save_drafts([(f"p{i}", draft()) for i in range(7)]) == 7
+    assert repository.save_exposures([("p1", exposure())]) == 1
+
+    stored = repository.get_draft("p3")
+    assert stored == {"policy_ref": "p3", **draft()}
+    assert repository.get_exposure("p1") == {"policy_ref": "p1", **exposure()}
+    assert repository.get_draft("manjka") is None and repository.get_exposure("p2") is None
+
+def test_get_returns_latest_version(repository):
+    repository.save_drafts([("p1", draft("avtomobilsko"))])
+    repository.save_drafts([("p1", draft("nepremičninsko"))])
+    assert repository.get_draft("p1")["policy_type"] == "nepremičninsko"
+
+def test_bulk_writer_flushes_and_counts_both_tables(repository):
+    with repository.bulk_writer() as writer:
+        for i in range(7):
+            writer.add(f"p{i}", draft(), exposure() if i % 2 == 0 else None)
+        # Polni paketi se zapišejo sproti, preostanek ob izhodu
+        assert writer.drafts_written == 6
+    writer.add("samo-porocilo", exposure=exposure())
+    writer.flush()
+
+    assert (writer.drafts_written, writer.exposures_written, writer.written) == (7, 5, 12)
+    assert (count(repository, "policy_drafts"), count(repository, "exposure_reports")) == (7, 5)
+
+def test_failed_batch_leaves_no_orphan_drafts(repository):
+    writer = repository.bulk_writer()
+    writer.add("ok", draft(), exposure())
+    writer.flush()
+
+    writer.add("slab", draft(), exposure(score=object()))
+    with pytest.raises(sqlite3.Error):
+        writer.flush()
+
+    assert (count(repository, "policy_drafts"), count(repository, "exposure_reports")) == (1, 1)
+    assert repository.get_draft("slab") is None
+    assert (writer.drafts_written, writer.exposures_written) == (1, 1)
+
+def test_save_batch_rolls_back_both_tables(repository):
+    with pytest.raises(sqlite3.Error):
+        repository.save_batch([("a", draft()), ("b", draft())], [("a", exposure(object()))])
+    assert count(repository, "policy_drafts") == 0
+
+class PoolConnection:
+    """Povezava z vedenjem PostgreSQL (%s, pripravljeni stavki le na tej povezavi) nad SQLite"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.prepared = set()
+
+    def cursor(self):
+        return PoolCursor(self)
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+class PoolCursor:
+    def __init__(self, owner):
+        self.owner = owner
+        self.cursor = owner.conn.cursor()
+
+    def execute(self, sql, params=()):
+        command = sql.split(None, 2)
+        if command[0] == "PREPARE":
+            self.owner.prepared.add(command[1])
+            return
+        if command[0] == "EXECUTE" and command[1] not in self.owner.prepared:
+            raise sqlite3.OperationalError(f"prepared statement \"{command[1]}\" does not exist")
+        self.cursor.execute(sql.replace("%s", "?"), params)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+class ChurningPool:
+    """Kot ThreadedConnectionPool: povezave nad min_connections se ob vrnitvi zaprejo"""
+
+    dialect = "postgresql"
+
+    def __init__(self, path, min_connections=1):
+        self.path = path
+        self.min_connections = min_connections
+        self.idle = []
+        self.opened = 0
+        self.borrows = 0
+
+    @contextmanager
+    def connection(self):
+        if self.idle:
+            conn = self.idle.pop()
+        else:
+            conn = PoolConnection(self.path)
+            self.opened += 1
+        self.borrows += 1
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            # Vsaka druga povezava se zapre, kot da je bila nad min_connections
+            if self.borrows % 2 and len(self.idle) < self.min_connections:
+                self.idle.append(conn)
+            else:
+                conn.conn.close()
+
+def test_lookup_survives_pool_reopening_connections(tmp_path):
+    path = str(tmp_path / "policies.sqlite3")
+    writer = PolicyRepository(SQLiteConnectionManager(path))
+    writer.ensure_schema()
+    writer.save_batch([(f"p{i}", draft()) for i in range(3)], [("p1", exposure())])
+
+    pool = ChurningPool(path)
+    repository = PolicyRepository(pool)
+    for _ in range(5):
+        assert repository.get_draft("p2") == {"policy_ref": "p2", **draft()}
+        assert repository.get_exposure("p1") == {"policy_ref": "p1", **exposure()}
+    assert pool.opened > pool.min_connections
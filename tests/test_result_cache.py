@@ -0,0 +1,47 @@
+import json
+import shutil
+
+from mga_analyst import MGAAnalyst
+from policy_manager import PolicyManager
+from result_cache import ResultCache, make_key, rules_fingerprint
+from risk_exposure import RiskExposure
+from rules import RULES_FILE, RulesStore
+from underwriter import Underwriter
+
+def test_key_ignores_case_and_whitespace(tmp_path):
+    attachment = tmp_path / "priloga.txt"
+    attachment.write_text("vsebina", encoding="utf-8")
+
+    assert make_key("Avto  v Ljubljani", "Ljubljana") == make_key("avto v ljubljani ", " ljubljana")
+    assert make_key("avto", None) != make_key("avto", None, [str(attachment)])
+
+def test_lru_respects_entry_and_byte_limits():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+    small = ResultCache(max_bytes=200)
+    small.put("velik", "x" * 500)
+    assert small.get("velik") is None
+
+def test_policy_manager_rules_invalidate_cache(tmp_path):
+    path = tmp_path / "rules.json"
+    shutil.copy(RULES_FILE, path)
+    store = RulesStore(str(path), check_interval=0)
+    agents = (MGAAnalyst(), Underwriter(), PolicyManager(store), RiskExposure())
+    cache = ResultCache(fingerprint=lambda: rules_fingerprint(*agents))
+    cache.put("povpraševanje", "osnutek po starih kritjih")
+
+    rules = json.loads(path.read_text(encoding="utf-8"))
+    rules["version"] = "test-kritja"
+    rules["standard_exclusions"]["avtomobilsko"] = ["nova izključitev"]
+    path.write_text(json.dumps(rules, ensure_ascii=False), encoding="utf-8")
+    assert store.reload(force=True)
+
+    assert cache.get("povpraševanje") is None
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,69 @@
+import math
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from risk_exposure import RiskExposure
+
+@pytest.fixture(scope="module")
+def exposure():
+    return RiskExposure()
+
+def random_value(rng, factor, rules):
+    """Številka (tudi izven razpona), kategorija, neznan niz, NaN ali None"""
+    choice = rng.random()
+    if choice < 0.4:
+        low, high = rules.factor_ranges.get(factor, (0, 1))
+        return rng.uniform(low - (high - low) * 0.2, high + (high - low) * 0.2)
+    if choice < 0.55:
+        return rng.randint(-5, 120)
+    if choice < 0.75:
+        return rng.choice(list(rules.category_scores.get(factor, {})) + ["neznano"])
+    if choice < 0.9:
+        return math.nan
+    return None
+
+def portfolio(exposure, size=600, seed=7):
+    rng = random.Random(seed)
+    rules = exposure.rules
+    factors = sorted({factor for group in rules.risk_factors.values() for factor in group})
+    rows = []
+    for _ in range(size):
+        row = {"policy_type": rng.choice(list(rules.risk_factors) + [None, "drugo"])}
+        for factor in factors:
+            if rng.random() < 0.85:
+                row[factor] = random_value(rng, factor, rules)
+        rows.append(row)
+    return rows
+
+def test_batch_matches_scalar_row_by_row(exposure):
+    rows = portfolio(exposure)
+    frame = pd.DataFrame(rows)
+    batch = exposure.calculate_exposure_batch(frame)
+
+    for position, row in enumerate(rows):
+        scalar = exposure.calculate_exposure(row)
+        result = batch.iloc[position]
+        assert result["exposure_score"] == scalar.exposure_score, row
+        assert result["confidence_level"] == scalar.confidence_level, row
+        for factor in scalar.risk_factors:
+            assert result[f"{factor.factor}_score"] == factor.score, row
+            assert result[f"{factor.factor}_severity"] == factor.severity, row
+
+def test_numeric_columns_with_missing_values(exposure):
+    frame = pd.DataFrame({
+        "policy_type": ["avtomobilsko"] * 4,
+        "starost_vozila": [3.0, np.nan, 40.0, -1.0]
+    })
+    batch = exposure.calculate_exposure_batch(frame)
+
+    for position, row in enumerate(frame.to_dict("records")):
+        scalar = exposure.calculate_exposure(row)
+        assert batch["exposure_score"].iloc[position] == scalar.exposure_score
+        assert batch["starost_vozila_score"].iloc[position] == scalar.risk_factors[0].score
+
+    # NaN je neznan podatek v obeh poteh
+    assert exposure.calculate_exposure({"policy_type": "avtomobilsko",
+                                        "starost_vozila": math.nan}).risk_factors[0].score == 0.5
@@ -0,0 +1,86 @@
+import json
+import logging
+import shutil
+import time
+
+import pytest
+
+from mga_analyst import MGAAnalyst
+from policy_manager import PolicyManager
+from rules import RULES_FILE, RulesStore
+from underwriter import Underwriter
+
+@pytest.fixture
+def rules_path(tmp_path):
+    path = tmp_path / "rules.json"
+    shutil.copyfile(RULES_FILE, path)
+    return path
+
+def rewrite(path, **changes):
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    raw.update(changes)
+    path.write_text(json.dumps(raw, ensure_ascii=False), encoding="utf-8")
+    return raw
+
+def agents(store):
+    return MGAAnalyst(rules_store=store), Underwriter(rules_store=store), PolicyManager(rules_store=store)
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "pravila niso bila zamenjana"
+        time.sleep(0.01)
+
+def test_watcher_swaps_rules_of_all_agents(rules_path):
+    store = RulesStore(str(rules_path), check_interval=0.02)
+    analyst, underwriter, manager = agents(store)
+    previous = store.current().version
+    assert analyst.analyze_input("zavarovanje za jahto").category != "avtomobilsko"
+
+    raw = json.loads(rules_path.read_text(encoding="utf-8"))
+    categories = {**raw["categories"], "avtomobilsko": raw["categories"]["avtomobilsko"] + ["jaht"]}
+    coverage = {**raw["coverage_types"], "avtomobilsko": ["osnovno", "plovila"]}
+    rewrite(rules_path, version="1.1", categories=categories,
+            risk_weights={**raw["risk_weights"], "požar": 0.5}, coverage_types=coverage)
+
+    wait_for(lambda: all(agent.rules_version != previous for agent in (analyst, underwriter, manager)))
+    version = store.current().version
+    assert version.startswith("1.1+")
+    assert {analyst.rules_version, underwriter.rules_version, manager.rules_version} == {version}
+    assert store.reloads == 1 and store.failures == 0
+
+    analysis = analyst.analyze_input("zavarovanje za jahto")
+    assert analysis.category == "avtomobilsko" and analysis.rules_version == version
+    assert underwriter.rating_engine.quote("nepremičninsko", ["požar"])[0] == 0.5
+    draft = manager.create_policy_draft({"suggested_policy": "avtomobilsko", "risk_score": 0.9})
+    assert "plovila" in draft.coverage and draft.rules_version == version
+
+@pytest.mark.parametrize("content", [
+    "{ni json",
+    json.dumps({"version": "2.0"}),
+    None
+], ids=["syntax", "sections", "weights"])
+def test_invalid_file_keeps_previous_rules(rules_path, caplog, content):
+    store = RulesStore(str(rules_path), check_interval=0)
+    analyst, underwriter, manager = agents(store)
+    previous = store.current()
+
+    if content is None:
+        raw = json.loads(rules_path.read_text(encoding="utf-8"))
+        rewrite(rules_path, version="2.0", risk_weights={**raw["risk_weights"], "požar": -1})
+    else:
+        rules_path.write_text(content, encoding="utf-8")
+    with caplog.at_level(logging.ERROR, logger="rules"):
+        assert not store.reload()
+
+    assert store.current() is previous and store.failures == 1
+    assert {analyst.rules_version, underwriter.rules_version, manager.rules_version} == {previous.version}
+    assert any("ni bilo mogoče naložiti" in record.getMessage() and previous.version in record.getMessage()
+               for record in caplog.records)
+    assert analyst.analyze_input("hiša je zgorela v požaru").category == "nepremičninsko"
+
+    # Popravljena datoteka se naloži ob naslednjem preverjanju
+    shutil.copyfile(RULES_FILE, rules_path)
+    rewrite(rules_path, version="2.1")
+    assert store.reload()
+    assert underwriter.rules_version.startswith("2.1+")
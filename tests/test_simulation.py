@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from simulation import LossModel, LossSketch, simulate, synthetic_book
+from underwriter import Underwriter
+
+ACCURACY = 0.005
+
+def losses(size=20_000, seed=5):
+    """Izgube s pretežno ničlami in težkim repom, kot pri letnih izgubah portfelja"""
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(mean=10, sigma=2, size=size)
+    values[rng.random(size) < 0.3] = 0.0
+    return values
+
+def exact_tail_mean(values, q):
+    tail = (1 - q) * len(values)
+    ordered = np.sort(values)[::-1]
+    whole = int(tail)
+    total = ordered[:whole].sum() + (tail - whole) * (ordered[whole] if whole < len(ordered) else 0.0)
+    return total / tail
+
+@pytest.mark.parametrize("q", [0.1, 0.3, 0.5, 0.9, 0.99, 0.995, 0.999])
+def test_sketch_matches_exact_quantiles(q):
+    values = losses()
+    sketch = LossSketch(ACCURACY)
+    sketch.add(values)
+
+    low, high = np.quantile(values, q, method="lower"), np.quantile(values, q, method="higher")
+    assert low * (1 - ACCURACY) <= sketch.quantile(q) <= high * (1 + ACCURACY)
+    assert sketch.tail_mean(q) == pytest.approx(exact_tail_mean(values, q), rel=ACCURACY)
+    assert sketch.mean == pytest.approx(values.mean())
+    assert sketch.std == pytest.approx(values.std(ddof=1))
+    assert sketch.max == values.max()
+
+def test_merge_equals_single_add():
+    values = losses()
+    single = LossSketch(ACCURACY)
+    single.add(values)
+
+    merged = LossSketch(ACCURACY)
+    for part in np.array_split(values, 7):
+        sketch = LossSketch(ACCURACY)
+        sketch.add(part)
+        merged.merge(sketch)
+
+    assert (merged.count, merged.zeros, merged.max) == (single.count, single.zeros, single.max)
+    assert merged.total == pytest.approx(single.total)
+    for q in (0.5, 0.9, 0.99, 0.999):
+        assert merged.quantile(q) == single.quantile(q)
+        assert merged.tail_mean(q) == pytest.approx(single.tail_mean(q))
+    with pytest.raises(ValueError):
+        merged.merge(LossSketch(0.01))
+
+def test_simulation_is_reproducible_across_workers():
+    risk_weights = Underwriter().risk_weights
+    book = synthetic_book(2000, list(risk_weights), seed=3)
+    model = LossModel.from_policies(risk_weights, book["sum_insured"], book["exposure"], book["mask"],
+                                    book["region"], book["region_count"])
+
+    results = [simulate(model, trials=8000, seed=9, chunk_trials=2000, workers=workers)
+               for workers in (0, 2)]
+    for result in results:
+        del result["elapsed_seconds"]
+    assert results[0] == results[1]
+    assert results[0]["expected_loss"] > 0
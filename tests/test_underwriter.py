@@ -0,0 +1,55 @@
+import json
+from itertools import combinations
+
+import pytest
+
+from rating_engine import MAX_PERILS, RatingEngine
+from rules import RULES_FILE, compile_rules
+from underwriter import Underwriter
+
+@pytest.fixture(scope="module")
+def underwriter():
+    return Underwriter()
+
+def analyses(underwriter):
+    """Vse kategorije (tudi neznane) z vsemi podmnožicami nevarnosti in neznano nevarnostjo"""
+    perils = list(underwriter.risk_weights) + ["toča"]
+    categories = list(underwriter.policy_types) + ["drugo", None]
+    for category in categories:
+        for size in range(len(perils) + 1):
+            for risks in combinations(perils, size):
+                yield {"category": category, "risks": list(risks)}
+
+def test_batch_matches_single_evaluation(underwriter):
+    batch_input = list(analyses(underwriter))
+    batch = underwriter.evaluate_risk_batch(batch_input)
+
+    assert len(batch) == len(batch_input)
+    for data, result in zip(batch_input, batch):
+        single = underwriter.evaluate_risk(data)
+        assert result.premium == single.premium, data
+        assert result.risk_score == single.risk_score, data
+        assert result.suggested_policy == single.suggested_policy, data
+        assert result.details == single.details, data
+
+def test_premium_grows_with_perils(underwriter):
+    calm = underwriter.evaluate_risk({"category": "nepremičninsko", "risks": []})
+    stormy = underwriter.evaluate_risk({"category": "nepremičninsko", "risks": ["požar", "poplava", "potres"]})
+
+    assert stormy.risk_score > calm.risk_score
+    assert stormy.premium > calm.premium > 0
+    assert set(stormy.details["peril_loadings"]) == {"požar", "poplava", "potres"}
+
+def test_peril_count_is_limited():
+    weights = {f"nevarnost{number}": 0.05 for number in range(MAX_PERILS)}
+    engine = RatingEngine(weights)
+    assert len(engine.premiums[0]) == 1 << MAX_PERILS
+    assert engine.quote("nepremičninsko", list(weights)[:3])[0] == 0.15
+
+    weights["še ena"] = 0.05
+    with pytest.raises(ValueError):
+        RatingEngine(weights)
+    with open(RULES_FILE, "r", encoding="utf-8") as handle:
+        raw = json.load(handle)
+    with pytest.raises(ValueError, match="nevarnosti"):
+        compile_rules({**raw, "risk_weights": weights})
@@ -1,45 +1,113 @@
-from typing import Dict
+from typing import Dict, Iterable, List, Optional, Sequence
 import logging
+from records import RiskEvaluation
+from rating_engine import RatingEngine
+from metrics import instrument
+from rules import CompiledRules, RulesConsumer, RulesState, RulesStore
 
 logger = logging.getLogger(__name__)
 
-class Underwriter:
-    def __init__(self):
-        self.risk_weights = {
-            "požar": 0.3,
-            "poplava": 0.25,
-            "vlom": 0.2,
-            "potres": 0.25
-        }
+class Underwriter(RulesConsumer):
+    def __init__(self, rules_store: Optional[RulesStore] = None):
+        # Uteži nevarnosti in tipi polic so v datoteki pravil
+        self._attach_rules(rules_store)
+
+    @property
+    def risk_weights(self):
+        return self.rules.risk_weights
+
+    @property
+    def policy_types(self):
+        return self.rules.policy_types
+
+    @property
+    def rating_engine(self) -> RatingEngine:
+        return self._rules_state.derived
 
-    def evaluate_risk(self, data: Dict) -> Dict:
+    def prepare_rules(self, rules: CompiledRules) -> RulesState:
+        """Tabele premij se izračunajo enkrat za vsako različico pravil"""
+        return RulesState(rules, RatingEngine(dict(rules.risk_weights)))
+
+    @instrument("underwriter.evaluate_risk")
+    def evaluate_risk(self, data: Dict) -> RiskEvaluation:
         try:
-            risk_score = self._calculate_risk_score(data)
-            policy_suggestion = self._suggest_policy(risk_score, data)
-            premium = self._calculate_premium(risk_score, policy_suggestion)
-            
-            return {
-                "risk_score": risk_score,
-                "suggested_policy": policy_suggestion,
-                "premium": premium,
-                "details": self._generate_risk_details(data)
-            }
+            state = self._rules_state
+            risk_score = self._calculate_risk_score(data, state)
+            policy_suggestion = self._suggest_policy(risk_score, data, state.rules)
+            premium = self._calculate_premium(policy_suggestion, data.get("risks") or [], state)
+
+            return RiskEvaluation(
+                risk_score=risk_score,
+                suggested_policy=policy_suggestion,
+                premium=premium,
+                details=self._generate_risk_details(data, policy_suggestion, state),
+                rules_version=state.rules.version
+            )
         except Exception as e:
             logger.error(f"Napaka pri ocenjevanju tveganja: {str(e)}")
             raise
 
-    def _calculate_risk_score(self, data: Dict) -> float:
-        # Implementacija izračuna ocene tveganja
-        pass
+    def evaluate_risk_batch(self, analyses: Iterable[Dict]) -> List[RiskEvaluation]:
+        """Paketna ocena tveganja z enakimi premijami kot evaluate_risk"""
+        try:
+            state = self._rules_state
+            engine = state.derived
+            analyses = list(analyses)
+            policy_types = [
+                self._suggest_policy(0.0, data, state.rules) for data in analyses
+            ]
+            masks = [engine.peril_mask(data.get("risks") or []) for data in analyses]
+            risk_scores, _, premiums = engine.quote_batch(policy_types, masks)
 
-    def _suggest_policy(self, risk_score: float, data: Dict) -> str:
-        # Implementacija predloga police
-        pass
+            return [
+                RiskEvaluation(
+                    risk_score=risk_score,
+                    suggested_policy=policy_type,
+                    premium=premium,
+                    details=self._generate_risk_details(data, policy_type, state),
+                    rules_version=state.rules.version
+                )
+                for data, policy_type, risk_score, premium in zip(
+                    analyses, policy_types, risk_scores.tolist(), premiums.tolist()
+                )
+            ]
+        except Exception as e:
+            logger.error(f"Napaka pri paketnem ocenjevanju tveganja: {str(e)}")
+            raise
+
+    def _calculate_risk_score(self, data: Dict, state: Optional[RulesState] = None) -> float:
+        """Oceno tveganja določijo uteži prepoznanih nevarnosti"""
+        engine = (state or self._rules_state).derived
+        return engine.risk_scores[engine.peril_mask(data.get("risks") or [])]
 
-    def _calculate_premium(self, risk_score: float, policy_type: str) -> float:
-        # Implementacija izračuna premije
-        pass
+    def _suggest_policy(self, risk_score: float, data: Dict,
+                        rules: Optional[CompiledRules] = None) -> Optional[str]:
+        """Predlaga tip police glede na kategorijo povpraševanja"""
+        category = data.get("category")
+        if category in (rules or self.rules).policy_types:
+            return category
+        # Nevarnosti brez prepoznane kategorije se nanašajo na premoženje
+        return "nepremičninsko" if data.get("risks") else None
 
-    def _generate_risk_details(self, data: Dict) -> Dict:
-        # Implementacija podrobnosti tveganja
-        pass 
\ No newline at end of file
+    def _calculate_premium(self, policy_type: Optional[str], perils: Sequence[str] = (),
+                           state: Optional[RulesState] = None) -> float:
+        """Premija iz vnaprej izračunane tabele za tip police, pas in nevarnosti"""
+        return (state or self._rules_state).derived.quote(policy_type, perils)[2]
+
+    def _generate_risk_details(self, data: Dict, policy_type: Optional[str] = None,
+                               state: Optional[RulesState] = None) -> Dict:
+        """Podrobnosti ocene: nevarnosti, pas tveganja in doplačila"""
+        state = state or self._rules_state
+        risk_weights = state.rules.risk_weights
+        perils = [risk for risk in data.get("risks") or [] if risk in risk_weights]
+        engine = state.derived
+        risk_score, band, _ = engine.quote(policy_type, perils)
+        loadings = engine.peril_loadings[engine.policy_index(policy_type)]
+
+        return {
+            "perils": {peril: risk_weights[peril] for peril in perils},
+            "risk_band": engine.BAND_LABELS[band],
+            "base_premium": engine.BASE_PREMIUMS.get(policy_type, engine.BASE_PREMIUMS[None]),
+            "band_factor": engine.BAND_FACTORS[band],
+            "peril_loadings": {peril: round(loadings[peril], 2) for peril in perils}
+        }